@@ -63,21 +63,18 @@ class WorkoutPlanAdmin(admin.ModelAdmin):
 
     def create_workouts(self, request, queryset):
         """Crée des séances d'entraînement pour les plans sélectionnés"""
-        count = 0
-        for plan in queryset:
-            if not plan.workout_created:
-                plan.create_workout()
-                count += 1
-        self.message_user(request, f'{count} séance(s) créée(s).')
+        workouts = queryset.create_workouts()
+        self.message_user(request, f'{len(workouts)} séance(s) créée(s).')
     create_workouts.short_description = "Créer des séances d'entraînement"
 
     def activate_plans(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
+        queryset.refresh_reminders()
         self.message_user(request, f'{updated} plan(s) activé(s).')
     activate_plans.short_description = "Activer les plans"
 
     def deactivate_plans(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, remind_at=None, updated_at=timezone.now())
         self.message_user(request, f'{updated} plan(s) désactivé(s).')
     deactivate_plans.short_description = "Désactiver les plans"
 
@@ -0,0 +1,161 @@
+"""
+Agenda de l'utilisateur sur une fenêtre de temps
+
+Fusionne en un seul flux trié les événements enregistrés (CalendarEvent),
+les occurrences des plans récurrents (WorkoutPlan) et les séances (Workout)
+qui chevauchent la fenêtre [start, end[. Chaque source est lue en une seule
+requête, quelle que soit la taille de la fenêtre.
+"""
+
+import heapq
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CalendarEvent, WorkoutPlan
+
+# Durée maximale d'un plan ou d'une séance (validateurs des modèles) : borne
+# inférieure de la recherche par date de début
+MAX_WORKOUT_DURATION = timedelta(minutes=300)
+
+# Fenêtre maximale d'une requête (limite l'expansion des plans récurrents)
+MAX_RANGE = timedelta(days=366)
+
+# Ordre des sources pour des éléments commençant au même instant
+SOURCE_ORDER = {'event': 0, 'plan': 1, 'workout': 2}
+
+
+def overlapping_events(user, start, end):
+    """
+    Événements chevauchant [start, end[
+
+    La fin effective est toujours renseignée : un événement chevauche la
+    fenêtre s'il commence avant end et se termine après start. Les
+    événements ponctuels commençant exactement à start sont aussi retenus.
+    Chaque branche correspond à un parcours d'index (user, start_date) ou
+    (user, effective_end_date).
+    """
+    return CalendarEvent.objects.filter(
+        Q(effective_end_date__gt=start) | Q(start_date__gte=start),
+        user=user,
+        start_date__lt=end
+    ).order_by('start_date', 'id')
+
+
+def overlapping_workouts(user, start, end):
+    """Séances chevauchant [start, end[ (durée bornée : parcours de l'index (user, date))"""
+    from apps.workouts.models import Workout
+
+    workouts = Workout.objects.filter(
+        user=user,
+        date__gte=start - MAX_WORKOUT_DURATION,
+        date__lt=end
+    ).only(
+        'id', 'name', 'date', 'status',
+        'planned_duration_minutes', 'actual_duration_minutes'
+    ).order_by('date', 'id')
+
+    for workout in workouts:
+        duration = workout.actual_duration_minutes or workout.planned_duration_minutes
+        workout_end = workout.date + timedelta(minutes=duration)
+        if workout_end > start or workout.date >= start:
+            yield workout, workout_end
+
+
+def overlapping_plans(user, start, end):
+    """Occurrences (plan, début, fin) des plans actifs chevauchant [start, end["""
+    plans = WorkoutPlan.objects.filter(user=user).only(
+        'id', 'title', 'scheduled_date', 'duration_minutes', 'repeat_type',
+        'repeat_interval', 'repeat_until', 'priority', 'workout_created'
+    )
+    for plan, occurrence in plans.expand(start - MAX_WORKOUT_DURATION, end):
+        occurrence_end = occurrence + timedelta(minutes=plan.duration_minutes)
+        if occurrence_end > start or occurrence >= start:
+            yield plan, occurrence, occurrence_end
+
+
+def local(moment):
+    """Heure locale, comme les DateTimeField des serializers"""
+    return timezone.localtime(moment) if moment is not None else None
+
+
+def event_entry(event):
+    return {
+        'source': 'event',
+        'id': event.pk,
+        'title': event.title,
+        'event_type': event.event_type,
+        'start': local(event.start_date),
+        'end': local(event.end_date),
+        'all_day': event.all_day,
+        'color': event.color,
+        'workout_id': event.workout_id,
+        'workout_plan_id': event.workout_plan_id,
+    }
+
+
+def plan_entry(plan, occurrence, occurrence_end):
+    return {
+        'source': 'plan',
+        'id': plan.pk,
+        'title': plan.title,
+        'event_type': 'workout',
+        'start': local(occurrence),
+        'end': local(occurrence_end),
+        'all_day': False,
+        'priority': plan.priority,
+        'workout_plan_id': plan.pk,
+    }
+
+
+def workout_entry(workout, workout_end):
+    return {
+        'source': 'workout',
+        'id': workout.pk,
+        'title': workout.name,
+        'event_type': 'workout',
+        'start': local(workout.date),
+        'end': local(workout_end),
+        'all_day': False,
+        'status': workout.status,
+        'workout_id': workout.pk,
+    }
+
+
+def get_agenda(user, start, end):
+    """
+    Éléments de l'agenda chevauchant [start, end[, triés par date de début
+
+    Les doublons sont écartés : une occurrence déjà matérialisée en
+    événement, ou dont la séance a été créée, n'est pas répétée, et une
+    séance rattachée à un événement n'apparaît qu'à travers lui.
+
+    Returns:
+        Liste de dictionnaires (source, id, title, start, end, ...)
+    """
+    events = list(overlapping_events(user, start, end))
+    materialized = {
+        (event.workout_plan_id, event.start_date)
+        for event in events if event.workout_plan_id
+    }
+    linked_workouts = {event.workout_id for event in events if event.workout_id}
+
+    plans = (
+        plan_entry(plan, occurrence, occurrence_end)
+        for plan, occurrence, occurrence_end in overlapping_plans(user, start, end)
+        if (plan.pk, occurrence) not in materialized
+        and not (plan.workout_created_id and occurrence == plan.scheduled_date)
+    )
+    workouts = (
+        workout_entry(workout, workout_end)
+        for workout, workout_end in overlapping_workouts(user, start, end)
+        if workout.pk not in linked_workouts
+    )
+
+    return list(heapq.merge(
+        map(event_entry, events),
+        plans,
+        workouts,
+        key=lambda entry: (entry['start'], SOURCE_ORDER[entry['source']], entry['id'])
+    ))
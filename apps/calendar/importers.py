@@ -0,0 +1,562 @@
+"""
+Import CSV de l'historique d'entraînement
+Lecture en flux et insertion par lots (bulk_create) des séances, exercices et séries
+"""
+
+import csv
+import io
+import itertools
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, Optional, Tuple
+
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+# Colonnes attendues (surchargées par import_options['mapping'])
+DEFAULT_COLUMNS = {
+    'date': 'date',
+    'workout': 'workout',
+    'machine': 'machine',
+    'reps': 'reps',
+    'weight': 'weight',
+    'duration_seconds': 'duration_seconds',
+    'distance_meters': 'distance_meters',
+    'rpe': 'rpe',
+    'notes': 'notes',
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Nombre maximal d'erreurs détaillées conservées dans le rapport
+MAX_REPORTED_ERRORS = 100
+
+
+class CSVRowError(ValueError):
+    """Ligne CSV invalide"""
+
+
+class CSVFileError(ValueError):
+    """
+    Fichier CSV illisible (encodage, structure)
+
+    L'erreur est définitive : une nouvelle tentative relirait le même fichier.
+    """
+
+
+# Erreurs de base de données propres aux données d'un lot : le lot est
+# compté en échec. Les autres (connexion, verrou...) sont propagées pour
+# que l'import soit repris.
+ROW_DATABASE_ERRORS = (DataError, IntegrityError)
+
+
+class CSVWorkoutImporter:
+    """
+    Importe un fichier CSV (une ligne par série) dans Workout/Exercise/Serie
+
+    Les lignes sont lues une à une et insérées par lots, chaque lot dans sa
+    propre transaction. Seules les correspondances séance/exercice déjà
+    créées sont gardées en mémoire, jamais les lignes elles-mêmes.
+
+    Options (CSVImport.import_options) :
+        mapping: {champ: colonne du fichier}
+        delimiter: séparateur (détecté automatiquement par défaut)
+        date_format: format strptime des dates (ISO 8601 par défaut)
+        chunk_size: nombre de lignes par lot
+    """
+
+    def __init__(self, csv_import):
+        self.csv_import = csv_import
+        options = csv_import.import_options or {}
+        self.columns = {**DEFAULT_COLUMNS, **options.get('mapping', {})}
+        self.delimiter = options.get('delimiter')
+        self.date_format = options.get('date_format')
+        self.chunk_size = options.get('chunk_size', DEFAULT_CHUNK_SIZE)
+
+        self.machine_ids: Dict[str, int] = {}
+        self.workout_ids: Dict[Tuple, int] = {}
+        self.exercise_ids: Dict[Tuple[int, int], int] = {}
+        self.next_order: Dict[int, int] = {}
+        self.next_set_number: Dict[int, int] = {}
+
+        self.successful = 0
+        self.failed = 0
+        self.errors = []
+
+    # Lecture et validation
+
+    def open_reader(self, stream) -> csv.DictReader:
+        """Ouvre le fichier en texte et prépare le lecteur CSV"""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        delimiter = self.delimiter
+        if not delimiter:
+            try:
+                sample = text.read(4096)
+            except UnicodeDecodeError as exc:
+                raise CSVFileError(f"fichier illisible : {exc}") from exc
+            text.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+            except csv.Error:
+                delimiter = ','
+        return csv.DictReader(text, delimiter=delimiter)
+
+    def value(self, row: Dict, field: str) -> str:
+        """Valeur brute (nettoyée) d'un champ"""
+        return (row.get(self.columns[field]) or '').strip()
+
+    def parse_int(self, row: Dict, field: str, minimum: int, maximum: int) -> Optional[int]:
+        raw = self.value(row, field)
+        if not raw:
+            return None
+        try:
+            number = int(raw)
+        except ValueError:
+            raise CSVRowError(f"{field} invalide : {raw!r}")
+        if not minimum <= number <= maximum:
+            raise CSVRowError(f"{field} hors limites ({minimum}-{maximum}) : {number}")
+        return number
+
+    def parse_date(self, row: Dict) -> datetime:
+        raw = self.value(row, 'date')
+        if not raw:
+            raise CSVRowError("date manquante")
+        try:
+            if self.date_format:
+                parsed = datetime.strptime(raw, self.date_format)
+            else:
+                parsed = datetime.fromisoformat(raw)
+        except ValueError:
+            raise CSVRowError(f"date invalide : {raw!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def parse_weight(self, row: Dict) -> Optional[Decimal]:
+        raw = self.value(row, 'weight').replace(',', '.')
+        if not raw:
+            return None
+        try:
+            weight = Decimal(raw).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise CSVRowError(f"weight invalide : {raw!r}")
+        if not Decimal('0') <= weight < Decimal('10000'):
+            raise CSVRowError(f"weight hors limites : {weight}")
+        return weight
+
+    def parse_row(self, row: Dict) -> Dict:
+        """
+        Valide une ligne et la convertit en valeurs typées
+
+        Raises:
+            CSVRowError: si la ligne est invalide
+        """
+        machine_name = self.value(row, 'machine')
+        machine_id = self.machine_ids.get(machine_name.casefold())
+        if machine_id is None:
+            raise CSVRowError(f"machine inconnue : {machine_name!r}")
+
+        date = self.parse_date(row)
+        parsed = {
+            'date': date,
+            'workout': self.value(row, 'workout') or f"Séance du {date.strftime('%d/%m/%Y')}",
+            'machine_id': machine_id,
+            'reps': self.parse_int(row, 'reps', 0, 200),
+            'weight': self.parse_weight(row),
+            'duration_seconds': self.parse_int(row, 'duration_seconds', 1, 7200),
+            'distance_meters': self.parse_int(row, 'distance_meters', 1, 50000),
+            'rpe': self.parse_int(row, 'rpe', 1, 10),
+            'notes': self.value(row, 'notes'),
+        }
+        if parsed['reps'] is None and parsed['duration_seconds'] is None:
+            raise CSVRowError("reps ou duration_seconds requis")
+        return parsed
+
+    def iter_rows(self, reader, first_line: int = 1) -> Iterator[Dict]:
+        """
+        Génère les lignes valides ; les lignes invalides sont comptées en échec
+
+        Raises:
+            CSVFileError: si le fichier ne peut pas être décodé ou analysé
+        """
+        rows = iter(reader)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except (UnicodeDecodeError, csv.Error) as exc:
+                raise CSVFileError(
+                    f"fichier illisible après la ligne {first_line + reader.line_num - 1} : {exc}"
+                ) from exc
+            try:
+                yield self.parse_row(row)
+            except CSVRowError as exc:
+                self.record_failure(first_line + reader.line_num - 1, str(exc))
+
+    def record_failure(self, line_number: int, message: str, count: int = 1):
+        self.failed += count
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"Ligne {line_number} : {message}")
+
+    # Écriture par lots
+
+    def write_chunk(self, rows, checkpoint=None) -> set:
+        """
+        Insère un lot de lignes valides dans une transaction
+
+        Les correspondances créées ne sont conservées qu'après validation
+        de la transaction, pour rester cohérentes en cas d'échec du lot.
+
+        Args:
+            rows: Lignes validées du lot
+            checkpoint: Fonction appelée dans la même transaction après les
+                insertions (enregistrement du point de reprise)
+
+        Returns:
+            Identifiants des séances modifiées
+        """
+        from apps.workouts.models import Exercise, Serie, Workout
+
+        user_id = self.csv_import.user_id
+        workout_ids = {}
+        exercise_ids = {}
+        next_order = {}
+        next_set_number = {}
+
+        with transaction.atomic():
+            # Séances
+            new_workouts = {}
+            for row in rows:
+                key = (row['date'], row['workout'])
+                if key not in self.workout_ids and key not in new_workouts:
+                    new_workouts[key] = Workout(
+                        user_id=user_id,
+                        name=row['workout'],
+                        date=row['date'],
+                        status='completed',
+                        completed_at=row['date'],
+                        description="Importé depuis un fichier CSV",
+                    )
+            Workout.objects.bulk_create(new_workouts.values())
+            workout_ids = {key: workout.pk for key, workout in new_workouts.items()}
+
+            def workout_id_for(row):
+                key = (row['date'], row['workout'])
+                return self.workout_ids.get(key) or workout_ids[key]
+
+            # Exercices (ordre d'apparition dans le fichier)
+            new_exercises = {}
+            for row in rows:
+                key = (workout_id_for(row), row['machine_id'])
+                if key not in self.exercise_ids and key not in new_exercises:
+                    workout_id = key[0]
+                    order = next_order.get(workout_id, self.next_order.get(workout_id, 0)) + 1
+                    next_order[workout_id] = order
+                    new_exercises[key] = Exercise(
+                        workout_id=workout_id,
+                        machine_id=row['machine_id'],
+                        order=order,
+                        completed=True,
+                    )
+            Exercise.objects.bulk_create(new_exercises.values())
+            exercise_ids = {key: exercise.pk for key, exercise in new_exercises.items()}
+
+            # Séries (numérotées dans l'ordre du fichier)
+            series = []
+            for row in rows:
+                key = (workout_id_for(row), row['machine_id'])
+                exercise_id = self.exercise_ids.get(key) or exercise_ids[key]
+                set_number = next_set_number.get(
+                    exercise_id, self.next_set_number.get(exercise_id, 0)
+                ) + 1
+                next_set_number[exercise_id] = set_number
+                series.append(Serie(
+                    exercise_id=exercise_id,
+                    set_number=set_number,
+                    reps=row['reps'],
+                    weight=row['weight'],
+                    duration_seconds=row['duration_seconds'],
+                    distance_meters=row['distance_meters'],
+                    rpe=row['rpe'],
+                    notes=row['notes'],
+                    completed=True,
+                    completed_at=row['date'],
+                ))
+            Serie.objects.bulk_create(series)
+
+            # bulk_create ne déclenche pas les signaux : statistiques recalculées ici
+            touched = {workout_id_for(row) for row in rows}
+            Workout.objects.filter(pk__in=touched).refresh_totals()
+
+            if checkpoint is not None:
+                checkpoint()
+
+        self.workout_ids.update(workout_ids)
+        self.exercise_ids.update(exercise_ids)
+        self.next_order.update(next_order)
+        self.next_set_number.update(next_set_number)
+        return touched
+
+    def save_progress(self):
+        """Met à jour les compteurs de l'import sans toucher aux autres champs"""
+        type(self.csv_import).objects.filter(pk=self.csv_import.pk).update(
+            successful_imports=self.successful,
+            failed_imports=self.failed,
+            total_rows=self.successful + self.failed,
+        )
+
+    def load_machines(self):
+        """Charge la correspondance nom de machine → identifiant (une requête)"""
+        from apps.machines.models import Machine
+
+        self.machine_ids = {
+            name.casefold(): machine_id
+            for machine_id, name in Machine.objects.values_list('id', 'name')
+        }
+
+    def import_rows(self, rows, line_number, checkpoint=None):
+        """
+        Importe un flux de lignes validées par lots
+
+        Args:
+            rows: Itérateur de lignes validées
+            line_number: Fonction retournant la ligne courante du fichier
+            checkpoint: Fonction de point de reprise appelée avec le lot,
+                dans sa transaction (remplace save_progress)
+
+        Seul un lot refusé pour ses données est compté en échec : une erreur
+        d'infrastructure interrompt l'import, qui reprend au dernier lot écrit.
+        """
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            try:
+                self.write_chunk(chunk, (lambda: checkpoint(chunk)) if checkpoint else None)
+                self.successful += len(chunk)
+            except ROW_DATABASE_ERRORS as exc:
+                self.record_failure(line_number(), f"lot rejeté ({exc})", count=len(chunk))
+            if checkpoint is None:
+                self.save_progress()
+
+    def run(self) -> Tuple[int, int]:
+        """
+        Lit le fichier et importe toutes les lignes valides
+
+        Returns:
+            Tuple (lignes importées, lignes en échec)
+        """
+        self.load_machines()
+
+        with self.csv_import.file.open('rb') as stream:
+            reader = self.open_reader(stream)
+            self.import_rows(self.iter_rows(reader), lambda: reader.line_num)
+
+        return self.successful, self.failed
+
+    # Import parallèle par plages d'octets
+
+    @staticmethod
+    def read_record(stream) -> bytes:
+        """
+        Lit un enregistrement CSV brut complet
+
+        Un champ entre guillemets peut contenir des sauts de ligne : la
+        lecture continue tant que le nombre de guillemets est impair (les
+        guillemets échappés sont doublés et ne changent pas la parité).
+        """
+        record = stream.readline()
+        while record.count(b'"') % 2:
+            line = stream.readline()
+            if not line:
+                break
+            record += line
+        return record
+
+    def iter_records(self, stream) -> Iterator[Tuple[int, bytes]]:
+        """Génère (position, enregistrement brut) depuis la position courante"""
+        position = stream.tell()
+        while True:
+            record = self.read_record(stream)
+            if not record:
+                return
+            yield position, record
+            position += len(record)
+
+    def read_header(self, stream) -> Tuple[list, str, int]:
+        """
+        Lit l'en-tête du fichier
+
+        Returns:
+            Tuple (noms de colonnes, séparateur, position de fin d'en-tête)
+        """
+        stream.seek(0)
+        header = self.read_record(stream)
+        header_end = stream.tell()
+        try:
+            text = header.decode('utf-8-sig')
+        except UnicodeDecodeError as exc:
+            raise CSVFileError(f"en-tête illisible : {exc}") from exc
+
+        delimiter = self.delimiter
+        if not delimiter:
+            try:
+                delimiter = csv.Sniffer().sniff(text, delimiters=',;\t').delimiter
+            except csv.Error:
+                delimiter = ','
+
+        fieldnames = next(csv.reader(io.StringIO(text, newline=''), delimiter=delimiter))
+        return fieldnames, delimiter, header_end
+
+    def group_key(self, record: bytes, fieldnames: list, delimiter: str) -> Tuple[str, str]:
+        """Clé de séance (date, nom) d'un enregistrement brut"""
+        text = io.StringIO(record.decode('utf-8', errors='replace'), newline='')
+        values = next(csv.reader(text, delimiter=delimiter), [])
+        row = dict(zip(fieldnames, values))
+        return self.value(row, 'date'), self.value(row, 'workout')
+
+    def compute_ranges(self, parts: int, min_bytes: int = 256 * 1024) -> list:
+        """
+        Découpe le fichier en plages d'octets traitables en parallèle
+
+        Le fichier est parcouru enregistrement par enregistrement : une plage
+        commence toujours au début d'un enregistrement (jamais dans un champ
+        entre guillemets sur plusieurs lignes) et au début d'une séance.
+
+        Deux plages importées en parallèle ne doivent pas contenir la même
+        séance : si les lignes d'une séance ne sont pas regroupées dans le
+        fichier, il est importé en une seule plage.
+
+        Returns:
+            Liste de [début, fin, numéro de la première ligne]
+        """
+        with self.csv_import.file.open('rb') as stream:
+            fieldnames, delimiter, header_end = self.read_header(stream)
+            stream.seek(0, io.SEEK_END)
+            size = stream.tell()
+            stream.seek(header_end)
+
+            step = max(min_bytes, -(-(size - header_end) // max(parts, 1)))
+            # En-tête = ligne 1
+            ranges = [[header_end, size, 2]]
+            target = header_end + step
+            line_number = 2
+            previous_key = None
+            seen = set()
+            for position, record in self.iter_records(stream):
+                key = self.group_key(record, fieldnames, delimiter)
+                if key != previous_key:
+                    if key in seen:
+                        return [[header_end, size, 2]]
+                    seen.add(key)
+                    previous_key = key
+                    if position >= target:
+                        ranges[-1][1] = position
+                        ranges.append([position, size, line_number])
+                        target = position + step
+                line_number += record.count(b'\n')
+
+        return ranges
+
+    def restore(self, state: Dict):
+        """
+        Reprend l'état d'une plage interrompue (compteurs et séance en cours)
+
+        La dernière séance écrite peut se poursuivre après le point de
+        reprise : ses exercices et numéros de série sont rechargés pour
+        ne pas la dupliquer.
+        """
+        from django.db.models import Max
+
+        from apps.workouts.models import Exercise, Workout
+
+        self.successful = state.get('successful', 0)
+        self.failed = state.get('failed', 0)
+        self.errors = list(state.get('errors', []))
+
+        if not state.get('last_workout'):
+            return
+        date, name = state['last_workout']
+        date = datetime.fromisoformat(date)
+        workout_id = Workout.objects.filter(
+            user_id=self.csv_import.user_id, date=date, name=name
+        ).order_by('-pk').values_list('pk', flat=True).first()
+        if workout_id is None:
+            return
+
+        self.workout_ids[(date, name)] = workout_id
+        exercises = Exercise.objects.filter(workout_id=workout_id).annotate(
+            last_set=Max('series__set_number')
+        ).values_list('pk', 'machine_id', 'order', 'last_set')
+        for exercise_id, machine_id, order, last_set in exercises:
+            self.exercise_ids[(workout_id, machine_id)] = exercise_id
+            self.next_order[workout_id] = max(self.next_order.get(workout_id, 0), order)
+            self.next_set_number[exercise_id] = last_set or 0
+
+    def run_range(self, start: int, end: int, first_line: int,
+                  state: Optional[Dict] = None, checkpoint=None) -> Tuple[int, int]:
+        """
+        Importe les lignes comprises entre deux positions d'octets
+
+        Args:
+            start: Position de début (début d'enregistrement)
+            end: Position de fin (exclue)
+            first_line: Numéro de ligne correspondant à `start`
+            state: Dernier point de reprise enregistré pour cette plage
+            checkpoint: Fonction recevant le nouvel état après chaque lot
+                (dans sa transaction) et en fin de plage
+
+        Returns:
+            Tuple (lignes importées, lignes en échec)
+        """
+        self.load_machines()
+        if state:
+            self.restore(state)
+            start, first_line = state['offset'], state['line']
+
+        with self.csv_import.file.open('rb') as stream:
+            fieldnames, delimiter, header_end = self.read_header(stream)
+            position = max(start, header_end)
+            stream.seek(position)
+
+            def lines():
+                nonlocal position
+                while position < end:
+                    line = stream.readline()
+                    if not line:
+                        return
+                    position += len(line)
+                    yield line.decode('utf-8')
+
+            reader = csv.DictReader(lines(), fieldnames=fieldnames, delimiter=delimiter)
+
+            def current_state(chunk=()):
+                last = chunk[-1] if chunk else None
+                return {
+                    'offset': position,
+                    'line': first_line + reader.line_num,
+                    'successful': self.successful + len(chunk),
+                    'failed': self.failed,
+                    'errors': self.errors,
+                    'last_workout': [last['date'].isoformat(), last['workout']] if last else None,
+                    'done': False,
+                }
+
+            self.import_rows(
+                self.iter_rows(reader, first_line),
+                lambda: first_line + reader.line_num - 1,
+                (lambda chunk: checkpoint(current_state(chunk))) if checkpoint else None
+            )
+
+            if checkpoint:
+                checkpoint({**current_state(), 'offset': end, 'done': True})
+
+        return self.successful, self.failed
+
+    def report(self) -> str:
+        """Résumé textuel de l'import"""
+        return (
+            f"{self.successful} ligne(s) importée(s), {self.failed} en échec, "
+            f"{len(self.workout_ids)} séance(s) créée(s)."
+        )
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.calendar.models import WeeklyTemplate
+
+
+class Command(BaseCommand):
+    """
+    Génère les plans d'entraînement à partir des templates hebdomadaires actifs
+    """
+    help = "Génère les plans des prochaines semaines pour tous les templates hebdomadaires actifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--weeks',
+            type=int,
+            default=12,
+            help="Nombre de semaines à générer"
+        )
+
+    def handle(self, *args, **options):
+        # Génération à partir du lundi suivant
+        today = timezone.localdate()
+        start_date = today + timedelta(days=7 - today.weekday())
+
+        templates = WeeklyTemplate.objects.filter(is_active=True).select_related(
+            *WeeklyTemplate.DAY_FIELDS.values()
+        )
+
+        created = 0
+        for weekly_template in templates.iterator(chunk_size=200):
+            created += len(weekly_template.generate_plans(start_date, weeks=options['weeks']))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} plan(s) créé(s) à partir du {start_date.strftime("%d/%m/%Y")}.'
+        ))
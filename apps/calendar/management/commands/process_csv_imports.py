@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from apps.calendar.models import CSVImport
+from apps.calendar.tasks import start_parallel_import
+
+
+class Command(BaseCommand):
+    """
+    Traite les imports CSV en attente
+    """
+    help = "Importe les fichiers CSV en attente (ou un import précis avec --id)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--id',
+            type=int,
+            help="Identifiant d'un import à traiter"
+        )
+        parser.add_argument(
+            '--parallel',
+            type=int,
+            default=0,
+            help="Nombre de plages traitées en parallèle par Celery (reprend un import interrompu)"
+        )
+
+    def handle(self, *args, **options):
+        imports = CSVImport.objects.filter(status='pending').order_by('created_at')
+        if options['id']:
+            imports = CSVImport.objects.filter(pk=options['id'])
+
+        for csv_import in imports:
+            if options['parallel']:
+                start_parallel_import(csv_import, options['parallel'])
+                self.stdout.write(f'{csv_import.filename} : import parallèle lancé')
+                continue
+
+            if csv_import.process():
+                self.stdout.write(self.style.SUCCESS(
+                    f'{csv_import.filename} : {csv_import.import_log}'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'{csv_import.filename} : {csv_import.error_details}'
+                ))
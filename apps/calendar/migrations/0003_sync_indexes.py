@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['user', 'updated_at'], name='calendar_ca_user_id_1bc544_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['user', 'updated_at'], name='calendar_wo_user_id_66f9e0_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:25
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_effective_end_date(apps, schema_editor):
+    CalendarEvent = apps.get_model('calendar', 'CalendarEvent')
+
+    CalendarEvent.objects.filter(end_date__isnull=False).update(effective_end_date=F('end_date'))
+    CalendarEvent.objects.filter(end_date__isnull=True, all_day=True).update(
+        effective_end_date=F('start_date') + timedelta(days=1)
+    )
+    CalendarEvent.objects.filter(end_date__isnull=True, all_day=False).update(
+        effective_end_date=F('start_date')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar', '0003_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarevent',
+            name='effective_end_date',
+            field=models.DateTimeField(editable=False, help_text='Date de fin, ou fin implicite pour un événement sans date de fin', null=True, verbose_name='Fin effective'),
+        ),
+        migrations.RunPython(backfill_effective_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='calendarevent',
+            name='effective_end_date',
+            field=models.DateTimeField(editable=False, help_text='Date de fin, ou fin implicite pour un événement sans date de fin', verbose_name='Fin effective'),
+        ),
+        migrations.AddIndex(
+            model_name='calendarevent',
+            index=models.Index(fields=['user', 'effective_end_date'], name='calendar_ca_user_id_ff4fd6_idx'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:27
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from dateutil.relativedelta import relativedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+# Copie figée de apps.calendar.recurrence.next_reminder à la création du champ :
+# la migration ne dépend pas du code courant de l'application
+
+DAYS_PER_PERIOD = {
+    'daily': 1,
+    'weekly': 7,
+}
+
+
+def occurrence_date(base_date, repeat_type, index, interval):
+    if repeat_type == 'monthly':
+        return base_date + relativedelta(months=index * interval)
+    return base_date + timedelta(days=index * interval * DAYS_PER_PERIOD[repeat_type])
+
+
+def first_index(base_date, repeat_type, interval, window_date):
+    if window_date <= base_date:
+        return 0
+
+    if repeat_type == 'monthly':
+        months = (window_date.year - base_date.year) * 12 + window_date.month - base_date.month
+        return max(0, months // interval - 1)
+
+    step = interval * DAYS_PER_PERIOD[repeat_type]
+    return max(0, (window_date - base_date).days // step - 1)
+
+
+def iter_occurrences(first, repeat_type, interval, until, window_start):
+    if repeat_type == 'none':
+        if first >= window_start:
+            yield first
+        return
+
+    tz = timezone.get_current_timezone()
+    first_local = timezone.localtime(first, tz)
+    base_date, base_time = first_local.date(), first_local.time()
+
+    index = first_index(
+        base_date, repeat_type, interval, timezone.localtime(window_start, tz).date()
+    )
+    while True:
+        day = occurrence_date(base_date, repeat_type, index, interval)
+        if until is not None and day > until:
+            return
+
+        occurrence = timezone.make_aware(datetime.combine(day, base_time), tz)
+        occurrence = occurrence.astimezone(dt_timezone.utc).astimezone(tz)
+        if occurrence >= window_start:
+            yield occurrence
+
+        index += 1
+
+
+def next_reminder(first, repeat_type, interval, until, minutes_before, now):
+    notice = timedelta(minutes=minutes_before)
+    for occurrence in iter_occurrences(first, repeat_type, interval, until, now + notice):
+        if occurrence - notice > now:
+            return occurrence - notice
+    return None
+
+
+def backfill_remind_at(apps, schema_editor):
+    WorkoutPlan = apps.get_model('calendar', 'WorkoutPlan')
+
+    now = timezone.now()
+    plans = list(WorkoutPlan.objects.filter(is_active=True, reminder_enabled=True).only(
+        'scheduled_date', 'repeat_type', 'repeat_interval', 'repeat_until', 'reminder_minutes_before'
+    ))
+    for plan in plans:
+        plan.remind_at = next_reminder(
+            plan.scheduled_date, plan.repeat_type, plan.repeat_interval,
+            plan.repeat_until, plan.reminder_minutes_before, now
+        )
+    WorkoutPlan.objects.bulk_update(plans, ['remind_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar', '0004_calendarevent_effective_end_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutplan',
+            name='remind_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Prochain rappel'),
+        ),
+        migrations.RunPython(backfill_remind_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(condition=models.Q(('remind_at__isnull', False)), fields=['remind_at'], name='calendar_plan_remind_at_idx'),
+        ),
+    ]
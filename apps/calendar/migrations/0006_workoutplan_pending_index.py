@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar', '0005_workoutplan_remind_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(condition=models.Q(('workout_created__isnull', True)), fields=['scheduled_date'], name='calendar_plan_pending_idx'),
+        ),
+    ]
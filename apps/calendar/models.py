@@ -1,14 +1,309 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Now
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from datetime import datetime, time, timedelta
+import heapq
+import itertools
 import json
 
+from .recurrence import iter_occurrences, next_reminder
+
+
+def bulk_create_workouts(occurrences, batch_size=1000):
+    """
+    Insère les séances (et leurs exercices) de couples (plan, date)
+
+    Les exercices sont copiés du template du plan, chargés en une requête.
+    Les statistiques dénormalisées des séances sont écrites directement
+    (aucune série à la création), sans passer par les signaux.
+
+    Returns:
+        Séances créées, dans l'ordre des couples
+    """
+    from apps.workouts.models import Exercise, TemplateExercise, Workout
+
+    definitions = {}
+    template_exercises = TemplateExercise.objects.filter(
+        template_id__in={plan.template_id for plan, _ in occurrences if plan.template_id}
+    ).order_by('template', 'order')
+    for template_exercise in template_exercises:
+        definitions.setdefault(template_exercise.template_id, []).append(template_exercise)
+
+    workouts = Workout.objects.bulk_create([
+        Workout(
+            user_id=plan.user_id,
+            template_id=plan.template_id,
+            name=plan.title,
+            description=plan.description,
+            date=date,
+            planned_duration_minutes=plan.duration_minutes,
+            status='planned',
+            total_exercises=len(definitions.get(plan.template_id, [])),
+        )
+        for plan, date in occurrences
+    ], batch_size=batch_size)
+
+    Exercise.objects.bulk_create([
+        template_exercise.build_exercise(workout.pk)
+        for (plan, _), workout in zip(occurrences, workouts)
+        for template_exercise in definitions.get(plan.template_id, [])
+    ], batch_size=batch_size)
+
+    return workouts
+
+
+class WorkoutPlanQuerySet(models.QuerySet):
+    """QuerySet personnalisé pour les plans d'entraînement"""
+
+    def occurring_between(self, start, end):
+        """
+        Plans actifs ayant au moins une occurrence possible dans [start, end[
+
+        Les plans récurrents sont retenus tant que leur date de fin de
+        répétition n'est pas dépassée ; l'expansion fine se fait en mémoire.
+        """
+        recurring = ~models.Q(repeat_type='none') & (
+            models.Q(repeat_until__isnull=True) |
+            models.Q(repeat_until__gte=timezone.localdate(start))
+        )
+        single = models.Q(repeat_type='none', scheduled_date__gte=start)
+
+        return self.filter(
+            recurring | single,
+            is_active=True,
+            scheduled_date__lt=end
+        )
+
+    def expand(self, start, end):
+        """
+        Génère les couples (plan, occurrence) dans [start, end[, triés par date
+
+        Une seule requête est exécutée ; les occurrences sont calculées
+        paresseusement sans être stockées.
+        """
+        def stream(plan):
+            for occurrence in plan.occurrences(start, end):
+                yield occurrence, plan.pk, plan
+
+        streams = [stream(plan) for plan in self.occurring_between(start, end)]
+        for occurrence, _, plan in heapq.merge(*streams):
+            yield plan, occurrence
+
+    def materialize_events(self, start, end, batch_size=1000):
+        """
+        Crée les événements de calendrier des occurrences dans [start, end[
+
+        Les occurrences déjà matérialisées (même plan, même date) sont
+        ignorées. Les insertions sont faites par lots avec bulk_create.
+
+        Returns:
+            Nombre d'événements créés
+        """
+        plans = self.occurring_between(start, end)
+        existing = set(
+            CalendarEvent.objects.filter(
+                workout_plan__in=plans,
+                start_date__gte=start,
+                start_date__lt=end
+            ).values_list('workout_plan_id', 'start_date')
+        )
+
+        events = (
+            CalendarEvent(
+                user_id=plan.user_id,
+                event_type='workout',
+                title=plan.title,
+                description=plan.description,
+                start_date=occurrence,
+                end_date=occurrence + timedelta(minutes=plan.duration_minutes),
+                effective_end_date=occurrence + timedelta(minutes=plan.duration_minutes),
+                workout_plan=plan,
+            )
+            for plan, occurrence in self.expand(start, end)
+            if (plan.pk, occurrence) not in existing
+        )
+
+        created = 0
+        while True:
+            batch = list(itertools.islice(events, batch_size))
+            if not batch:
+                return created
+            CalendarEvent.objects.bulk_create(batch)
+            created += len(batch)
+
+    def due_on(self, day):
+        """
+        Plans ponctuels actifs prévus le jour donné (heure locale) dont la
+        séance reste à créer
+
+        Les plans récurrents sont traités occurrence par occurrence par
+        create_occurrence_workouts.
+        """
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        return self.filter(
+            repeat_type='none',
+            is_active=True,
+            workout_created__isnull=True,
+            scheduled_date__gte=start,
+            scheduled_date__lt=start + timedelta(days=1)
+        )
+
+    def create_workouts(self, batch_size=1000):
+        """
+        Crée en masse les séances des plans du queryset, avec les exercices
+        définis par leur template
+
+        Tout est fait dans une transaction : les plans sont verrouillés et
+        ceux dont la séance existe déjà sont ignorés, séances et exercices
+        sont insérés avec bulk_create, puis workout_created est renseigné par
+        un seul bulk_update.
+
+        Returns:
+            Liste des séances créées
+        """
+        with transaction.atomic():
+            plans = list(
+                self.select_for_update()
+                .filter(workout_created__isnull=True)
+                .only(
+                    'id', 'user', 'template', 'title', 'description',
+                    'scheduled_date', 'duration_minutes'
+                )
+                .order_by('pk')
+            )
+            if not plans:
+                return []
+
+            workouts = bulk_create_workouts(
+                [(plan, plan.scheduled_date) for plan in plans], batch_size
+            )
+
+            for plan, workout in zip(plans, workouts):
+                plan.workout_created_id = workout.pk
+                plan.updated_at = Now()
+            WorkoutPlan.objects.bulk_update(
+                plans, ['workout_created', 'updated_at'], batch_size=batch_size
+            )
+
+        return workouts
+
+    def create_occurrence_workouts(self, start, end, batch_size=1000):
+        """
+        Crée les séances des occurrences des plans récurrents dans [start, end[
+
+        Un plan n'a qu'un champ workout_created : chaque occurrence est
+        rattachée à sa séance par l'événement de calendrier (plan, date),
+        créé ou complété au passage, comme le fait materialize_events. Les
+        occurrences ayant déjà une séance sont ignorées ; la première
+        occurrence renseigne aussi workout_created.
+
+        Returns:
+            Liste des séances créées
+        """
+        with transaction.atomic():
+            occurrences = list(
+                self.exclude(repeat_type='none').select_for_update().expand(start, end)
+            )
+            if not occurrences:
+                return []
+
+            events = {
+                (event.workout_plan_id, event.start_date): event
+                for event in CalendarEvent.objects.filter(
+                    workout_plan__in={plan.pk for plan, _ in occurrences},
+                    start_date__gte=start,
+                    start_date__lt=end
+                )
+            }
+            pending = [
+                (plan, occurrence) for plan, occurrence in occurrences
+                if not getattr(events.get((plan.pk, occurrence)), 'workout_id', None)
+                and not (plan.workout_created_id and occurrence == plan.scheduled_date)
+            ]
+            if not pending:
+                return []
+
+            workouts = bulk_create_workouts(pending, batch_size)
+
+            new_events, linked_events, first_plans = [], [], []
+            for (plan, occurrence), workout in zip(pending, workouts):
+                event = events.get((plan.pk, occurrence))
+                if event is None:
+                    occurrence_end = occurrence + timedelta(minutes=plan.duration_minutes)
+                    new_events.append(CalendarEvent(
+                        user_id=plan.user_id,
+                        event_type='workout',
+                        title=plan.title,
+                        description=plan.description,
+                        start_date=occurrence,
+                        end_date=occurrence_end,
+                        effective_end_date=occurrence_end,
+                        workout_plan=plan,
+                        workout_id=workout.pk,
+                    ))
+                else:
+                    event.workout_id = workout.pk
+                    event.updated_at = Now()
+                    linked_events.append(event)
+                if occurrence == plan.scheduled_date:
+                    plan.workout_created_id = workout.pk
+                    plan.updated_at = Now()
+                    first_plans.append(plan)
+
+            CalendarEvent.objects.bulk_create(new_events, batch_size=batch_size)
+            CalendarEvent.objects.bulk_update(
+                linked_events, ['workout', 'updated_at'], batch_size=batch_size
+            )
+            WorkoutPlan.objects.bulk_update(
+                first_plans, ['workout_created', 'updated_at'], batch_size=batch_size
+            )
+
+        return workouts
+
+    def create_workouts_on(self, day, batch_size=1000):
+        """
+        Crée les séances du jour donné : plans ponctuels et occurrences des
+        plans récurrents (opération idempotente)
+
+        Returns:
+            Liste des séances créées
+        """
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        with transaction.atomic():
+            return (
+                self.due_on(day).create_workouts(batch_size) +
+                self.filter(is_active=True).create_occurrence_workouts(
+                    start, start + timedelta(days=1), batch_size
+                )
+            )
+
+    def refresh_reminders(self, now=None):
+        """
+        Recalcule la date du prochain rappel des plans
+
+        À appeler après une mise à jour en masse (update) des champs de
+        planification, qui contourne save().
+
+        Returns:
+            Nombre de plans mis à jour
+        """
+        now = now or timezone.now()
+        plans = list(self.only(*WorkoutPlan.REMINDER_FIELDS))
+        for plan in plans:
+            plan.remind_at = plan.next_reminder(now)
+            plan.updated_at = Now()
+        WorkoutPlan.objects.bulk_update(plans, ['remind_at', 'updated_at'], batch_size=1000)
+        return len(plans)
+
 
 class WorkoutPlan(models.Model):
     """
     Modèle pour la planification des séances d'entraînement
     """
 
+    objects = WorkoutPlanQuerySet.as_manager()
+
     REPEAT_TYPES = [
         ('none', 'Aucune répétition'),
         ('daily', 'Quotidien'),
@@ -100,6 +395,14 @@ class WorkoutPlan(models.Model):
         help_text="Nombre de minutes avant la séance pour le rappel"
     )
 
+    # Prochain rappel à envoyer, maintenu par save() et la tâche dispatch_reminders
+    remind_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Prochain rappel"
+    )
+
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -120,8 +423,27 @@ class WorkoutPlan(models.Model):
         indexes = [
             models.Index(fields=['user', 'scheduled_date']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['user', 'updated_at']),
+            # Index partiel : seuls les rappels en attente y figurent
+            models.Index(
+                fields=['remind_at'],
+                condition=models.Q(remind_at__isnull=False),
+                name='calendar_plan_remind_at_idx'
+            ),
+            # Plans dont la séance reste à créer (tâche quotidienne)
+            models.Index(
+                fields=['scheduled_date'],
+                condition=models.Q(workout_created__isnull=True),
+                name='calendar_plan_pending_idx'
+            ),
         ]
 
+    # Champs dont dépend la date du prochain rappel
+    REMINDER_FIELDS = (
+        'scheduled_date', 'repeat_type', 'repeat_interval', 'repeat_until',
+        'is_active', 'reminder_enabled', 'reminder_minutes_before'
+    )
+
     def __str__(self):
         return f"{self.title} - {self.scheduled_date.strftime('%d/%m/%Y %H:%M')}"
 
@@ -136,27 +458,53 @@ class WorkoutPlan(models.Model):
         today = timezone.now().date()
         return self.scheduled_date.date() == today
 
+    def occurrences(self, start=None, end=None):
+        """
+        Génère paresseusement les occurrences du plan dans [start, end[
+
+        Args:
+            start: Début de la fenêtre (aware, optionnel)
+            end: Fin de la fenêtre (aware, optionnel)
+        """
+        return iter_occurrences(
+            self.scheduled_date,
+            self.repeat_type,
+            self.repeat_interval,
+            self.repeat_until,
+            start,
+            end
+        )
+
+    def next_reminder(self, now=None):
+        """Date du prochain rappel après now (None si aucun rappel n'est à envoyer)"""
+        if not (self.is_active and self.reminder_enabled):
+            return None
+        return next_reminder(
+            self.scheduled_date,
+            self.repeat_type,
+            self.repeat_interval,
+            self.repeat_until,
+            self.reminder_minutes_before,
+            now or timezone.now()
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(self.REMINDER_FIELDS) & set(update_fields):
+            self.remind_at = self.next_reminder()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'remind_at'}
+        super().save(*args, **kwargs)
+
     def create_workout(self):
-        """Crée une séance d'entraînement basée sur ce plan"""
+        """Crée une séance d'entraînement (et ses exercices) basée sur ce plan"""
         if self.workout_created:
             return self.workout_created
 
-        from apps.workouts.models import Workout
-
-        workout = Workout.objects.create(
-            user=self.user,
-            template=self.template,
-            name=self.title,
-            description=self.description,
-            date=self.scheduled_date,
-            planned_duration_minutes=self.duration_minutes,
-            status='planned'
-        )
+        WorkoutPlan.objects.filter(pk=self.pk).create_workouts()
+        self.refresh_from_db(fields=['workout_created', 'updated_at'])
 
-        self.workout_created = workout
-        self.save(update_fields=['workout_created'])
-
-        return workout
+        return self.workout_created
 
 
 class CSVImport(models.Model):
@@ -275,6 +623,50 @@ class CSVImport(models.Model):
         self.processed_at = timezone.now()
         self.save()
 
+    def save_checkpoint(self, index, state):
+        """
+        Enregistre le point de reprise d'une plage d'import parallèle
+
+        La ligne est verrouillée pour que les plages traitées en parallèle
+        ne s'écrasent pas mutuellement import_options ; les compteurs
+        reflètent la progression cumulée de toutes les plages.
+        """
+        with transaction.atomic():
+            locked = CSVImport.objects.select_for_update().get(pk=self.pk)
+            checkpoints = locked.import_options.setdefault('checkpoints', {})
+            checkpoints[str(index)] = state
+
+            successful = sum(entry['successful'] for entry in checkpoints.values())
+            failed = sum(entry['failed'] for entry in checkpoints.values())
+            CSVImport.objects.filter(pk=self.pk).update(
+                import_options=locked.import_options,
+                successful_imports=successful,
+                failed_imports=failed,
+                total_rows=successful + failed,
+            )
+        self.import_options = locked.import_options
+
+    def process(self):
+        """
+        Importe le fichier CSV (séances, exercices et séries)
+
+        Returns:
+            True si l'import s'est terminé, False en cas d'échec
+        """
+        from .importers import CSVWorkoutImporter
+
+        self.start_processing()
+        importer = CSVWorkoutImporter(self)
+        try:
+            success_count, failed_count = importer.run()
+        except Exception as exc:
+            self.fail_processing(f"Erreur de lecture du fichier : {exc}")
+            return False
+
+        self.error_details = "\n".join(importer.errors)
+        self.complete_processing(success_count, failed_count, importer.report())
+        return True
+
 
 class CalendarEvent(models.Model):
     """
@@ -328,6 +720,14 @@ class CalendarEvent(models.Model):
         verbose_name="Toute la journée"
     )
 
+    # Fin toujours renseignée, maintenue par save() : permet de trouver les
+    # événements chevauchant une fenêtre par un parcours d'index
+    effective_end_date = models.DateTimeField(
+        editable=False,
+        verbose_name="Fin effective",
+        help_text="Date de fin, ou fin implicite pour un événement sans date de fin"
+    )
+
     # Relations
     workout = models.ForeignKey(
         'workouts.Workout',
@@ -363,12 +763,29 @@ class CalendarEvent(models.Model):
         ordering = ['start_date']
         indexes = [
             models.Index(fields=['user', 'start_date']),
+            models.Index(fields=['user', 'effective_end_date']),
             models.Index(fields=['event_type']),
+            models.Index(fields=['user', 'updated_at']),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.start_date.strftime('%d/%m/%Y')})"
 
+    def get_effective_end_date(self):
+        """Fin de l'événement : un jour entier, ou ponctuel à défaut de date de fin"""
+        if self.end_date:
+            return self.end_date
+        if self.all_day:
+            return self.start_date + timedelta(days=1)
+        return self.start_date
+
+    def save(self, *args, **kwargs):
+        self.effective_end_date = self.get_effective_end_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'start_date', 'end_date', 'all_day'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_end_date'}
+        super().save(*args, **kwargs)
+
     @property
     def duration(self):
         """Calcule la durée de l'événement"""
@@ -491,32 +908,56 @@ class WeeklyTemplate(models.Model):
         status = " (Actif)" if self.is_active else ""
         return f"{self.name}{status}"
 
+    # Champ du template pour chaque jour (0=lundi, 6=dimanche)
+    DAY_FIELDS = {
+        0: 'monday_template',
+        1: 'tuesday_template',
+        2: 'wednesday_template',
+        3: 'thursday_template',
+        4: 'friday_template',
+        5: 'saturday_template',
+        6: 'sunday_template',
+    }
+
     def get_template_for_day(self, day_of_week):
         """Retourne le template pour un jour donné (0=lundi, 6=dimanche)"""
-        day_templates = {
-            0: self.monday_template,
-            1: self.tuesday_template,
-            2: self.wednesday_template,
-            3: self.thursday_template,
-            4: self.friday_template,
-            5: self.saturday_template,
-            6: self.sunday_template,
-        }
-        return day_templates.get(day_of_week)
+        field_name = self.DAY_FIELDS.get(day_of_week)
+        if field_name:
+            return getattr(self, field_name)
+        return None
+
+    def get_day_templates(self):
+        """
+        Retourne les templates de la semaine {jour: template}
+
+        Les templates déjà chargés (select_related) sont réutilisés, les
+        autres sont récupérés en une seule requête.
+        """
+        from apps.workouts.models import WorkoutTemplate
+
+        day_templates = {}
+        missing = {}
+        for day, field_name in self.DAY_FIELDS.items():
+            field = self._meta.get_field(field_name)
+            template_id = getattr(self, field.attname)
+            if template_id is None:
+                continue
+            if field.is_cached(self):
+                day_templates[day] = getattr(self, field_name)
+            else:
+                missing[day] = template_id
+
+        if missing:
+            templates = WorkoutTemplate.objects.in_bulk(set(missing.values()))
+            for day, template_id in missing.items():
+                if template_id in templates:
+                    day_templates[day] = templates[template_id]
+
+        return day_templates
 
     def set_template_for_day(self, day_of_week, template):
         """Définit le template pour un jour donné"""
-        day_fields = {
-            0: 'monday_template',
-            1: 'tuesday_template',
-            2: 'wednesday_template',
-            3: 'thursday_template',
-            4: 'friday_template',
-            5: 'saturday_template',
-            6: 'sunday_template',
-        }
-
-        field_name = day_fields.get(day_of_week)
+        field_name = self.DAY_FIELDS.get(day_of_week)
         if field_name:
             setattr(self, field_name, template)
             self.save(update_fields=[field_name])
@@ -535,25 +976,60 @@ class WeeklyTemplate(models.Model):
 
     def generate_week_plan(self, start_date):
         """Génère un plan de la semaine à partir de ce template"""
-        from datetime import timedelta
-
-        plans_created = []
+        return self.generate_plans(start_date, weeks=1)
+
+    def generate_plans(self, start_date, weeks=1):
+        """
+        Génère les plans de plusieurs semaines à partir de ce template
+
+        Les templates du jour sont chargés une seule fois, les plans sont
+        construits en mémoire puis insérés avec un seul bulk_create. Les
+        jours ayant déjà un plan pour l'utilisateur sont ignorés.
+
+        Args:
+            start_date: Premier jour (date ou datetime)
+            weeks: Nombre de semaines à générer
+
+        Returns:
+            Liste des plans créés
+        """
+        if isinstance(start_date, datetime):
+            start_date = timezone.localtime(start_date).date()
+
+        day_templates = self.get_day_templates()
+        if not day_templates:
+            return []
+
+        def local_datetime(day, hour=0):
+            return timezone.make_aware(datetime.combine(day, time(hour=hour)))
+
+        end_date = start_date + timedelta(days=7 * weeks)
+        planned_days = {
+            timezone.localtime(scheduled_date).date()
+            for scheduled_date in WorkoutPlan.objects.filter(
+                user_id=self.user_id,
+                scheduled_date__gte=local_datetime(start_date),
+                scheduled_date__lt=local_datetime(end_date)
+            ).values_list('scheduled_date', flat=True)
+        }
 
-        for day_offset in range(7):
+        now = timezone.now()
+        plans = []
+        for day_offset in range(7 * weeks):
             day_date = start_date + timedelta(days=day_offset)
-            day_of_week = day_date.weekday()  # 0=lundi, 6=dimanche
-
-            template = self.get_template_for_day(day_of_week)
-            if template:
-                # Créer un plan pour ce jour
-                plan = WorkoutPlan.objects.create(
-                    user=self.user,
-                    template=template,
-                    title=template.name,
-                    description=f"Généré à partir du template '{self.name}'",
-                    scheduled_date=day_date.replace(hour=8, minute=0),  # 8h par défaut
-                    duration_minutes=template.target_duration_minutes,
-                )
-                plans_created.append(plan)
-
-        return plans_created
\ No newline at end of file
+            template = day_templates.get(day_date.weekday())  # 0=lundi, 6=dimanche
+            if template is None or day_date in planned_days:
+                continue
+
+            plan = WorkoutPlan(
+                user_id=self.user_id,
+                template=template,
+                title=template.name,
+                description=f"Généré à partir du template '{self.name}'",
+                scheduled_date=local_datetime(day_date, hour=8),  # 8h par défaut
+                duration_minutes=template.target_duration_minutes,
+            )
+            plan.remind_at = plan.next_reminder(now)
+            plans.append(plan)
+
+        return WorkoutPlan.objects.bulk_create(plans)
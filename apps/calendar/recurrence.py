@@ -0,0 +1,124 @@
+"""
+Expansion des plans d'entraînement récurrents
+Génère paresseusement les occurrences d'un plan dans une fenêtre de temps
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterator, Optional
+
+from dateutil.relativedelta import relativedelta
+from django.utils import timezone
+
+# Nombre de jours entre deux occurrences pour un intervalle de 1
+DAYS_PER_PERIOD = {
+    'daily': 1,
+    'weekly': 7,
+}
+
+
+def occurrence_date(base_date, repeat_type: str, index: int, interval: int = 1):
+    """
+    Calcule la date (locale) de la n-ième occurrence d'un plan
+
+    Les mois sont toujours ajoutés à partir de la date initiale pour éviter
+    la dérive (31/01 → 28/02 → 31/03 et non 28/03).
+    """
+    if repeat_type == 'monthly':
+        return base_date + relativedelta(months=index * interval)
+    return base_date + timedelta(days=index * interval * DAYS_PER_PERIOD[repeat_type])
+
+
+def first_index(base_date, repeat_type: str, interval: int, window_date) -> int:
+    """Index de la première occurrence pouvant tomber dans la fenêtre"""
+    if window_date <= base_date:
+        return 0
+
+    if repeat_type == 'monthly':
+        months = (window_date.year - base_date.year) * 12 + window_date.month - base_date.month
+        return max(0, months // interval - 1)
+
+    step = interval * DAYS_PER_PERIOD[repeat_type]
+    return max(0, (window_date - base_date).days // step - 1)
+
+
+def iter_occurrences(
+    first: datetime,
+    repeat_type: str,
+    interval: int = 1,
+    until=None,
+    window_start: Optional[datetime] = None,
+    window_end: Optional[datetime] = None,
+    tz=None
+) -> Iterator[datetime]:
+    """
+    Génère les occurrences d'un plan dans la fenêtre [window_start, window_end[
+
+    L'heure locale de la première séance est conservée à chaque occurrence,
+    y compris lors des changements d'heure (Europe/Paris par défaut).
+
+    Args:
+        first: Date et heure de la première séance (aware)
+        repeat_type: 'none', 'daily', 'weekly' ou 'monthly'
+        interval: Intervalle de répétition (tous les N jours/semaines/mois)
+        until: Date (incluse) de fin de la répétition
+        window_start: Début de la fenêtre (aware, inclus)
+        window_end: Fin de la fenêtre (aware, exclue)
+        tz: Fuseau horaire de référence (fuseau courant par défaut)
+
+    Yields:
+        Datetimes aware des occurrences, dans l'ordre chronologique
+    """
+    if repeat_type == 'none':
+        if (window_start is None or first >= window_start) and \
+                (window_end is None or first < window_end):
+            yield first
+        return
+
+    tz = tz or timezone.get_current_timezone()
+    first_local = timezone.localtime(first, tz)
+    base_date, base_time = first_local.date(), first_local.time()
+
+    index = 0
+    if window_start is not None:
+        index = first_index(
+            base_date, repeat_type, interval, timezone.localtime(window_start, tz).date()
+        )
+
+    while True:
+        day = occurrence_date(base_date, repeat_type, index, interval)
+        if until is not None and day > until:
+            return
+
+        # Aller-retour UTC : normalise les heures inexistantes (passage à l'heure d'été)
+        occurrence = timezone.make_aware(datetime.combine(day, base_time), tz)
+        occurrence = occurrence.astimezone(dt_timezone.utc).astimezone(tz)
+        if window_end is not None and occurrence >= window_end:
+            return
+        if window_start is None or occurrence >= window_start:
+            yield occurrence
+
+        index += 1
+
+
+def next_reminder(
+    first: datetime,
+    repeat_type: str,
+    interval: int,
+    until,
+    minutes_before: int,
+    now: datetime
+) -> Optional[datetime]:
+    """
+    Date du prochain rappel à envoyer après now
+
+    Seules les occurrences dont le rappel tombe strictement après now sont
+    retenues : un rappel envoyé (ou manqué) n'est jamais reprogrammé.
+
+    Returns:
+        Datetime aware du rappel, ou None s'il n'y a plus d'occurrence
+    """
+    notice = timedelta(minutes=minutes_before)
+    for occurrence in iter_occurrences(first, repeat_type, interval, until, now + notice):
+        if occurrence - notice > now:
+            return occurrence - notice
+    return None
@@ -0,0 +1,146 @@
+"""
+Envoi des rappels de séances planifiées
+
+Chaque plan conserve dans remind_at la date de son prochain rappel ; un
+index partiel ne contient que les rappels en attente. À chaque passage
+(toutes les minutes via Celery beat), seuls les rappels échus sont lus,
+par lots verrouillés avec SKIP LOCKED pour que plusieurs workers se
+répartissent le travail sans double envoi. remind_at avance à l'occurrence
+suivante avant l'envoi (au plus un envoi par rappel), puis les emails d'un
+passage partent sur une seule connexion SMTP.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import WorkoutPlan
+
+logger = logging.getLogger(__name__)
+
+# Plans traités par transaction
+BATCH_SIZE = 500
+
+# Lots maximum par passage : le reste est repris à la minute suivante
+MAX_BATCHES = 20
+
+
+def wants_reminder(user):
+    return bool(
+        user.is_active and user.email and
+        user.email_notifications and user.workout_reminders
+    )
+
+
+def build_message(plan, user, occurrence):
+    """Email de rappel d'une occurrence de plan"""
+    local_occurrence = timezone.localtime(occurrence)
+    return EmailMessage(
+        subject=f"Rappel : {plan.title} à {local_occurrence.strftime('%H:%M')}",
+        body=(
+            f"Bonjour {user.first_name},\n\n"
+            f"Votre séance « {plan.title} » commence le "
+            f"{local_occurrence.strftime('%d/%m/%Y à %H:%M')} "
+            f"({plan.duration_minutes} min prévues).\n\n"
+            "Bon entraînement !\nMyCoach"
+        ),
+        to=[user.email],
+    )
+
+
+def send_each(connection, messages):
+    """
+    Envoie les messages un par un ; un échec est journalisé sans bloquer les autres
+
+    Après une erreur, la connexion est rouverte pour les messages suivants.
+
+    Returns:
+        Nombre d'emails envoyés
+    """
+    sent = 0
+    for message in messages:
+        try:
+            sent += connection.send_messages([message]) or 0
+        except Exception:
+            logger.exception("Rappel non envoyé à %s", ", ".join(message.to))
+            connection.close()
+            try:
+                connection.open()
+            except Exception:
+                logger.exception("Connexion email indisponible")
+    return sent
+
+
+def dispatch_batch(now, connection, batch_size=BATCH_SIZE):
+    """
+    Programme les rappels suivants d'un lot de rappels échus, puis les envoie
+
+    Le report de remind_at est validé avant l'envoi : chaque rappel est
+    envoyé au plus une fois, et un destinataire refusé ne bloque ni le lot
+    ni les rappels suivants. Un rappel dont la séance a déjà commencé
+    (worker arrêté) n'est pas envoyé, mais le suivant est programmé.
+
+    Returns:
+        Couple (plans traités, emails envoyés)
+    """
+    from apps.users.models import User
+
+    with transaction.atomic():
+        plans = list(
+            WorkoutPlan.objects.select_for_update(skip_locked=True)
+            .filter(remind_at__lte=now)
+            .order_by('remind_at')[:batch_size]
+        )
+        if not plans:
+            return 0, 0
+
+        users = User.objects.in_bulk({plan.user_id for plan in plans})
+        messages = []
+        for plan in plans:
+            occurrence = plan.remind_at + timedelta(minutes=plan.reminder_minutes_before)
+            user = users.get(plan.user_id)
+            if user and occurrence > now and wants_reminder(user):
+                messages.append(build_message(plan, user, occurrence))
+            plan.remind_at = plan.next_reminder(now)
+            # Curseur de synchronisation mobile : bulk_update ne gère pas auto_now
+            plan.updated_at = Now()
+
+        WorkoutPlan.objects.bulk_update(plans, ['remind_at', 'updated_at'])
+
+    return len(plans), send_each(connection, messages)
+
+
+def dispatch_due_reminders(now=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """
+    Envoie tous les rappels échus (dans la limite de max_batches lots)
+
+    La connexion email est ouverte une seule fois pour tout le passage, et
+    seulement s'il y a des rappels à traiter.
+
+    Returns:
+        Dictionnaire {processed, sent}
+    """
+    now = now or timezone.now()
+    if not WorkoutPlan.objects.filter(remind_at__lte=now).exists():
+        return {'processed': 0, 'sent': 0}
+
+    processed = sent = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        for _ in range(max_batches):
+            batch_processed, batch_sent = dispatch_batch(now, connection, batch_size)
+            processed += batch_processed
+            sent += batch_sent
+            if batch_processed < batch_size:
+                break
+    finally:
+        connection.close()
+
+    if processed:
+        logger.info("Rappels : %s plan(s) traité(s), %s email(s) envoyé(s)", processed, sent)
+    return {'processed': processed, 'sent': sent}
@@ -0,0 +1,139 @@
+"""
+Tâches Celery de l'application calendar
+Import parallèle des fichiers CSV volumineux par plages d'octets, envoi
+des rappels et création quotidienne des séances planifiées
+"""
+
+import logging
+
+from celery import chord, shared_task
+from django.utils import timezone
+
+from .importers import MAX_REPORTED_ERRORS, CSVFileError, CSVWorkoutImporter
+from .models import CSVImport, WorkoutPlan
+from .reminders import dispatch_due_reminders
+
+logger = logging.getLogger(__name__)
+
+# Nombre de plages par défaut pour un import parallèle
+DEFAULT_PARTS = 4
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def import_csv_range(self, csv_import_id, index):
+    """
+    Importe une plage d'octets d'un fichier CSV
+
+    Chaque lot validé enregistre sa position dans import_options : une
+    nouvelle tentative reprend au dernier lot écrit au lieu de recommencer.
+    Un fichier illisible (CSVFileError) n'est pas retenté.
+    """
+    csv_import = CSVImport.objects.get(pk=csv_import_id)
+    start, end, first_line = csv_import.import_options['ranges'][index]
+    state = csv_import.import_options.get('checkpoints', {}).get(str(index))
+    if state and state.get('done'):
+        return {'index': index, 'status': 'skipped'}
+
+    importer = CSVWorkoutImporter(csv_import)
+    try:
+        successful, failed = importer.run_range(
+            start, end, first_line, state,
+            lambda new_state: csv_import.save_checkpoint(index, new_state)
+        )
+    except CSVFileError:
+        # Fichier illisible : une nouvelle tentative échouerait de la même façon
+        logger.error("Import %s, plage %s : fichier illisible", csv_import_id, index, exc_info=True)
+        raise
+    except Exception as exc:
+        logger.warning("Import %s, plage %s interrompue : %s", csv_import_id, index, exc)
+        raise self.retry(exc=exc)
+
+    return {'index': index, 'status': 'imported', 'successful': successful, 'failed': failed}
+
+
+@shared_task
+def finalize_csv_import(results, csv_import_id):
+    """
+    Callback du chord : agrège les compteurs de toutes les plages
+
+    Les totaux sont relus depuis les points de reprise, qui couvrent aussi
+    les plages terminées lors d'une exécution précédente.
+    """
+    csv_import = CSVImport.objects.get(pk=csv_import_id)
+    options = csv_import.import_options
+    checkpoints = [
+        options['checkpoints'][key]
+        for key in sorted(options.get('checkpoints', {}), key=int)
+    ]
+
+    successful = sum(entry['successful'] for entry in checkpoints)
+    failed = sum(entry['failed'] for entry in checkpoints)
+    errors = [error for entry in checkpoints for error in entry['errors']]
+
+    csv_import.error_details = "\n".join(errors[:MAX_REPORTED_ERRORS])
+    csv_import.complete_processing(
+        successful,
+        failed,
+        f"{successful} ligne(s) importée(s), {failed} en échec, "
+        f"{len(options['ranges'])} plage(s) traitée(s) en parallèle."
+    )
+    return {'csv_import_id': csv_import_id, 'successful': successful, 'failed': failed}
+
+
+@shared_task
+def fail_csv_import(request, exc, traceback, csv_import_id):
+    """Errback du chord : l'import reste reprenable depuis ses points de reprise"""
+    CSVImport.objects.get(pk=csv_import_id).fail_processing(
+        f"Import interrompu : {exc}. Relancer l'import pour reprendre au dernier lot enregistré."
+    )
+
+
+def start_parallel_import(csv_import, parts=DEFAULT_PARTS):
+    """
+    Lance (ou reprend) l'import parallèle d'un fichier CSV
+
+    Le découpage en plages est calculé une seule fois et conservé dans
+    import_options ; à la reprise, seules les plages non terminées sont
+    relancées.
+
+    Returns:
+        Résultat asynchrone du chord
+    """
+    options = csv_import.import_options
+    if 'ranges' not in options:
+        options['ranges'] = CSVWorkoutImporter(csv_import).compute_ranges(parts)
+        csv_import.save(update_fields=['import_options'])
+    csv_import.start_processing()
+
+    done = {
+        key for key, state in options.get('checkpoints', {}).items()
+        if state.get('done')
+    }
+    header = [
+        import_csv_range.s(csv_import.pk, index)
+        for index in range(len(options['ranges']))
+        if str(index) not in done
+    ]
+    if not header:
+        return finalize_csv_import.apply_async(([], csv_import.pk))
+
+    callback = finalize_csv_import.s(csv_import.pk).on_error(fail_csv_import.s(csv_import.pk))
+    return chord(header)(callback)
+
+
+@shared_task
+def dispatch_reminders():
+    """Envoie les rappels échus (planifiée chaque minute par Celery beat)"""
+    return dispatch_due_reminders()
+
+
+@shared_task
+def create_due_workouts():
+    """
+    Crée les séances du jour de tous les utilisateurs
+
+    Planifiée toutes les heures : l'opération est idempotente, et les plans
+    ajoutés en cours de journée sont pris en compte au passage suivant.
+    """
+    workouts = WorkoutPlan.objects.create_workouts_on(timezone.localdate())
+    return {'created': len(workouts)}
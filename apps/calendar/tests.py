@@ -0,0 +1,461 @@
+"""
+Tests de l'application calendar
+"""
+
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.mail import get_connection
+from django.db import IntegrityError, OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.machines.models import Machine
+from apps.users.models import User
+from apps.workouts.models import Exercise, Serie, TemplateExercise, Workout, WorkoutTemplate
+
+from . import tasks
+from .importers import CSVFileError, CSVWorkoutImporter
+from .models import CalendarEvent, CSVImport, WeeklyTemplate, WorkoutPlan
+from .recurrence import iter_occurrences
+from .reminders import dispatch_batch, dispatch_due_reminders
+
+
+def local(*args):
+    """Datetime aware dans le fuseau courant (Europe/Paris)"""
+    return timezone.make_aware(datetime(*args))
+
+
+class CalendarTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(
+            email='membre@example.com', first_name='Léa', last_name='Martin'
+        )
+
+    def create_plan(self, scheduled_date, user=None, **kwargs):
+        return WorkoutPlan.objects.create(
+            user=user or self.user,
+            title=kwargs.pop('title', 'Jambes'),
+            scheduled_date=scheduled_date,
+            **kwargs
+        )
+
+
+class RecurrenceTests(CalendarTestCase):
+
+    def test_local_time_is_kept_across_dst(self):
+        occurrences = list(iter_occurrences(local(2024, 3, 29, 18, 0), 'daily', until=date(2024, 4, 1)))
+        self.assertEqual(
+            [timezone.localtime(occurrence).strftime('%d %H:%M') for occurrence in occurrences],
+            ['29 18:00', '30 18:00', '31 18:00', '01 18:00']
+        )
+        # 23 heures entre le 30 et le 31 (passage à l'heure d'été)
+        self.assertEqual(occurrences[2].timestamp() - occurrences[1].timestamp(), 23 * 3600)
+
+    def test_nonexistent_local_time_is_shifted(self):
+        occurrences = list(iter_occurrences(local(2024, 3, 30, 2, 30), 'daily', until=date(2024, 3, 31)))
+        self.assertEqual(
+            [timezone.localtime(occurrence).strftime('%d %H:%M') for occurrence in occurrences],
+            ['30 02:30', '31 03:30']
+        )
+
+    def test_months_do_not_drift(self):
+        occurrences = iter_occurrences(
+            local(2024, 1, 31, 9, 0), 'monthly', window_end=local(2024, 6, 1)
+        )
+        self.assertEqual(
+            [occurrence.date() for occurrence in occurrences],
+            [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)]
+        )
+
+    def test_window_skips_to_first_occurrence(self):
+        occurrences = list(iter_occurrences(
+            local(2020, 1, 6, 7, 0), 'weekly', interval=2,
+            window_start=local(2024, 3, 1), window_end=local(2024, 3, 30)
+        ))
+        self.assertEqual(occurrences, [local(2024, 3, 11, 7, 0), local(2024, 3, 25, 7, 0)])
+
+    def test_expand_merges_plans_in_one_query(self):
+        self.create_plan(local(2024, 3, 4, 18, 0), title='Quotidien', repeat_type='daily')
+        self.create_plan(local(2024, 3, 5, 7, 0), title='Unique')
+        self.create_plan(local(2024, 3, 1, 12, 0), title='Terminé', repeat_type='daily',
+                         repeat_until=date(2024, 3, 2))
+
+        with self.assertNumQueries(1):
+            expanded = list(WorkoutPlan.objects.expand(local(2024, 3, 4), local(2024, 3, 7)))
+        self.assertEqual(
+            [(plan.title, timezone.localtime(occurrence).strftime('%d %H:%M')) for plan, occurrence in expanded],
+            [('Quotidien', '04 18:00'), ('Unique', '05 07:00'),
+             ('Quotidien', '05 18:00'), ('Quotidien', '06 18:00')]
+        )
+
+
+class WeeklyTemplateTests(CalendarTestCase):
+
+    def setUp(self):
+        super().setUp()
+        legs = WorkoutTemplate.objects.create(name='Jambes', created_by=self.user, target_duration_minutes=45)
+        back = WorkoutTemplate.objects.create(name='Dos', created_by=self.user)
+        self.weekly = WeeklyTemplate.objects.create(
+            user=self.user, name='Programme', monday_template=legs, thursday_template=back
+        )
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=14 - today.weekday())
+
+    def test_generate_plans_in_bulk(self):
+        weekly = WeeklyTemplate.objects.get(pk=self.weekly.pk)
+        # Templates du jour (in_bulk), jours déjà planifiés, bulk_create
+        with self.assertNumQueries(3):
+            plans = weekly.generate_plans(self.monday, weeks=3)
+
+        self.assertEqual(len(plans), 6)
+        stored = WorkoutPlan.objects.order_by('scheduled_date')
+        self.assertEqual(
+            [(plan.title, timezone.localtime(plan.scheduled_date).date()) for plan in stored[:2]],
+            [('Jambes', self.monday), ('Dos', self.monday + timedelta(days=3))]
+        )
+        first = stored[0]
+        self.assertEqual(timezone.localtime(first.scheduled_date).hour, 8)
+        self.assertEqual(first.duration_minutes, 45)
+        self.assertEqual(first.remind_at, first.scheduled_date - timedelta(minutes=30))
+
+    def test_planned_days_are_skipped(self):
+        thursday = self.monday + timedelta(days=3)
+        self.create_plan(local(thursday.year, thursday.month, thursday.day, 18, 0))
+
+        self.assertEqual(len(self.weekly.generate_plans(self.monday, weeks=1)), 1)
+        # Relancer n'ajoute que la semaine suivante
+        self.assertEqual(len(self.weekly.generate_plans(self.monday, weeks=2)), 2)
+        self.assertEqual(WorkoutPlan.objects.count(), 4)
+
+
+class ReminderTests(CalendarTestCase):
+
+    def test_save_schedules_next_reminder(self):
+        start = timezone.now() + timedelta(days=1)
+        plan = self.create_plan(start, reminder_minutes_before=30)
+        self.assertEqual(plan.remind_at, start - timedelta(minutes=30))
+
+        plan.reminder_enabled = False
+        plan.save(update_fields=['reminder_enabled'])
+        plan.refresh_from_db()
+        self.assertIsNone(plan.remind_at)
+
+    def plan_due(self, **kwargs):
+        """Plan dont le rappel (30 min avant) est échu à l'instant retourné"""
+        start = timezone.now() + timedelta(days=2)
+        plan = self.create_plan(start, **kwargs)
+        return plan, start - timedelta(minutes=25)
+
+    def test_dispatch_sends_once_and_schedules_next_occurrence(self):
+        plan, now = self.plan_due(repeat_type='daily')
+
+        result = dispatch_due_reminders(now)
+        self.assertEqual(result, {'processed': 1, 'sent': 1})
+        self.assertEqual(mail.outbox[0].to, ['membre@example.com'])
+
+        plan.refresh_from_db()
+        self.assertEqual(plan.remind_at, plan.scheduled_date + timedelta(days=1, minutes=-30))
+
+        # Rappel déjà avancé : un second passage n'envoie rien
+        self.assertEqual(dispatch_due_reminders(now), {'processed': 0, 'sent': 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_reminder_updates_move_the_sync_cursor(self):
+        plan, now = self.plan_due(repeat_type='daily')
+        past = timezone.now() - timedelta(days=1)
+        WorkoutPlan.objects.filter(pk=plan.pk).update(updated_at=past)
+
+        dispatch_due_reminders(now)
+        plan.refresh_from_db()
+        self.assertGreater(plan.updated_at, past)
+
+        WorkoutPlan.objects.filter(pk=plan.pk).update(updated_at=past, reminder_enabled=False)
+        self.assertEqual(WorkoutPlan.objects.filter(pk=plan.pk).refresh_reminders(), 1)
+        plan.refresh_from_db()
+        self.assertIsNone(plan.remind_at)
+        self.assertGreater(plan.updated_at, past)
+
+    def test_started_occurrence_is_not_sent(self):
+        plan, _ = self.plan_due()
+
+        # Worker arrêté : le passage suivant a lieu après le début de la séance
+        later = plan.scheduled_date + timedelta(minutes=5)
+        self.assertEqual(dispatch_due_reminders(later), {'processed': 1, 'sent': 0})
+        plan.refresh_from_db()
+        self.assertIsNone(plan.remind_at)
+
+    def test_notification_preferences_are_respected(self):
+        self.user.workout_reminders = False
+        self.user.save()
+        _, now = self.plan_due()
+
+        self.assertEqual(dispatch_due_reminders(now), {'processed': 1, 'sent': 0})
+
+    def test_rejected_recipient_does_not_block_batch(self):
+        rejected = User.objects.create(email='refuse@example.com', first_name='Paul')
+        self.plan_due(user=rejected)
+        _, now = self.plan_due()
+
+        connection = get_connection()
+        send_messages = connection.send_messages
+
+        def refuse(messages):
+            if messages[0].to == ['refuse@example.com']:
+                raise OSError("Destinataire refusé")
+            return send_messages(messages)
+
+        connection.send_messages = refuse
+        with self.assertLogs('apps.calendar.reminders', 'ERROR'):
+            processed, sent = dispatch_batch(now, connection)
+
+        self.assertEqual((processed, sent), (2, 1))
+        self.assertEqual([message.to for message in mail.outbox], [['membre@example.com']])
+        # Au plus un envoi : le rappel refusé n'est pas reprogrammé
+        self.assertFalse(WorkoutPlan.objects.filter(remind_at__lte=now).exists())
+
+
+CSV_CONTENT = (
+    'date,workout,machine,reps,weight,notes\n'
+    '2024-03-04T18:00,Jambes,Presse,10,"80,5","Première série\nsur deux lignes"\n'
+    '2024-03-04T18:00,Jambes,Presse,8,85,\n'
+    '2024-03-04T18:00,Jambes,Machine inconnue,8,85,\n'
+    '2024-03-04T18:00,Jambes,Rameur,,,\n'
+    '2024-03-06T18:00,Dos,Rameur,12,40,\n'
+    '2024-03-06T18:00,Dos,Presse,10,70,\n'
+)
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class CSVImportTests(CalendarTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for name in ('Presse', 'Rameur'):
+            Machine.objects.create(name=name, description='d', instructions='i')
+
+    def create_import(self, content=CSV_CONTENT, **options):
+        csv_import = CSVImport(user=self.user, filename='historique.csv', import_options=options)
+        csv_import.file.save('historique.csv', ContentFile(content.encode('utf-8')), save=False)
+        csv_import.save()
+        return csv_import
+
+    def test_process_imports_valid_rows(self):
+        csv_import = self.create_import(chunk_size=2)
+        self.assertTrue(csv_import.process())
+
+        csv_import.refresh_from_db()
+        self.assertEqual((csv_import.successful_imports, csv_import.failed_imports), (4, 2))
+        # La première ligne de données occupe les lignes 2 et 3 du fichier
+        self.assertIn("Ligne 5 : machine inconnue", csv_import.error_details)
+        self.assertIn("Ligne 6 : reps ou duration_seconds requis", csv_import.error_details)
+
+        legs = Workout.objects.get(name='Jambes')
+        self.assertEqual((legs.status, legs.total_sets), ('completed', 2))
+        self.assertEqual(
+            list(Serie.objects.filter(exercise__workout=legs).values_list('set_number', 'notes')),
+            [(1, "Première série\nsur deux lignes"), (2, '')]
+        )
+        back = Workout.objects.get(name='Dos')
+        self.assertEqual(
+            list(back.exercises.order_by('order').values_list('machine__name', flat=True)),
+            ['Rameur', 'Presse']
+        )
+
+    def test_ranges_start_on_a_new_workout(self):
+        csv_import = self.create_import()
+        ranges = CSVWorkoutImporter(csv_import).compute_ranges(2, min_bytes=1)
+        self.assertEqual(len(ranges), 2)
+        self.assertEqual(ranges[1][2], 7)
+
+        for start, end, first_line in ranges:
+            CSVWorkoutImporter(csv_import).run_range(start, end, first_line)
+        self.assertEqual(Workout.objects.count(), 2)
+        self.assertEqual(Serie.objects.count(), 4)
+
+    def test_range_resumes_from_checkpoint(self):
+        csv_import = self.create_import(chunk_size=1)
+        saved = []
+
+        def interrupt(state):
+            if saved:
+                raise OperationalError("connexion perdue")
+            saved.append(state)
+
+        with self.assertRaises(OperationalError):
+            CSVWorkoutImporter(csv_import).run_range(0, 10 ** 6, 2, checkpoint=interrupt)
+        self.assertEqual(Serie.objects.count(), 1)
+
+        # Reprise après le premier lot : la séance en cours n'est pas dupliquée
+        states = []
+        importer = CSVWorkoutImporter(csv_import)
+        self.assertEqual(importer.run_range(0, 10 ** 6, 2, saved[0], states.append), (4, 2))
+        self.assertTrue(states[-1]['done'])
+        self.assertEqual(Workout.objects.filter(name='Jambes').count(), 1)
+        self.assertEqual(
+            list(Serie.objects.filter(exercise__workout__name='Jambes').values_list('set_number', flat=True)),
+            [1, 2]
+        )
+
+    def test_undecodable_file_fails_without_row_failures(self):
+        csv_import = self.create_import()
+        csv_import.file.save(
+            'latin1.csv', ContentFile(CSV_CONTENT.encode('latin-1')), save=True
+        )
+
+        with self.assertRaises(CSVFileError):
+            CSVWorkoutImporter(csv_import).run()
+        self.assertFalse(csv_import.process())
+        csv_import.refresh_from_db()
+        self.assertEqual(csv_import.status, 'failed')
+
+    def test_undecodable_range_is_not_retried(self):
+        csv_import = self.create_import(ranges=[[0, 10 ** 6, 2]])
+        csv_import.file.save(
+            'latin1.csv', ContentFile(CSV_CONTENT.encode('latin-1')), save=True
+        )
+
+        with mock.patch.object(tasks.import_csv_range, 'retry') as retry:
+            with self.assertLogs('apps.calendar.tasks', 'ERROR'), self.assertRaises(CSVFileError):
+                tasks.import_csv_range.apply((csv_import.pk, 0), throw=True)
+        retry.assert_not_called()
+
+    def test_database_errors_are_not_row_failures(self):
+        csv_import = self.create_import()
+
+        with mock.patch.object(Serie.objects, 'bulk_create', side_effect=OperationalError("verrou")):
+            with self.assertRaises(OperationalError):
+                CSVWorkoutImporter(csv_import).run()
+
+        with mock.patch.object(Serie.objects, 'bulk_create', side_effect=IntegrityError("doublon")):
+            self.assertEqual(CSVWorkoutImporter(csv_import).run(), (0, 6))
+        self.assertFalse(Exercise.objects.exists())
+
+
+class CalendarRangeTests(CalendarTestCase):
+
+    URL = '/api/calendar/events/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_event(self, title, start, end=None, **kwargs):
+        return CalendarEvent.objects.create(
+            user=self.user, event_type=kwargs.pop('event_type', 'note'),
+            title=title, start_date=start, end_date=end, **kwargs
+        )
+
+    def entries(self, start='2024-03-04', end='2024-03-06'):
+        response = self.client.get(self.URL, {'from': start, 'to': end})
+        self.assertEqual(response.status_code, 200)
+        return [(entry['source'], entry['title']) for entry in response.data['results']]
+
+    def test_sources_are_merged_in_start_order(self):
+        self.create_event('Stage', local(2024, 3, 1, 9), local(2024, 3, 4, 12))
+        self.create_event('Ancien', local(2024, 3, 1, 9), local(2024, 3, 2, 9))
+        self.create_event('Repos', local(2024, 3, 5), all_day=True, event_type='rest')
+        self.create_plan(local(2024, 3, 3, 23, 0), title='Nocturne', duration_minutes=120)
+        self.create_plan(local(2024, 3, 4, 18, 0), title='Quotidien', repeat_type='daily')
+        Workout.objects.create(user=self.user, name='Séance libre', date=local(2024, 3, 5, 7, 0))
+        User.objects.create(email='autre@example.com').calendar_events.create(
+            event_type='note', title='Autre', start_date=local(2024, 3, 4, 10)
+        )
+
+        with self.assertNumQueries(3):
+            self.client.get(self.URL, {'from': '2024-03-04', 'to': '2024-03-06'})
+        self.assertEqual(self.entries(), [
+            ('event', 'Stage'),
+            ('plan', 'Nocturne'),
+            ('plan', 'Quotidien'),
+            ('event', 'Repos'),
+            ('workout', 'Séance libre'),
+            ('plan', 'Quotidien'),
+        ])
+
+    def test_duplicates_are_dropped(self):
+        plan = self.create_plan(local(2024, 3, 4, 18, 0), title='Quotidien', repeat_type='daily')
+        workout = Workout.objects.create(user=self.user, name='Jambes', date=local(2024, 3, 5, 18, 0))
+        # Occurrence du 5 matérialisée en événement rattaché à sa séance
+        self.create_event(
+            'Quotidien (événement)', local(2024, 3, 5, 18, 0), local(2024, 3, 5, 19, 0),
+            event_type='workout', workout_plan=plan, workout=workout
+        )
+
+        self.assertEqual(self.entries(), [
+            ('plan', 'Quotidien'),
+            ('event', 'Quotidien (événement)'),
+        ])
+
+    def test_invalid_ranges_are_rejected(self):
+        for start, end in (('hier', '2024-03-06'), ('2024-03-06', '2024-03-04'), ('2024-01-01', '2025-06-01')):
+            response = self.client.get(self.URL, {'from': start, 'to': end})
+            self.assertEqual(response.status_code, 400, (start, end))
+        self.assertEqual(APIClient().get(self.URL, {'from': '2024-03-04', 'to': '2024-03-05'}).status_code, 401)
+
+
+class MaterializationTests(CalendarTestCase):
+
+    DAY = date(2024, 3, 5)
+
+    def setUp(self):
+        super().setUp()
+        self.template = WorkoutTemplate.objects.create(name='Jambes', created_by=self.user)
+        for order, name in enumerate(('Presse', 'Leg curl'), start=1):
+            TemplateExercise.objects.create(
+                template=self.template, order=order, target_sets=4, target_reps=8,
+                machine=Machine.objects.create(name=name, description='d', instructions='i'),
+            )
+
+    def test_create_workouts_on_is_bulk_and_idempotent(self):
+        morning = self.create_plan(local(2024, 3, 5, 8, 0), title='Matin', template=self.template)
+        self.create_plan(local(2024, 3, 5, 19, 0), title='Soir')
+        self.create_plan(local(2024, 3, 6, 8, 0), title='Demain')
+        self.create_plan(local(2024, 3, 5, 12, 0), title='Inactif', is_active=False)
+        recurring = self.create_plan(local(2024, 3, 1, 7, 0), title='Quotidien', repeat_type='daily')
+
+        workouts = WorkoutPlan.objects.create_workouts_on(self.DAY)
+        self.assertEqual(sorted(workout.name for workout in workouts), ['Matin', 'Quotidien', 'Soir'])
+        self.assertEqual(WorkoutPlan.objects.create_workouts_on(self.DAY), [])
+
+        morning.refresh_from_db()
+        created = morning.workout_created
+        self.assertEqual((created.status, created.total_exercises), ('planned', 2))
+        self.assertEqual(
+            list(created.exercises.order_by('order').values_list('machine__name', 'target_sets')),
+            [('Presse', 4), ('Leg curl', 4)]
+        )
+
+        # Occurrence d'un plan récurrent : rattachée par son événement
+        event = CalendarEvent.objects.get(workout_plan=recurring)
+        self.assertEqual(event.start_date, local(2024, 3, 5, 7, 0))
+        self.assertEqual(event.workout.name, 'Quotidien')
+        recurring.refresh_from_db()
+        self.assertIsNone(recurring.workout_created)
+
+    def test_queries_do_not_grow_with_plans(self):
+        def count_queries(day, plans):
+            for hour in range(plans):
+                self.create_plan(local(day.year, day.month, day.day, 6 + hour, 0), template=self.template)
+            with CaptureQueriesContext(connection) as queries:
+                WorkoutPlan.objects.create_workouts_on(day)
+            return len(queries)
+
+        self.assertEqual(count_queries(self.DAY, 2), count_queries(date(2024, 3, 6), 8))
+        self.assertEqual(Exercise.objects.count(), 20)
+
+    def test_create_workout_delegates_to_bulk_path(self):
+        plan = self.create_plan(local(2024, 3, 5, 8, 0), template=self.template)
+        workout = plan.create_workout()
+        self.assertEqual(plan.workout_created, workout)
+        self.assertEqual(plan.create_workout(), workout)
+        self.assertEqual(Workout.objects.count(), 1)
@@ -1,8 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from . import views
+
 app_name = 'calendar'
 
 urlpatterns = [
-    # URLs seront ajoutées plus tard avec les ViewSets
-]
\ No newline at end of file
+    path('events/', views.CalendarEventsView.as_view(), name='events'),
+]
@@ -0,0 +1,63 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import agenda
+
+
+def parse_bound(value):
+    """Date (minuit heure locale) ou date et heure ISO 8601 ; None si illisible"""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class CalendarEventsView(APIView):
+    """
+    Agenda de l'utilisateur sur une fenêtre de temps
+
+    GET /api/calendar/events/?from=2026-10-01&to=2026-11-01
+    Renvoie, triés par date de début, les événements, occurrences de plans
+    et séances chevauchant [from, to[ (dates ou dates et heures ISO 8601).
+    """
+
+    def get(self, request):
+        start = parse_bound(request.query_params.get('from', ''))
+        end = parse_bound(request.query_params.get('to', ''))
+        if start is None or end is None:
+            return Response(
+                {'error': 'from and to must be ISO 8601 dates or datetimes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end <= start:
+            return Response(
+                {'error': 'to must be after from'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end - start > agenda.MAX_RANGE:
+            return Response(
+                {'error': f'range cannot exceed {agenda.MAX_RANGE.days} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = agenda.get_agenda(request.user, start, end)
+        return Response({
+            'from': start,
+            'to': end,
+            'count': len(results),
+            'results': results,
+        })
@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
-    verbose_name = 'Core Services'
\ No newline at end of file
+    verbose_name = 'Core Services'
+
+    def ready(self):
+        from . import signals
+
+        signals.connect()
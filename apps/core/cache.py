@@ -0,0 +1,17 @@
+"""
+Outils communs autour du cache Django
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared_cache(alias='default'):
+    """
+    Indique si le cache est partagé entre processus (Redis en production)
+
+    Sans REDIS_URL, le cache est en mémoire locale : ce qu'un processus y
+    écrit reste invisible pour les autres workers web et Celery.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
@@ -0,0 +1,79 @@
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.core import renderers
+from apps.core.renderers import FastJSONRenderer
+from apps.machines.models import Machine
+from apps.machines.serializers import MachineDetailSerializer, MachineListSerializer
+from apps.workouts.models import Serie
+
+
+class Command(BaseCommand):
+    """
+    Compare le rendu JSON de DRF (json standard) et FastJSONRenderer (orjson)
+    sur des réponses construites à partir des données de la base
+    """
+    help = "Mesure le temps de rendu JSON des principales réponses de l'API"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help="Nombre de rendus par mesure"
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5000,
+            help="Nombre maximal de lignes par réponse"
+        )
+
+    def payloads(self, limit):
+        """Réponses représentatives : catalogue, détail de machine, historique de séries"""
+        context = {'request': None}
+
+        machines = Machine.objects.prefetch_related('primary_muscles', 'labels')[:limit]
+        yield 'catalogue (liste des machines)', MachineListSerializer(
+            machines, many=True, context=context
+        ).data
+
+        machine = Machine.objects.prefetch_related(
+            'primary_muscles', 'secondary_muscles', 'labels'
+        ).first()
+        if machine is not None:
+            yield 'détail de machine', MachineDetailSerializer(machine, context=context).data
+
+        # Valeurs brutes : Decimal et datetime passent par l'encodeur
+        yield 'historique des séries', list(Serie.objects.values(
+            'id', 'exercise_id', 'set_number', 'reps', 'weight', 'duration_seconds',
+            'distance_meters', 'rpe', 'completed', 'completed_at'
+        ).order_by('-id')[:limit])
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            self.stdout.write(self.style.WARNING(
+                "orjson n'est pas installé : FastJSONRenderer utilise le json standard."
+            ))
+
+        standard = JSONRenderer()
+        fast = FastJSONRenderer()
+        repeat = options['repeat']
+
+        for name, data in self.payloads(options['limit']):
+            standard_output = standard.render(data)
+            fast_output = fast.render(data)
+            if json.loads(standard_output) != json.loads(fast_output):
+                self.stdout.write(self.style.ERROR(f'{name} : sorties différentes'))
+                continue
+
+            standard_time = timeit.timeit(lambda: standard.render(data), number=repeat) / repeat
+            fast_time = timeit.timeit(lambda: fast.render(data), number=repeat) / repeat
+            self.stdout.write(
+                f'{name} ({len(standard_output) / 1024:.1f} Ko) : '
+                f'json {standard_time * 1000:.2f} ms, orjson {fast_time * 1000:.2f} ms '
+                f'(x{standard_time / fast_time:.1f})'
+            )
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(help_text='Nom de la collection synchronisée (ex: workouts)', max_length=50, verbose_name="Type d'objet")),
+                ('object_id', models.BigIntegerField(verbose_name="Identifiant de l'objet")),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Supprimé le')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_tombstones', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Suppression synchronisée',
+                'verbose_name_plural': 'Suppressions synchronisées',
+                'indexes': [models.Index(fields=['user', 'deleted_at'], name='core_syncto_user_id_5e11ca_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class SyncTombstone(models.Model):
+    """
+    Trace d'un objet supprimé, pour la synchronisation incrémentale
+    de l'application mobile
+    """
+    user = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='sync_tombstones',
+        verbose_name="Utilisateur"
+    )
+    model = models.CharField(
+        max_length=50,
+        verbose_name="Type d'objet",
+        help_text="Nom de la collection synchronisée (ex: workouts)"
+    )
+    object_id = models.BigIntegerField(verbose_name="Identifiant de l'objet")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Supprimé le")
+
+    class Meta:
+        verbose_name = "Suppression synchronisée"
+        verbose_name_plural = "Suppressions synchronisées"
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} ({self.deleted_at:%d/%m/%Y %H:%M})"
@@ -0,0 +1,193 @@
+"""
+Classes de pagination de l'API MyCoach
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def count_requested(request):
+    """Le total n'est calculé que si le client ne l'a pas désactivé (?count=false)"""
+    return request.query_params.get('count', 'true').lower() not in ('false', '0')
+
+
+class StandardPageNumberPagination(PageNumberPagination):
+    """
+    Pagination par numéro de page (par défaut)
+
+    Avec ?count=false, le COUNT(*) est évité : une ligne de plus est lue
+    pour savoir s'il existe une page suivante.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = count_requested(request)
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.with_count:
+            return super().get_paginated_response(data)
+
+        url = self.request.build_absolute_uri()
+        next_url = replace_query_param(url, self.page_query_param, self.page_number + 1)
+        if self.page_number == 2:
+            previous_url = remove_query_param(url, self.page_query_param)
+        else:
+            previous_url = replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+        return Response(OrderedDict([
+            ('next', next_url if self.has_next else None),
+            ('previous', previous_url if self.page_number > 1 else None),
+            ('results', data),
+        ]))
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur sur un ordre composite (ex. date puis id)
+
+    Le curseur contient les valeurs de tri du dernier élément renvoyé ;
+    la page suivante est lue par une condition « après cette position »
+    servie par l'index, sans OFFSET : chaque page coûte le même temps
+    quelle que soit la profondeur.
+
+    L'ordre vient du filtre d'ordre de la vue s'il est utilisé, sinon de
+    `ordering`. La clé primaire est ajoutée en dernier critère pour que
+    la position soit unique. Les champs de tri ne doivent pas être nuls.
+
+    Le total (COUNT) est inclus sauf avec ?count=false.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = "Curseur invalide."
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+        ordering = list(ordering or self.ordering)
+
+        fields = {field.lstrip('-') for field in ordering}
+        if not fields & {'id', 'pk'}:
+            descending = ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def position_filter(self, ordering, position):
+        """
+        Condition « strictement après la position » pour un ordre composite :
+        (a > x) OR (a = x AND b > y) OR ...
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def item_position(self, item, ordering):
+        position = []
+        for field in ordering:
+            value = item
+            for attribute in field.lstrip('-').split('__'):
+                value = getattr(value, 'pk' if attribute == 'pk' else attribute)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return position
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+
+        queryset = queryset.order_by(*ordering)
+        self.count = queryset.count() if count_requested(request) else None
+
+        position = self.decode_cursor(request, ordering)
+        if position is not None:
+            queryset = queryset.filter(self.position_filter(ordering, position))
+
+        results = list(queryset[:page_size + 1])
+        page = results[:page_size]
+
+        self.next_cursor = None
+        if len(results) > page_size:
+            self.next_cursor = self.encode_cursor(self.item_position(page[-1], ordering))
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
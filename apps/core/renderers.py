@@ -0,0 +1,62 @@
+"""
+Rendu et lecture JSON rapides pour l'API MyCoach
+
+orjson est utilisé s'il est installé ; sinon les classes se comportent
+exactement comme celles de DRF (json de la bibliothèque standard).
+Les types non natifs pour orjson (Decimal, chaînes traduites, timedelta,
+dates...) passent par l'encodeur de DRF : la sortie est identique, seul
+le coût change.
+"""
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    # orjson est optionnel : repli sur le JSON de DRF
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer s'appuyant sur orjson
+
+    Le rendu indenté (API navigable, paramètre indent) reste assuré par DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        encoder = JSONEncoder()
+        ret = orjson.dumps(
+            data,
+            default=encoder.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # Même échappement que DRF pour intégrer le JSON dans du JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser s'appuyant sur orjson"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
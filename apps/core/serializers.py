@@ -0,0 +1,33 @@
+"""
+Serializers et mixins partagés de l'API MyCoach
+"""
+
+
+class DynamicFieldsMixin:
+    """
+    Permet au client de restreindre les champs renvoyés : ?fields=id,name
+
+    Les champs sont retirés une seule fois à l'instanciation (y compris
+    pour une liste, dont l'enfant est partagé par tous les éléments).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if request is None:
+            return
+
+        fields = request.query_params.get('fields')
+        if fields:
+            allowed = {name.strip() for name in fields.split(',')}
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+    @staticmethod
+    def query_param_list(request, name):
+        """Valeurs d'un paramètre séparées par des virgules (ensemble vide si absent)"""
+        if request is None:
+            return set()
+        value = request.query_params.get(name, '')
+        return {item.strip() for item in value.split(',') if item.strip()}
@@ -4,10 +4,18 @@ Contient les calculs et la logique d'entraînement intelligente
 """
 
 import math
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 from enum import Enum
 
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy est optionnel : seuls les calculs vectorisés en dépendent
+    np = None
+
 
 class ObjectiveType(Enum):
     """Types d'objectifs d'entraînement"""
@@ -67,6 +75,13 @@ class IMCService:
 class OneRMService:
     """Service pour le calcul du 1RM (One Rep Max)"""
 
+    # Facteurs d'objectif partagés par les versions scalaire et vectorisée
+    OBJECTIVE_FACTORS = {
+        ObjectiveType.MUSCLE_GAIN: 1.05,    # +5% pour prise de masse
+        ObjectiveType.WEIGHT_LOSS: 0.95,    # -5% pour sèche
+        ObjectiveType.MAINTENANCE: 1.0      # Neutre
+    }
+
     @staticmethod
     def calculate_brzycki(weight: float, reps: int) -> float:
         """
@@ -135,16 +150,95 @@ class OneRMService:
             age_factor = 1 - ((user_age - 30) * 0.005)  # -0.5% par année après 30 ans
 
         # Facteur d'objectif
-        objective_factors = {
-            ObjectiveType.MUSCLE_GAIN: 1.05,    # +5% pour prise de masse
-            ObjectiveType.WEIGHT_LOSS: 0.95,    # -5% pour sèche
-            ObjectiveType.MAINTENANCE: 1.0      # Neutre
-        }
-
-        objective_factor = objective_factors.get(objective, 1.0)
+        objective_factor = OneRMService.OBJECTIVE_FACTORS.get(objective, 1.0)
 
         return round(base_1rm * age_factor * objective_factor, 2)
 
+    @staticmethod
+    def _as_arrays(weights, reps):
+        """
+        Convertit les poids et répétitions en tableaux NumPy et construit
+        le masque de validité (mêmes règles que les versions scalaires)
+        """
+        if np is None:
+            raise ImportError("NumPy est requis pour les calculs 1RM vectorisés")
+
+        weights, reps = np.broadcast_arrays(
+            np.asarray(weights, dtype=float),
+            np.asarray(reps, dtype=float)
+        )
+        valid = (weights > 0) & (reps > 0)
+        return weights, reps, valid
+
+    @staticmethod
+    def calculate_brzycki_array(weights, reps):
+        """
+        Calcule le 1RM selon la formule de Brzycki sur des tableaux
+
+        Args:
+            weights: Tableau des poids soulevés
+            reps: Tableau des répétitions effectuées
+
+        Returns:
+            Tableau des 1RM estimés (NaN pour les entrées invalides)
+        """
+        weights, reps, valid = OneRMService._as_arrays(weights, reps)
+
+        result = np.full(weights.shape, np.nan)
+        estimated = weights[valid] / (1.0278 - (0.0278 * reps[valid]))
+        result[valid] = np.where(reps[valid] == 1, weights[valid], np.round(estimated, 2))
+        return result
+
+    @staticmethod
+    def calculate_epley_array(weights, reps):
+        """
+        Calcule le 1RM selon la formule d'Epley sur des tableaux
+
+        Args:
+            weights: Tableau des poids soulevés
+            reps: Tableau des répétitions effectuées
+
+        Returns:
+            Tableau des 1RM estimés (NaN pour les entrées invalides)
+        """
+        weights, reps, valid = OneRMService._as_arrays(weights, reps)
+
+        result = np.full(weights.shape, np.nan)
+        estimated = weights[valid] * (1 + (reps[valid] / 30))
+        result[valid] = np.where(reps[valid] == 1, weights[valid], np.round(estimated, 2))
+        return result
+
+    @staticmethod
+    def calculate_adaptive_1rm_array(weights, reps, user_ages, objectives):
+        """
+        Calcule le 1RM adapté selon l'âge et l'objectif sur des tableaux
+
+        Les âges et objectifs peuvent être des scalaires (un seul
+        utilisateur) ou des tableaux de même taille que les séries.
+
+        Args:
+            weights: Tableau des poids soulevés
+            reps: Tableau des répétitions
+            user_ages: Âge(s) de l'utilisateur
+            objectives: Objectif(s) (ObjectiveType ou valeur texte)
+
+        Returns:
+            Tableau des 1RM adaptés (NaN pour les entrées invalides)
+        """
+        base_1rm = OneRMService.calculate_brzycki_array(weights, reps)
+
+        # Facteur d'âge (diminution progressive après 30 ans)
+        ages = np.asarray(user_ages, dtype=float)
+        age_factor = np.where(ages > 30, 1 - ((ages - 30) * 0.005), 1.0)
+
+        # Facteur d'objectif (1.0 pour un objectif inconnu)
+        objectives = np.asarray(objectives, dtype=object)
+        objective_factor = np.ones(objectives.shape)
+        for objective, factor in OneRMService.OBJECTIVE_FACTORS.items():
+            objective_factor[(objectives == objective) | (objectives == objective.value)] = factor
+
+        return np.round(base_1rm * age_factor * objective_factor, 2)
+
 
 class ProgressionService:
     """Service pour gérer la progression intelligente des entraînements"""
@@ -222,6 +316,115 @@ class ProgressionService:
 
         return round(current_weight + increase, 2)
 
+    @staticmethod
+    def suggest_weight(
+        target_weight: Optional[float],
+        target_reps: int,
+        target_sets: int,
+        achieved_reps: List[int],
+        objective: ObjectiveType,
+        exercise_type: str = "strength",
+        auto_progression: bool = True
+    ) -> Optional[float]:
+        """
+        Calcule le poids suggéré pour la prochaine séance d'un exercice
+
+        Args:
+            target_weight: Poids cible actuel (None si non défini)
+            target_reps: Nombre de répétitions cible
+            target_sets: Nombre de séries cibles
+            achieved_reps: Répétitions réalisées sur les séries terminées
+            objective: Objectif d'entraînement
+            exercise_type: Type d'exercice (strength, endurance, etc.)
+            auto_progression: Si la progression automatique est activée
+
+        Returns:
+            Poids recommandé (le poids cible inchangé si pas de progression)
+        """
+        if not auto_progression or not achieved_reps:
+            return target_weight
+
+        progression_success = ProgressionService.should_increase_weight(
+            target_reps, achieved_reps, target_sets
+        )
+
+        return ProgressionService.calculate_next_weight(
+            float(target_weight) if target_weight else 0,
+            progression_success,
+            objective,
+            exercise_type
+        )
+
+    @staticmethod
+    def suggest_for_workouts(workouts) -> Dict[int, Dict[int, Optional[float]]]:
+        """
+        Calcule les poids suggérés de tous les exercices de plusieurs séances
+
+        Le nombre de requêtes est constant (deux) quel que soit le nombre
+        de séances ou d'exercices : les exercices sont chargés avec leur
+        machine et l'utilisateur de la séance, puis les répétitions des
+        séries terminées sont lues en une seule passe (sous-requête sur
+        les exercices, sans liste d'identifiants).
+
+        Args:
+            workouts: Séances (queryset, instances ou identifiants)
+
+        Returns:
+            Dictionnaire {workout_id: {exercise_id: poids suggéré}}
+        """
+        from apps.workouts.models import Exercise, Serie
+
+        workout_exercises = Exercise.objects.filter(workout__in=workouts)
+        exercises = list(
+            workout_exercises
+            .select_related('machine', 'workout__user')
+            .only(
+                'id', 'workout_id', 'target_weight', 'target_reps',
+                'target_sets', 'auto_progression', 'machine__machine_type',
+                'workout__user__objective'
+            )
+        )
+
+        achieved_reps: Dict[int, List[int]] = {}
+        series = Serie.objects.filter(
+            exercise__in=workout_exercises.values('pk'),
+            completed=True,
+            reps__gt=0
+        ).order_by('exercise_id', 'set_number').values_list('exercise_id', 'reps')
+
+        for exercise_id, reps in series.iterator():
+            achieved_reps.setdefault(exercise_id, []).append(reps)
+
+        suggestions: Dict[int, Dict[int, Optional[float]]] = {}
+        for exercise in exercises:
+            suggestions.setdefault(exercise.workout_id, {})[exercise.id] = (
+                ProgressionService.suggest_weight(
+                    exercise.target_weight,
+                    exercise.target_reps,
+                    exercise.target_sets,
+                    achieved_reps.get(exercise.id, []),
+                    exercise.workout.user.objective_enum,
+                    'cardio' if exercise.machine.machine_type == 'cardio' else 'strength',
+                    exercise.auto_progression
+                )
+            )
+
+        return suggestions
+
+    @staticmethod
+    def suggest_for_workout(workout) -> Dict[int, Optional[float]]:
+        """
+        Calcule les poids suggérés de tous les exercices d'une séance
+
+        Args:
+            workout: Séance (instance ou identifiant)
+
+        Returns:
+            Dictionnaire {exercise_id: poids suggéré}
+        """
+        workout_id = getattr(workout, 'pk', workout)
+        return ProgressionService.suggest_for_workouts([workout_id]).get(workout_id, {})
+
     @staticmethod
     def calculate_rest_time(
         exercise_type: str,
@@ -256,9 +459,129 @@ class ProgressionService:
             return base_time
 
 
+class _VolumeAccumulator:
+    """Accumulateur de volume en une passe (mémoire indépendante du nombre de séries)"""
+
+    __slots__ = ('total_sets', 'total_reps', 'total_weight', 'exercise_ids')
+
+    def __init__(self):
+        self.total_sets = 0
+        self.total_reps = 0
+        self.total_weight = 0.0
+        self.exercise_ids = set()
+
+    def add(self, exercise_id, weight, reps):
+        """Ajoute une série (poids et répétitions manquants comptent pour 0)"""
+        reps = reps or 0
+        self.exercise_ids.add(exercise_id)
+        self.total_sets += 1
+        self.total_reps += reps
+        self.total_weight += float(weight or 0) * reps
+
+    def as_dict(self) -> Dict:
+        """Retourne les statistiques au format de calculate_weekly_volume"""
+        return StatisticsService.build_volume_summary(
+            self.total_sets, self.total_reps, self.total_weight, len(self.exercise_ids)
+        )
+
+
+class _TrendAccumulator:
+    """Accumulateur des sommes de régression linéaire en une passe"""
+
+    __slots__ = (
+        'n', 'sum_x', 'sum_y', 'sum_xy', 'sum_xx',
+        'origin', 'x_min', 'x_max', 'ewma', 'ewma_alpha'
+    )
+
+    def __init__(self, ewma_alpha: Optional[float] = None):
+        self.n = 0
+        self.sum_x = self.sum_y = self.sum_xy = self.sum_xx = 0.0
+        self.origin = None
+        self.x_min = self.x_max = 0.0
+        self.ewma = None
+        self.ewma_alpha = ewma_alpha
+
+    @staticmethod
+    def to_seconds(timestamp) -> float:
+        """
+        Convertit une date (datetime, date ou secondes epoch) en secondes
+
+        Les valeurs naïves sont en heure locale (TIME_ZONE), comme dans
+        calculate_progression_trend
+        """
+        if isinstance(timestamp, datetime):
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            return timestamp.timestamp()
+        if isinstance(timestamp, date):
+            return timezone.make_aware(
+                datetime.combine(timestamp, datetime.min.time())
+            ).timestamp()
+        return float(timestamp)
+
+    def add(self, seconds: float, value):
+        """Ajoute un point (x exprimé en jours depuis le premier point)"""
+        value = float(value or 0)
+        if self.origin is None:
+            self.origin = seconds
+        x = (seconds - self.origin) / 86400
+
+        if self.n == 0:
+            self.x_min = self.x_max = x
+        else:
+            self.x_min = min(self.x_min, x)
+            self.x_max = max(self.x_max, x)
+
+        self.n += 1
+        self.sum_x += x
+        self.sum_y += value
+        self.sum_xy += x * value
+        self.sum_xx += x * x
+
+        if self.ewma_alpha is not None:
+            if self.ewma is None:
+                self.ewma = value
+            else:
+                self.ewma = self.ewma_alpha * value + (1 - self.ewma_alpha) * self.ewma
+
+    def as_dict(self, days_period: Optional[int] = None) -> Dict:
+        """Retourne la tendance au format de calculate_regression_trend"""
+        return StatisticsService.fit_trend(
+            self.n, self.sum_x, self.sum_y, self.sum_xy, self.sum_xx,
+            self.x_min, self.x_max, days_period, self.ewma
+        )
+
+
 class StatisticsService:
     """Service pour calculer les statistiques d'entraînement"""
 
+    @staticmethod
+    def build_volume_summary(
+        total_sets: int,
+        total_reps: int,
+        total_weight: float,
+        exercises_count: int
+    ) -> Dict:
+        """
+        Construit le dictionnaire de statistiques de volume
+
+        Args:
+            total_sets: Nombre de séries
+            total_reps: Nombre total de répétitions
+            total_weight: Volume total (poids × répétitions)
+            exercises_count: Nombre d'exercices
+
+        Returns:
+            Dictionnaire avec les statistiques de volume
+        """
+        return {
+            'total_sets': total_sets,
+            'total_reps': total_reps,
+            'total_volume': round(total_weight, 2),
+            'exercises_count': exercises_count,
+            'average_volume_per_exercise': round(total_weight / max(exercises_count, 1), 2)
+        }
+
     @staticmethod
     def calculate_weekly_volume(workouts_data: List[Dict]) -> Dict:
         """
@@ -283,41 +606,134 @@ class StatisticsService:
                     total_reps += serie.get('reps', 0)
                     total_weight += serie.get('weight', 0) * serie.get('reps', 0)
 
+        return StatisticsService.build_volume_summary(
+            total_sets, total_reps, total_weight, exercises_count
+        )
+
+    @staticmethod
+    def calculate_weekly_volume_stream(series_rows: Iterable[Tuple]) -> Dict:
+        """
+        Calcule le volume d'entraînement à partir d'un flux de séries à plat
+
+        Variante en une passe de calculate_weekly_volume : les lignes sont
+        consommées une à une, sans construire la structure imbriquée
+        séances → exercices → séries. Adapté à un itérateur de queryset :
+
+            Serie.objects.filter(...).values_list(
+                'exercise__workout_id', 'exercise_id', 'weight', 'reps'
+            ).iterator()
+
+        Args:
+            series_rows: Itérable de tuples (workout_id, exercise_id, weight, reps)
+
+        Returns:
+            Dictionnaire avec les statistiques de volume
+        """
+        accumulator = _VolumeAccumulator()
+        for _workout_id, exercise_id, weight, reps in series_rows:
+            accumulator.add(exercise_id, weight, reps)
+        return accumulator.as_dict()
+
+    @staticmethod
+    def calculate_volume_by_iso_week(series_rows: Iterable[Tuple]) -> Dict[str, Dict]:
+        """
+        Calcule le volume d'entraînement par semaine ISO en une seule passe
+
+        Les dates aware sont ramenées à l'heure locale (TIME_ZONE) avant le
+        découpage : une séance du lundi à 0h30 compte dans la semaine du lundi.
+
+        Args:
+            series_rows: Itérable de tuples (date, exercise_id, weight, reps),
+                par exemple values_list('exercise__workout__date',
+                'exercise_id', 'weight', 'reps').iterator()
+
+        Returns:
+            Dictionnaire {"AAAA-Wss": statistiques de volume}, trié par semaine
+        """
+        weeks: Dict[Tuple[int, int], _VolumeAccumulator] = {}
+        for performed_at, exercise_id, weight, reps in series_rows:
+            if isinstance(performed_at, datetime) and timezone.is_aware(performed_at):
+                performed_at = timezone.localtime(performed_at)
+            iso_year, iso_week, _ = performed_at.isocalendar()
+            accumulator = weeks.get((iso_year, iso_week))
+            if accumulator is None:
+                accumulator = weeks[(iso_year, iso_week)] = _VolumeAccumulator()
+            accumulator.add(exercise_id, weight, reps)
+
         return {
-            'total_sets': total_sets,
-            'total_reps': total_reps,
-            'total_volume': round(total_weight, 2),
-            'exercises_count': exercises_count,
-            'average_volume_per_exercise': round(total_weight / max(exercises_count, 1), 2)
+            f"{iso_year}-W{iso_week:02d}": weeks[(iso_year, iso_week)].as_dict()
+            for iso_year, iso_week in sorted(weeks)
         }
 
+    @staticmethod
+    def classify_trend(percentage_change: float) -> str:
+        """
+        Qualifie une variation de performance
+
+        Args:
+            percentage_change: Variation en pourcentage sur la période
+
+        Returns:
+            Libellé de la tendance
+        """
+        if percentage_change > 5:
+            return 'strong_improvement'
+        elif percentage_change > 1:
+            return 'improvement'
+        elif percentage_change > -1:
+            return 'stable'
+        elif percentage_change > -5:
+            return 'slight_decline'
+        return 'decline'
+
     @staticmethod
     def calculate_progression_trend(
         performance_history: List[Dict],
-        days_period: int = 30
+        days_period: int = 30,
+        mode: str = 'endpoints'
     ) -> Dict:
         """
         Calcule la tendance de progression sur une période donnée
 
         Args:
-            performance_history: Historique des performances
+            performance_history: Historique des performances (dates ISO, date
+                ou datetime ; les valeurs naïves sont en heure locale)
             days_period: Période en jours à analyser
+            mode: 'endpoints' (premier et dernier point) ou 'regression'
+                (pente des moindres carrés sur tous les points)
 
         Returns:
             Dictionnaire avec les tendances de progression
         """
-        cutoff_date = datetime.now() - timedelta(days=days_period)
-        recent_data = [
-            item for item in performance_history
-            if datetime.fromisoformat(item['date']) >= cutoff_date
-        ]
+        cutoff_date = timezone.now() - timedelta(days=days_period)
+        recent_data = []
+        for item in performance_history:
+            item_date = item['date']
+            if isinstance(item_date, str):
+                item_date = datetime.fromisoformat(item_date)
+            elif not isinstance(item_date, datetime):
+                item_date = datetime.combine(item_date, datetime.min.time())
+            if timezone.is_naive(item_date):
+                item_date = timezone.make_aware(item_date)
+            if item_date >= cutoff_date:
+                recent_data.append((item_date, item))
+
+        if mode == 'regression':
+            result = StatisticsService.calculate_regression_trend(
+                [item_date for item_date, _ in recent_data],
+                [item.get('max_weight', 0) for _, item in recent_data],
+                days_period=None
+            )
+            if 'period_days' in result:
+                result['period_days'] = days_period
+            return result
 
         if len(recent_data) < 2:
             return {'trend': 'insufficient_data', 'percentage_change': 0}
 
         # Calcul simple de progression basé sur le premier et dernier enregistrement
-        first_performance = recent_data[0]
-        last_performance = recent_data[-1]
+        first_performance = recent_data[0][1]
+        last_performance = recent_data[-1][1]
 
         first_max = first_performance.get('max_weight', 0)
         last_max = last_performance.get('max_weight', 0)
@@ -327,20 +743,166 @@ class StatisticsService:
 
         percentage_change = ((last_max - first_max) / first_max) * 100
 
-        if percentage_change > 5:
-            trend = 'strong_improvement'
-        elif percentage_change > 1:
-            trend = 'improvement'
-        elif percentage_change > -1:
-            trend = 'stable'
-        elif percentage_change > -5:
-            trend = 'slight_decline'
-        else:
-            trend = 'decline'
-
         return {
-            'trend': trend,
+            'trend': StatisticsService.classify_trend(percentage_change),
             'percentage_change': round(percentage_change, 2),
             'period_days': days_period,
             'data_points': len(recent_data)
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def fit_trend(
+        n: int,
+        sum_x: float,
+        sum_y: float,
+        sum_xy: float,
+        sum_xx: float,
+        x_min: float,
+        x_max: float,
+        days_period: Optional[int] = None,
+        ewma: Optional[float] = None
+    ) -> Dict:
+        """
+        Calcule la droite des moindres carrés à partir des sommes cumulées
+
+        Args:
+            n: Nombre de points
+            sum_x, sum_y, sum_xy, sum_xx: Sommes cumulées (x en jours)
+            x_min, x_max: Bornes de la période observée (en jours)
+            days_period: Période analysée (reportée dans le résultat)
+            ewma: Moyenne mobile exponentielle finale, si calculée
+
+        Returns:
+            Dictionnaire avec la tendance, la variation et la pente par jour
+        """
+        denominator = n * sum_xx - sum_x * sum_x
+        if n < 2 or denominator <= 1e-12:
+            return {'trend': 'insufficient_data', 'percentage_change': 0}
+
+        slope = (n * sum_xy - sum_x * sum_y) / denominator
+        intercept = (sum_y - slope * sum_x) / n
+
+        # Variation entre les valeurs ajustées en début et fin de période
+        first_fit = intercept + slope * x_min
+        last_fit = intercept + slope * x_max
+        if first_fit <= 0:
+            return {'trend': 'no_baseline', 'percentage_change': 0}
+
+        percentage_change = ((last_fit - first_fit) / first_fit) * 100
+
+        result = {
+            'trend': StatisticsService.classify_trend(percentage_change),
+            'percentage_change': round(percentage_change, 2),
+            'slope_per_day': round(slope, 4),
+            'period_days': days_period,
+            'data_points': n
+        }
+        if ewma is not None:
+            result['ewma'] = round(ewma, 2)
+        return result
+
+    @staticmethod
+    def calculate_regression_trend(
+        timestamps,
+        values,
+        days_period: Optional[int] = 30,
+        ewma_alpha: Optional[float] = None
+    ) -> Dict:
+        """
+        Calcule la tendance par régression linéaire en une seule passe
+
+        Args:
+            timestamps: Dates déjà converties (datetime, secondes epoch ou
+                tableau NumPy datetime64/float), dans l'ordre chronologique
+            values: Valeurs de performance correspondantes (ex: poids max)
+            days_period: Période en jours à analyser (None = tout l'historique)
+            ewma_alpha: Coefficient de lissage de la moyenne mobile
+                exponentielle (None = pas de calcul)
+
+        Returns:
+            Dictionnaire avec les tendances de progression
+        """
+        cutoff = None
+        if days_period is not None:
+            cutoff = (timezone.now() - timedelta(days=days_period)).timestamp()
+
+        if np is not None and isinstance(timestamps, np.ndarray):
+            if np.issubdtype(timestamps.dtype, np.datetime64):
+                seconds = timestamps.astype('datetime64[s]').astype('int64').astype(float)
+            else:
+                seconds = timestamps.astype(float)
+            values = np.asarray(values, dtype=float)
+
+            if cutoff is not None:
+                mask = seconds >= cutoff
+                seconds, values = seconds[mask], values[mask]
+
+            if seconds.size < 2:
+                return {'trend': 'insufficient_data', 'percentage_change': 0}
+
+            x = (seconds - seconds[0]) / 86400
+            ewma = None
+            if ewma_alpha is not None:
+                ewma = values[0]
+                for value in values[1:]:
+                    ewma = ewma_alpha * value + (1 - ewma_alpha) * ewma
+
+            return StatisticsService.fit_trend(
+                int(x.size), float(x.sum()), float(values.sum()),
+                float((x * values).sum()), float((x * x).sum()),
+                float(x.min()), float(x.max()), days_period, ewma
+            )
+
+        accumulator = _TrendAccumulator(ewma_alpha)
+        for timestamp, value in zip(timestamps, values):
+            seconds = _TrendAccumulator.to_seconds(timestamp)
+            if cutoff is None or seconds >= cutoff:
+                accumulator.add(seconds, value)
+        return accumulator.as_dict(days_period)
+
+    @staticmethod
+    def calculate_progression_trends(
+        performance_rows: Iterable[Tuple],
+        days_period: Optional[int] = 30,
+        ewma_alpha: Optional[float] = None
+    ) -> Dict:
+        """
+        Calcule la tendance de plusieurs machines en une seule passe
+
+        Les lignes peuvent provenir directement d'un queryset, par exemple
+        values_list('exercise__machine_id', 'exercise__workout__date',
+        'weight').order_by('exercise__workout__date').iterator()
+
+        Args:
+            performance_rows: Itérable de tuples (machine_id, timestamp, valeur)
+                dans l'ordre chronologique
+            days_period: Période en jours à analyser (None = tout l'historique)
+            ewma_alpha: Coefficient de lissage de la moyenne mobile exponentielle
+
+        Returns:
+            Dictionnaire {machine_id: tendance}, trié de la meilleure à la
+            moins bonne progression
+        """
+        cutoff = None
+        if days_period is not None:
+            cutoff = (timezone.now() - timedelta(days=days_period)).timestamp()
+
+        accumulators: Dict = {}
+        for machine_id, timestamp, value in performance_rows:
+            seconds = _TrendAccumulator.to_seconds(timestamp)
+            if cutoff is not None and seconds < cutoff:
+                continue
+            accumulator = accumulators.get(machine_id)
+            if accumulator is None:
+                accumulator = accumulators[machine_id] = _TrendAccumulator(ewma_alpha)
+            accumulator.add(seconds, value)
+
+        trends = {
+            machine_id: accumulator.as_dict(days_period)
+            for machine_id, accumulator in accumulators.items()
+        }
+        return dict(sorted(
+            trends.items(),
+            key=lambda item: item[1]['percentage_change'],
+            reverse=True
+        ))
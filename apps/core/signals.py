@@ -0,0 +1,85 @@
+"""
+Signaux de l'application core
+Enregistre les suppressions des objets synchronisés avec l'application mobile
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+
+from .models import SyncTombstone
+from .sync import get_collections
+
+
+def resolve_owner(collection, instance, origin, collections):
+    """
+    Propriétaire d'un objet supprimé, avec le moins de requêtes possible
+
+    Les objets supprimés en cascade depuis un objet synchronisé (une séance,
+    ses exercices et leurs séries) partagent son propriétaire, calculé une
+    seule fois. Sinon le propriétaire est mémorisé par objet parent pour la
+    durée de la suppression.
+    """
+    if collection.user_path == 'user':
+        return instance.user_id
+
+    owners = origin.__dict__.setdefault('_sync_owners', {})
+    origin_collection = collections.get(type(origin))
+    if origin_collection is not None:
+        if 'origin' not in owners:
+            owners['origin'] = origin_collection.owner_id(origin)
+        return owners['origin']
+
+    relation = collection.user_path.split('__', 1)[0]
+    key = (collection.name, getattr(instance, collection.model._meta.get_field(relation).attname))
+    if key not in owners:
+        owners[key] = collection.owner_id(instance)
+    return owners[key]
+
+
+def record_tombstone(collection, collections):
+    def receiver(sender, instance, origin=None, using=None, **kwargs):
+        # Suppression du compte : ses traces partent avec lui
+        origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+        if origin_model is get_user_model():
+            return
+
+        if origin is None:
+            user_id = collection.owner_id(instance)
+            if user_id is not None:
+                SyncTombstone.objects.create(
+                    user_id=user_id, model=collection.name, object_id=instance.pk
+                )
+            return
+
+        user_id = resolve_owner(collection, instance, origin, collections)
+        if user_id is None:
+            return
+
+        # Traces d'une même suppression insérées en une fois à la validation
+        pending = origin.__dict__.get('_sync_tombstones')
+        if pending is None:
+            pending = origin.__dict__['_sync_tombstones'] = []
+            transaction.on_commit(
+                lambda: SyncTombstone.objects.using(using).bulk_create(pending, batch_size=1000),
+                using=using
+            )
+        pending.append(SyncTombstone(
+            user_id=user_id,
+            model=collection.name,
+            object_id=instance.pk,
+        ))
+    return receiver
+
+
+def connect():
+    """Branche un receveur post_delete par collection synchronisée"""
+    collections = {collection.model: collection for collection in get_collections()}
+    for collection in collections.values():
+        post_delete.connect(
+            record_tombstone(collection, collections),
+            sender=collection.model,
+            weak=False,
+            dispatch_uid=f'sync_tombstone_{collection.name}',
+        )
@@ -0,0 +1,203 @@
+"""
+Synchronisation incrémentale pour l'application mobile
+
+Le client envoie le jeton reçu lors de la synchronisation précédente ;
+il contient, pour chaque collection, la position (updated_at, id) déjà
+reçue. Seules les lignes modifiées depuis sont renvoyées, avec les
+identifiants supprimés (SyncTombstone), le tout en une requête HTTP.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SyncTombstone
+
+# Marge de recouvrement : les lignes modifiées dans les dernières secondes
+# sont renvoyées à nouveau, pour ne pas manquer une transaction validée tardivement
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Conservation des suppressions : un jeton plus ancien impose une resynchronisation complète
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 2000
+
+DELETED_KEY = 'deleted'
+
+
+class InvalidSyncToken(ValueError):
+    """Jeton de synchronisation illisible"""
+
+
+class SyncCollection:
+    """
+    Collection synchronisée : modèle et chemin vers l'utilisateur propriétaire
+    """
+
+    def __init__(self, name, model, user_path):
+        self.name = name
+        self.model = model
+        self.user_path = user_path
+
+    @property
+    def fields(self):
+        return [field.attname for field in self.model._meta.concrete_fields]
+
+    def queryset(self, user):
+        return self.model.objects.filter(**{self.user_path: user})
+
+    def owner_id(self, instance):
+        """Identifiant du propriétaire d'un objet (une requête pour les objets imbriqués)"""
+        if self.user_path == 'user':
+            return instance.user_id
+
+        relation, rest = self.user_path.split('__', 1)
+        field = self.model._meta.get_field(relation)
+        return field.related_model.objects.filter(
+            pk=getattr(instance, field.attname)
+        ).values_list(rest, flat=True).first()
+
+
+def get_collections():
+    """Collections synchronisées, dans l'ordre d'application conseillé au client"""
+    from apps.calendar.models import CalendarEvent, WorkoutPlan
+    from apps.workouts.models import Exercise, Serie, Workout
+
+    return [
+        SyncCollection('workouts', Workout, 'user'),
+        SyncCollection('exercises', Exercise, 'workout__user'),
+        SyncCollection('series', Serie, 'exercise__workout__user'),
+        SyncCollection('workout_plans', WorkoutPlan, 'user'),
+        SyncCollection('calendar_events', CalendarEvent, 'user'),
+    ]
+
+
+def encode_token(marks):
+    return base64.urlsafe_b64encode(json.dumps(marks).encode()).decode()
+
+
+def decode_token(token):
+    """
+    Returns:
+        {collection: (datetime, id)}
+
+    Raises:
+        InvalidSyncToken: si le jeton est illisible
+    """
+    if not token:
+        return {}
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        return {
+            name: (datetime.fromisoformat(position[0]), int(position[1]))
+            for name, position in raw.items()
+        }
+    except (TypeError, ValueError, KeyError, IndexError, AttributeError):
+        raise InvalidSyncToken("Jeton de synchronisation invalide")
+
+
+def after(field, position):
+    """Condition « strictement après (valeur, id) » sur l'ordre (field, id)"""
+    value, last_id = position
+    return Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': last_id})
+
+
+def next_position(previous, rows, field, has_more, now):
+    """
+    Position à mémoriser pour la prochaine synchronisation
+
+    Une fois la collection épuisée, la position recule jusqu'à la marge
+    de recouvrement.
+    """
+    if has_more:
+        return rows[-1][field], rows[-1]['id']
+
+    floor = now - SYNC_OVERLAP
+    if rows and rows[-1][field] < floor:
+        return rows[-1][field], rows[-1]['id']
+    if rows or previous is None:
+        return floor, 0
+    return previous
+
+
+def purge_tombstones(now=None):
+    """
+    Supprime les traces plus anciennes que la durée de conservation
+
+    Les jetons antérieurs déclenchent de toute façon une resynchronisation
+    complète (voir synchronize).
+
+    Returns:
+        Nombre de traces supprimées
+    """
+    now = now or timezone.now()
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+    return deleted
+
+
+def synchronize(user, token=None, limit=DEFAULT_LIMIT):
+    """
+    Calcule les modifications à transmettre au client
+
+    Returns:
+        Dictionnaire {token, has_more, reset, changes, deleted}
+    """
+    now = timezone.now()
+    marks = decode_token(token)
+
+    # Suppressions trop anciennes déjà purgées : repartir de zéro
+    reset = bool(marks) and (
+        DELETED_KEY not in marks or marks[DELETED_KEY][0] < now - TOMBSTONE_RETENTION
+    )
+    if reset:
+        marks = {}
+
+    new_marks = {}
+    changes = {}
+    has_more = False
+
+    for collection in get_collections():
+        previous = marks.get(collection.name)
+        queryset = collection.queryset(user).order_by('updated_at', 'pk')
+        if previous is not None:
+            queryset = queryset.filter(after('updated_at', previous))
+
+        rows = list(queryset.values(*collection.fields)[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+
+        changes[collection.name] = rows
+        has_more = has_more or more
+        new_marks[collection.name] = next_position(previous, rows, 'updated_at', more, now)
+
+    # Suppressions : un seul curseur pour toutes les collections
+    deleted = {collection.name: [] for collection in get_collections()}
+    previous = marks.get(DELETED_KEY)
+    tombstones = SyncTombstone.objects.filter(user=user).order_by('deleted_at', 'pk')
+    if previous is not None:
+        tombstones = tombstones.filter(after('deleted_at', previous))
+    else:
+        # Synchronisation complète : les suppressions passées sont sans objet
+        tombstones = tombstones.none()
+
+    rows = list(tombstones.values('id', 'model', 'object_id', 'deleted_at')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+    for row in rows:
+        deleted.setdefault(row['model'], []).append(row['object_id'])
+    has_more = has_more or more
+    new_marks[DELETED_KEY] = next_position(previous, rows, 'deleted_at', more, now)
+
+    return {
+        'token': encode_token({
+            name: [value.isoformat(), last_id] for name, (value, last_id) in new_marks.items()
+        }),
+        'has_more': has_more,
+        'reset': reset,
+        'changes': changes,
+        'deleted': deleted,
+    }
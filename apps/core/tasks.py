@@ -0,0 +1,13 @@
+"""
+Tâches Celery de l'application core
+"""
+
+from celery import shared_task
+
+from . import sync
+
+
+@shared_task
+def purge_sync_tombstones():
+    """Supprime les traces de suppression au-delà de la durée de conservation"""
+    return {'deleted': sync.purge_tombstones()}
@@ -0,0 +1,399 @@
+"""
+Tests de l'application core
+"""
+
+import io
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from datetime import timezone as dt_timezone
+from unittest import mock, skipIf
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.machines.models import Machine
+from apps.users.models import User
+from apps.workouts.models import Exercise, Serie, Workout
+
+from . import renderers, sync
+from .pagination import KeysetPagination, StandardPageNumberPagination
+from .models import SyncTombstone
+from .services import ObjectiveType, OneRMService, ProgressionService, StatisticsService, np
+
+
+class SyncTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='membre@example.com', first_name='Léa', last_name='Martin')
+        self.machine = Machine.objects.create(name='Presse', description='d', instructions='i')
+
+    def create_workout(self, name='Jambes', series=2, user=None):
+        workout = Workout.objects.create(user=user or self.user, name=name)
+        exercise = Exercise.objects.create(workout=workout, machine=self.machine)
+        for number in range(1, series + 1):
+            Serie.objects.create(exercise=exercise, set_number=number, reps=10)
+        return workout
+
+    def age_rows(self):
+        """Recule updated_at au-delà de la marge de recouvrement"""
+        past = timezone.now() - timedelta(hours=1)
+        for model in (Workout, Exercise, Serie):
+            model.objects.update(updated_at=past)
+
+
+class SynchronizeTests(SyncTestCase):
+
+    def test_incremental_sync_returns_only_changes(self):
+        first = self.create_workout('Jambes')
+        self.create_workout('Dos')
+        self.create_workout('Autre', user=User.objects.create(email='autre@example.com'))
+        self.age_rows()
+
+        payload = sync.synchronize(self.user)
+        self.assertFalse(payload['reset'])
+        self.assertEqual(len(payload['changes']['workouts']), 2)
+        self.assertEqual(len(payload['changes']['series']), 4)
+
+        first.name = 'Jambes lourdes'
+        first.save()
+        payload = sync.synchronize(self.user, payload['token'])
+        self.assertEqual(
+            [row['name'] for row in payload['changes']['workouts']], ['Jambes lourdes']
+        )
+        self.assertEqual(payload['changes']['series'], [])
+
+    def test_limit_pages_with_has_more(self):
+        for index in range(3):
+            self.create_workout(f'Séance {index}', series=0)
+        self.age_rows()
+
+        payload = sync.synchronize(self.user, limit=2)
+        self.assertTrue(payload['has_more'])
+        self.assertEqual(len(payload['changes']['workouts']), 2)
+
+        payload = sync.synchronize(self.user, payload['token'], limit=2)
+        self.assertFalse(payload['has_more'])
+        self.assertEqual([row['name'] for row in payload['changes']['workouts']], ['Séance 2'])
+
+    def test_deletions_are_sent_after_first_sync(self):
+        workout = self.create_workout(series=2)
+        workout_id = workout.pk
+        series_ids = list(Serie.objects.values_list('pk', flat=True))
+        token = sync.synchronize(self.user)['token']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.delete()
+
+        deleted = sync.synchronize(self.user, token)['deleted']
+        self.assertEqual(deleted['workouts'], [workout_id])
+        self.assertEqual(len(deleted['exercises']), 1)
+        self.assertEqual(sorted(deleted['series']), sorted(series_ids))
+
+    def test_expired_token_resets(self):
+        token = sync.encode_token({
+            sync.DELETED_KEY: [(timezone.now() - timedelta(days=365)).isoformat(), 0]
+        })
+        self.assertTrue(sync.synchronize(self.user, token)['reset'])
+
+    def test_invalid_token(self):
+        with self.assertRaises(sync.InvalidSyncToken):
+            sync.synchronize(self.user, 'pas-un-jeton')
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/sync/', {'token': 'pas-un-jeton'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TombstoneTests(SyncTestCase):
+
+    def test_cascade_inserts_tombstones_in_one_query(self):
+        workout = self.create_workout(series=20)
+
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                workout.delete()
+
+        self.assertEqual(SyncTombstone.objects.filter(user=self.user).count(), 22)
+        inserts = [query for query in queries if 'INSERT INTO "core_synctombstone"' in query['sql']]
+        self.assertEqual(len(inserts), 1)
+
+    def test_single_delete_records_owner(self):
+        self.create_workout(series=1)
+        serie = Serie.objects.get()
+        serie_id = serie.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            serie.delete()
+
+        tombstone = SyncTombstone.objects.get()
+        self.assertEqual((tombstone.user_id, tombstone.model, tombstone.object_id),
+                         (self.user.pk, 'series', serie_id))
+
+    def test_user_deletion_leaves_no_tombstones(self):
+        self.create_workout(series=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(SyncTombstone.objects.exists())
+
+    def test_purge_removes_expired_tombstones(self):
+        old = SyncTombstone.objects.create(user=self.user, model='workouts', object_id=1)
+        recent = SyncTombstone.objects.create(user=self.user, model='workouts', object_id=2)
+        SyncTombstone.objects.filter(pk=old.pk).update(
+            deleted_at=timezone.now() - sync.TOMBSTONE_RETENTION - timedelta(days=1)
+        )
+
+        self.assertEqual(sync.purge_tombstones(), 1)
+        self.assertEqual(list(SyncTombstone.objects.values_list('pk', flat=True)), [recent.pk])
+
+
+class TrendCutoffTests(TestCase):
+    """Fenêtre d'analyse des tendances en heure locale (TIME_ZONE)"""
+
+    def naive_local(self, moment):
+        return timezone.localtime(moment).replace(tzinfo=None)
+
+    def test_regression_trend_window_uses_local_time(self):
+        now = timezone.now()
+        # Juste avant la limite des 30 jours, exprimé en heure locale naïve
+        outside = self.naive_local(now - timedelta(days=30, minutes=30))
+        inside = self.naive_local(now - timedelta(days=10))
+
+        result = StatisticsService.calculate_regression_trend(
+            [outside, inside, self.naive_local(now)], [50, 100, 110], days_period=30
+        )
+        self.assertEqual(result['data_points'], 2)
+        self.assertEqual(result['percentage_change'], 10.0)
+
+    def test_all_timestamp_kinds_agree(self):
+        now = timezone.now()
+        moments = [now - timedelta(days=days) for days in (20, 10, 0)]
+        values = [100, 105, 110]
+
+        expected = StatisticsService.calculate_regression_trend(moments, values)
+        for timestamps in (
+            [self.naive_local(moment) for moment in moments],
+            [moment.timestamp() for moment in moments],
+        ):
+            self.assertEqual(
+                StatisticsService.calculate_regression_trend(timestamps, values), expected
+            )
+
+    def test_progression_trends_window_uses_local_time(self):
+        now = timezone.now()
+        rows = [
+            (1, self.naive_local(now - timedelta(days=30, minutes=30)), 50),
+            (1, self.naive_local(now - timedelta(days=10)), 100),
+            (1, self.naive_local(now), 110),
+            (2, now - timedelta(days=40), 80),
+        ]
+
+        trends = StatisticsService.calculate_progression_trends(rows, days_period=30)
+        self.assertEqual(list(trends), [1])
+        self.assertEqual(trends[1]['data_points'], 2)
+
+
+class VolumeByIsoWeekTests(TestCase):
+
+    def test_rows_are_bucketed_by_local_iso_week(self):
+        rows = [
+            # Lundi 8 janvier 2024 à 0h30 à Paris, encore dimanche en UTC
+            (datetime(2024, 1, 7, 23, 30, tzinfo=dt_timezone.utc), 1, 50, 10),
+            (date(2024, 1, 7), 2, 40, 10),
+            (datetime(2024, 1, 10, 18, 0), 1, 60, 8),
+            (date(2024, 1, 11), 3, None, None),
+        ]
+
+        weeks = StatisticsService.calculate_volume_by_iso_week(rows)
+        self.assertEqual(list(weeks), ['2024-W01', '2024-W02'])
+        self.assertEqual(weeks['2024-W01']['total_volume'], 400)
+        self.assertEqual(weeks['2024-W02'], {
+            'total_sets': 3,
+            'total_reps': 18,
+            'total_volume': 980,
+            'exercises_count': 2,
+            'average_volume_per_exercise': 490,
+        })
+
+
+class SuggestForWorkoutsTests(SyncTestCase):
+
+    def test_queries_do_not_depend_on_exercise_count(self):
+        workouts = [self.create_workout(f'Séance {index}', series=3) for index in range(5)]
+        Exercise.objects.update(target_weight=50, target_reps=10, target_sets=3)
+        Serie.objects.update(completed=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            suggestions = ProgressionService.suggest_for_workouts(
+                Workout.objects.filter(user=self.user)
+            )
+
+        self.assertEqual(len(queries), 2)
+        self.assertIn('IN (SELECT', queries[1]['sql'])
+        self.assertEqual(set(suggestions), {workout.pk for workout in workouts})
+        exercise = Exercise.objects.get(workout=workouts[0])
+        # Trois séries de 10 répétitions réussies : le poids progresse
+        self.assertGreater(suggestions[workouts[0].pk][exercise.pk], 50)
+        self.assertEqual(
+            ProgressionService.suggest_for_workout(workouts[0].pk),
+            {exercise.pk: suggestions[workouts[0].pk][exercise.pk]}
+        )
+
+
+@skipIf(np is None, "NumPy n'est pas installé")
+class OneRMArrayTests(TestCase):
+    """Les versions vectorisées reproduisent les versions scalaires"""
+
+    WEIGHTS = [60, 80.5, 100, 0, 50, 120]
+    REPS = [1, 5, 10, 8, -2, 3]
+
+    def scalar(self, formula, *args):
+        try:
+            return formula(*args)
+        except ValueError:
+            return None
+
+    def assertMatchesScalar(self, result, expected):
+        self.assertEqual(
+            [None if np.isnan(value) else float(value) for value in result], expected
+        )
+
+    def test_formulas_match_scalar_versions(self):
+        for array_formula, formula in (
+            (OneRMService.calculate_brzycki_array, OneRMService.calculate_brzycki),
+            (OneRMService.calculate_epley_array, OneRMService.calculate_epley),
+        ):
+            self.assertMatchesScalar(
+                array_formula(self.WEIGHTS, self.REPS),
+                [self.scalar(formula, w, r) for w, r in zip(self.WEIGHTS, self.REPS)]
+            )
+
+    def test_adaptive_1rm_accepts_scalars_and_arrays(self):
+        ages = [25, 40, 55, 30, 45, 62]
+        objectives = [
+            ObjectiveType.MUSCLE_GAIN, 'weight_loss', ObjectiveType.MAINTENANCE,
+            'inconnu', 'muscle_gain', ObjectiveType.WEIGHT_LOSS,
+        ]
+        by_value = {objective.value: objective for objective in ObjectiveType}
+        expected = [
+            self.scalar(OneRMService.calculate_adaptive_1rm, w, r, age, by_value.get(objective, objective))
+            for w, r, age, objective in zip(self.WEIGHTS, self.REPS, ages, objectives)
+        ]
+        self.assertMatchesScalar(
+            OneRMService.calculate_adaptive_1rm_array(self.WEIGHTS, self.REPS, ages, objectives),
+            expected
+        )
+
+        single_user = OneRMService.calculate_adaptive_1rm_array(
+            self.WEIGHTS, self.REPS, 40, ObjectiveType.MUSCLE_GAIN
+        )
+        self.assertEqual(single_user[1], OneRMService.calculate_adaptive_1rm(
+            80.5, 5, 40, ObjectiveType.MUSCLE_GAIN
+        ))
+
+
+class PaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='membre@example.com')
+        # Deux groupes de dates identiques : l'id départage les égalités
+        moments = [timezone.now() - timedelta(hours=index // 3) for index in range(7)]
+        SyncTombstone.objects.bulk_create([
+            SyncTombstone(user=self.user, model='series', object_id=index, deleted_at=moment)
+            for index, moment in enumerate(moments)
+        ])
+        self.expected = list(
+            SyncTombstone.objects.order_by('-deleted_at', '-id').values_list('pk', flat=True)
+        )
+
+    def request(self, url='/api/items/', **params):
+        return Request(APIRequestFactory().get(url, params))
+
+    def keyset_pages(self, **params):
+        paginator = KeysetPagination()
+        paginator.ordering = ('-deleted_at',)
+        pages, request = [], self.request(page_size=3, **params)
+        while True:
+            with self.assertNumQueries(2 if params.get('count') != 'false' else 1):
+                page = paginator.paginate_queryset(SyncTombstone.objects.all(), request)
+            pages.append(paginator.get_paginated_response([item.pk for item in page]).data)
+            if not pages[-1]['next']:
+                return pages
+            request = Request(APIRequestFactory().get(pages[-1]['next']))
+
+    def test_keyset_pages_cover_every_row_once(self):
+        pages = self.keyset_pages()
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual(pages[0]['count'], 7)
+        self.assertEqual([pk for page in pages for pk in page['results']], self.expected)
+
+    def test_keyset_count_can_be_skipped(self):
+        pages = self.keyset_pages(count='false')
+        self.assertNotIn('count', pages[0])
+        self.assertEqual(len(pages), 3)
+
+    def test_invalid_cursor_is_not_found(self):
+        paginator = KeysetPagination()
+        # 'WzEsIDJd' : [1, 2], position de mauvaise longueur pour l'ordre (-id)
+        for cursor in ('pas-un-curseur', 'WzEsIDJd'):
+            with self.assertRaises(NotFound):
+                paginator.paginate_queryset(SyncTombstone.objects.all(), self.request(cursor=cursor))
+
+    def test_page_number_without_count(self):
+        paginator = StandardPageNumberPagination()
+        paginator.page_size = 3
+        queryset = SyncTombstone.objects.order_by('-deleted_at', '-id')
+
+        with self.assertNumQueries(1):
+            page = paginator.paginate_queryset(queryset, self.request(page=3, count='false'))
+        data = paginator.get_paginated_response([item.pk for item in page]).data
+        self.assertEqual(data['results'], self.expected[6:])
+        self.assertIsNone(data['next'])
+        self.assertNotIn('count', data)
+        self.assertIn('page=2', data['previous'])
+
+
+class FastJSONTests(TestCase):
+    """Sortie identique à celle de DRF, avec ou sans orjson"""
+
+    PAYLOAD = {
+        'decimal': Decimal('82.50'),
+        'datetime': datetime(2024, 3, 4, 18, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'date': date(2024, 3, 4),
+        'duration': timedelta(minutes=90),
+        'lazy': gettext_lazy("Séance"),
+        'uuid': uuid.UUID(int=1),
+        'separators': 'ligne\u2028paragraphe\u2029',
+        1: [None, True, 1.5, 'é'],
+    }
+
+    def test_render_matches_drf(self):
+        expected = JSONRenderer().render(self.PAYLOAD)
+        self.assertEqual(renderers.FastJSONRenderer().render(self.PAYLOAD), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.PAYLOAD), expected)
+
+    def test_indented_render_and_empty_data(self):
+        renderer = renderers.FastJSONRenderer()
+        self.assertEqual(renderer.render(None), b'')
+        self.assertEqual(
+            renderer.render({'a': 1}, 'application/json; indent=2'),
+            JSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        )
+
+    def test_parse_matches_drf(self):
+        body = '{"name": "Développé", "sets": [1, 2.5, null]}'.encode()
+        self.assertEqual(
+            renderers.FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+        with self.assertRaises(ParseError):
+            renderers.FastJSONParser().parse(io.BytesIO(b'{"name": '))
@@ -3,6 +3,8 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 
+from . import sync
+
 
 class HealthCheckView(APIView):
     """
@@ -15,4 +17,31 @@ class HealthCheckView(APIView):
             'status': 'healthy',
             'message': 'MyCoach API is running successfully',
             'version': '1.0.0'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class SyncView(APIView):
+    """
+    Synchronisation incrémentale de l'application mobile
+
+    GET /api/sync/?token=<jeton précédent>&limit=<lignes par collection>
+    Sans jeton, renvoie toutes les données de l'utilisateur. Tant que
+    has_more est vrai, rappeler avec le nouveau jeton.
+    """
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', sync.DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, sync.MAX_LIMIT))
+
+        try:
+            payload = sync.synchronize(request.user, request.query_params.get('token'), limit)
+        except sync.InvalidSyncToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(payload)
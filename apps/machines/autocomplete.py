@@ -0,0 +1,134 @@
+"""
+Autocomplétion des noms de machines
+Index de trigrammes en mémoire, insensible aux accents et tolérant aux fautes de frappe
+"""
+
+import heapq
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+
+# Version partagée entre processus : incrémentée à chaque modification du catalogue
+VERSION_CACHE_KEY = 'machines:autocomplete:version'
+
+# Champs utilisés par l'index : une sauvegarde qui n'en touche aucun ne l'invalide pas
+INDEXED_FIELDS = {'name', 'brand', 'is_active'}
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Score minimal (coefficient de Dice) pour qu'une machine soit proposée
+MIN_SCORE = 0.15
+
+
+def fold(text):
+    """Minuscules sans accents ni ponctuation : « Développé-couché » → « developpe couche »"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(''.join(
+        char if char.isalnum() else ' ' for char in stripped.casefold()
+    ).split())
+
+
+def trigrams(folded):
+    """Trigrammes d'un texte replié, mots préfixés de deux espaces (favorise les débuts de mot)"""
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Index inversé trigramme → machines
+
+    Le score combine la similarité de Dice sur les trigrammes et un bonus
+    lorsque le nom commence par la saisie.
+    """
+
+    def __init__(self, machines):
+        self.entries = {}
+        self.postings = defaultdict(list)
+
+        for machine_id, name, brand in machines:
+            folded_name = fold(name)
+            grams = trigrams(f"{folded_name} {fold(brand)}")
+            self.entries[machine_id] = (name, brand, folded_name, len(grams))
+            for gram in grams:
+                self.postings[gram].append(machine_id)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Retourne les `limit` meilleures machines pour une saisie
+
+        Returns:
+            Liste de dictionnaires {id, name, brand, score}
+        """
+        folded = fold(query)
+        grams = trigrams(folded)
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scored = []
+        for machine_id, count in shared.items():
+            name, brand, folded_name, size = self.entries[machine_id]
+            score = 2 * count / (len(grams) + size)
+            if folded_name.startswith(folded):
+                score += 1
+            if score >= MIN_SCORE:
+                scored.append((score, machine_id))
+
+        return [
+            {
+                'id': machine_id,
+                'name': self.entries[machine_id][0],
+                'brand': self.entries[machine_id][1],
+                'score': round(score, 3),
+            }
+            for score, machine_id in heapq.nlargest(limit, scored)
+        ]
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Retourne l'index du processus, reconstruit si le catalogue a changé
+
+    La construction (une requête) a lieu à la première saisie puis après
+    chaque invalidation.
+    """
+    global _index, _index_version
+    from .models import Machine
+
+    version = cache.get(VERSION_CACHE_KEY, 0)
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = TrigramIndex(
+                Machine.objects.filter(is_active=True).values_list('id', 'name', 'brand')
+            )
+            _index_version = version
+    return _index
+
+
+def invalidate():
+    """Invalide l'index de tous les processus"""
+    global _index
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+    _index = None
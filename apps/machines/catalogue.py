@@ -0,0 +1,94 @@
+"""
+Cache des réponses du catalogue (machines, groupes musculaires, labels)
+
+Les clés incluent un numéro de version du catalogue, incrémenté par les
+signaux et par les mises à jour en masse des statistiques d'évaluation :
+l'invalidation est immédiate et les anciennes entrées expirent d'elles-mêmes.
+Le même numéro sert d'ETag, ce qui permet de répondre 304 sans rien
+recalculer.
+
+La version doit être partagée par tous les processus : sans cache partagé
+(locmem), une modification ne serait vue que par le processus qui l'a
+faite, et les réponses ne sont donc pas mises en cache.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.core.cache import is_shared_cache
+
+VERSION_CACHE_KEY = 'catalogue:version'
+
+# Durée de conservation des réponses en cache
+CATALOGUE_TIMEOUT = 60 * 60 * 24
+
+
+def get_version():
+    """Version courante du catalogue"""
+    cache.add(VERSION_CACHE_KEY, 1, None)
+    return cache.get(VERSION_CACHE_KEY, 1)
+
+
+def bump_version():
+    """Invalide toutes les réponses du catalogue"""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 2, None)
+
+
+def etag_matches(etag, if_none_match):
+    """Comparaison faible d'un ETag avec l'en-tête If-None-Match (liste ou *)"""
+    candidates = parse_etags(if_none_match)
+    return '*' in candidates or any(
+        candidate.removeprefix('W/') == etag for candidate in candidates
+    )
+
+
+def catalogue_cached(max_age=None):
+    """
+    Met en cache la réponse d'une vue du catalogue (statut 200 uniquement,
+    avec un cache partagé)
+
+    Args:
+        max_age: Durée (secondes) au-delà de laquelle la réponse est
+            recalculée même sans modification du catalogue, pour les données
+            qui évoluent sans passer par les signaux (popularité)
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if not is_shared_cache():
+                return view_method(self, request, *args, **kwargs)
+
+            version = get_version()
+            if max_age:
+                version = f"{version}.{int(time.time() // max_age)}"
+
+            url = request.build_absolute_uri()
+            digest = hashlib.md5(
+                f"{type(self).__name__}:{self.action}:{url}".encode()
+            ).hexdigest()
+            etag = f'"{version}-{digest}"'
+
+            if etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+            key = f"catalogue:{version}:{digest}"
+            data = cache.get(key)
+            if data is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                cache.set(key, data, CATALOGUE_TIMEOUT)
+
+            return Response(data, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+        return wrapper
+    return decorator
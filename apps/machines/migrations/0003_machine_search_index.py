@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# SQL figé à la création de l'index : la migration ne dépend pas de apps.machines.search
+
+# Configuration « french » précédée d'unaccent : accents ignorés comme avec
+# remove_diacritics côté FTS5, les deux moteurs classent les mêmes termes
+POSTGRESQL_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TEXT SEARCH CONFIGURATION machines_french_unaccent (COPY = french)",
+    "ALTER TEXT SEARCH CONFIGURATION machines_french_unaccent "
+    "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem",
+    "ALTER TABLE machines_machine ADD COLUMN search_vector tsvector",
+    "CREATE INDEX machines_machine_search_gin ON machines_machine USING GIN (search_vector)",
+    "UPDATE machines_machine SET search_vector = "
+    "setweight(to_tsvector('machines_french_unaccent', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('machines_french_unaccent', "
+    "coalesce(brand, '') || ' ' || coalesce(model, '')), 'B') || "
+    "setweight(to_tsvector('machines_french_unaccent', coalesce(description, '')), 'C')",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS machines_machine_search_gin",
+    "ALTER TABLE machines_machine DROP COLUMN IF EXISTS search_vector",
+    "DROP TEXT SEARCH CONFIGURATION IF EXISTS machines_french_unaccent",
+]
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE machines_machine_fts USING fts5("
+    "name, brand, description, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO machines_machine_fts (rowid, name, brand, description) "
+    "SELECT id, name, brand || ' ' || model, description FROM machines_machine",
+]
+
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS machines_machine_fts",
+]
+
+
+def run_for_vendor(postgresql, sqlite):
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgresql,
+            'sqlite': sqlite,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRESQL_CREATE, SQLITE_CREATE),
+            run_for_vendor(POSTGRESQL_DROP, SQLITE_DROP),
+        ),
+    ]
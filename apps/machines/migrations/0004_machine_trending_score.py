@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0003_machine_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machine',
+            name='trending_score',
+            field=models.FloatField(default=-1000000.0, editable=False, help_text="log2 des utilisations pondérées par une décroissance exponentielle (demi-vie d'une semaine)", verbose_name='Score tendance'),
+        ),
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['trending_score'], name='machines_ma_trendin_d185ea_idx'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Machine = apps.get_model('machines', 'Machine')
+    MachineRating = apps.get_model('machines', 'MachineRating')
+
+    stats = {}
+    rows = MachineRating.objects.values('machine', 'rating').annotate(total=Count('pk')).order_by()
+    for row in rows:
+        machine_stats = stats.setdefault(row['machine'], {'rating_count': 0, 'rating_sum': 0})
+        machine_stats['rating_count'] += row['total']
+        machine_stats['rating_sum'] += row['total'] * row['rating']
+        machine_stats[f"rating_count_{row['rating']}"] = row['total']
+
+    machines = list(Machine.objects.filter(pk__in=stats))
+    for machine in machines:
+        for field, value in stats[machine.pk].items():
+            setattr(machine, field, value)
+    Machine.objects.bulk_update(machines, [
+        'rating_count', 'rating_sum',
+        'rating_count_1', 'rating_count_2', 'rating_count_3', 'rating_count_4', 'rating_count_5',
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0004_machine_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre d'évaluations"),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notes 1 étoile'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notes 2 étoiles'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notes 3 étoiles'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notes 4 étoiles'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Notes 5 étoiles'),
+        ),
+        migrations.AddField(
+            model_name='machine',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Somme des notes'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinLengthValidator
 
+from .catalogue import bump_version
+from .popularity import NO_USE_SCORE
+
 
 class MuscleGroup(models.Model):
     """
@@ -79,6 +84,48 @@ class Label(models.Model):
         return self.name
 
 
+class MachineQuerySet(models.QuerySet):
+    """
+    QuerySet des machines
+    """
+
+    def apply_rating(self, rating, delta):
+        """
+        Ajoute (delta=1) ou retire (delta=-1) une note aux statistiques dénormalisées
+
+        Mise à jour atomique avec des expressions F(), sans lecture préalable.
+        update() ne déclenche pas les signaux : la version du catalogue, dont
+        les réponses incluent ces statistiques, est incrémentée ici.
+        """
+        updated = self.update(**{
+            'rating_count': F('rating_count') + delta,
+            'rating_sum': F('rating_sum') + delta * rating,
+            f'rating_count_{rating}': F(f'rating_count_{rating}') + delta,
+        })
+        bump_version()
+        return updated
+
+    def refresh_rating_stats(self):
+        """Recalcule les statistiques d'évaluation depuis MachineRating (une requête UPDATE)"""
+        def ratings(**filters):
+            return MachineRating.objects.filter(machine=OuterRef('pk'), **filters).order_by().values('machine')
+
+        def count(**filters):
+            return Coalesce(Subquery(
+                ratings(**filters).annotate(total=Count('pk')).values('total')
+            ), 0)
+
+        updated = self.update(
+            rating_count=count(),
+            rating_sum=Coalesce(Subquery(
+                ratings().annotate(total=Sum('rating')).values('total')
+            ), 0),
+            **{f'rating_count_{i}': count(rating=i) for i in range(1, 6)}
+        )
+        bump_version()
+        return updated
+
+
 class Machine(models.Model):
     """
     Modèle représentant une machine/équipement de musculation
@@ -257,10 +304,36 @@ class Machine(models.Model):
         help_text="Score basé sur l'utilisation (calculé automatiquement)"
     )
 
+    trending_score = models.FloatField(
+        default=NO_USE_SCORE,
+        editable=False,
+        verbose_name="Score tendance",
+        help_text="log2 des utilisations pondérées par une décroissance exponentielle (demi-vie d'une semaine)"
+    )
+
+    # Évaluations (maintenues par les signaux de MachineRating)
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre d'évaluations"
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Somme des notes"
+    )
+    rating_count_1 = models.PositiveIntegerField(default=0, editable=False, verbose_name="Notes 1 étoile")
+    rating_count_2 = models.PositiveIntegerField(default=0, editable=False, verbose_name="Notes 2 étoiles")
+    rating_count_3 = models.PositiveIntegerField(default=0, editable=False, verbose_name="Notes 3 étoiles")
+    rating_count_4 = models.PositiveIntegerField(default=0, editable=False, verbose_name="Notes 4 étoiles")
+    rating_count_5 = models.PositiveIntegerField(default=0, editable=False, verbose_name="Notes 5 étoiles")
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = MachineQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Machine"
         verbose_name_plural = "Machines"
@@ -269,6 +342,7 @@ class Machine(models.Model):
             models.Index(fields=['machine_type']),
             models.Index(fields=['is_active', 'is_maintenance']),
             models.Index(fields=['popularity_score']),
+            models.Index(fields=['trending_score']),
         ]
 
     def __str__(self):
@@ -288,8 +362,24 @@ class Machine(models.Model):
 
     @property
     def primary_labels(self):
-        """Retourne les labels principaux uniquement"""
-        return self.labels.filter(is_primary=True)
+        """
+        Retourne les labels principaux uniquement
+
+        Filtré en Python pour profiter du prefetch_related('labels') des listes.
+        """
+        return [label for label in self.labels.all() if label.is_primary]
+
+    @property
+    def average_rating(self):
+        """Note moyenne (None sans évaluation)"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 1)
+
+    @property
+    def rating_distribution(self):
+        """Nombre d'évaluations par note ({'1': n, ..., '5': n})"""
+        return {str(i): getattr(self, f'rating_count_{i}') for i in range(1, 6)}
 
     def get_weight_range_display(self):
         """Retourne l'affichage de la plage de poids"""
@@ -302,9 +392,27 @@ class Machine(models.Model):
         return "Poids libre"
 
     def increment_popularity(self):
-        """Incrémente le score de popularité"""
-        self.popularity_score += 1
-        self.save(update_fields=['popularity_score'])
+        """
+        Enregistre une utilisation (reportée en base par la tâche flush_popularity,
+        ou écrite directement sans cache partagé)
+
+        Returns:
+            Score de popularité incluant les utilisations en attente
+        """
+        from .popularity import pending_uses, record_use, write_behind_enabled
+
+        record_use(self.pk)
+        if not write_behind_enabled():
+            self.refresh_from_db(fields=['popularity_score', 'trending_score'])
+            return self.popularity_score
+        return self.popularity_score + pending_uses(self.pk)
+
+    @property
+    def trending_popularity(self):
+        """Nombre d'utilisations récentes pondérées (décroissance exponentielle)"""
+        from .popularity import decayed_value
+
+        return round(decayed_value(self.trending_score), 1)
 
 
 class MachineRating(models.Model):
@@ -340,4 +448,11 @@ class MachineRating(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.machine.name} - {self.rating}/5 par {self.user.get_full_name()}"
\ No newline at end of file
+        return f"{self.machine.name} - {self.rating}/5 par {self.user.get_full_name()}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valeurs chargées, pour ajuster les statistiques de la machine à la modification
+        instance._loaded_rating = (instance.__dict__.get('machine_id'), instance.__dict__.get('rating'))
+        return instance
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Compteur de popularité différé (write-behind)
+
+Chaque utilisation incrémente un compteur atomique en cache (Redis en
+production) rangé dans un créneau de temps ; la première utilisation d'une
+machine dans un créneau l'inscrit dans la liste des machines modifiées de ce
+créneau. Une tâche périodique reporte en base les seules machines modifiées
+des créneaux clos, en une requête UPDATE, sans verrou de ligne par
+utilisation. Sans cache partagé entre processus (locmem), les compteurs des
+processus web seraient invisibles pour le worker : chaque utilisation est
+alors écrite directement en base.
+
+Si celery beat ne tourne pas, les créneaux en retard sont reportés par la
+première utilisation qui le constate : les compteurs ne sont pas perdus tant
+qu'ils restent en cache (COUNTER_TIMEOUT). Le cache ne doit donc pas évincer
+ces clés (Redis : maxmemory-policy noeviction ou volatile-*) ; un compteur
+évincé avant le report est perdu, la popularité reste alors sous-estimée.
+
+Le score tendance suit une décroissance exponentielle (demi-vie d'une
+semaine) sans réécrire les lignes : chaque utilisation vaut
+2^((t - EPOCH) / HALF_LIFE). Le score stocké est le log2 de la somme de ces
+poids : il croît linéairement avec le temps (pas de dépassement de
+capacité) et le tri sur la valeur stockée donne le classement décroissant.
+Une machine jamais utilisée vaut NO_USE_SCORE (log2 de 0).
+"""
+
+import math
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Abs, Greatest, Log, Power
+
+from apps.core.cache import is_shared_cache
+
+# Durée d'un créneau de comptage (secondes)
+SLOT_SECONDS = 60
+
+# Conservation des compteurs non reportés
+COUNTER_TIMEOUT = 60 * 60 * 24
+
+# Nombre maximal de créneaux rattrapés par un report (durée de vie des compteurs)
+MAX_SLOTS = COUNTER_TIMEOUT // SLOT_SECONDS
+
+# Retard (en créneaux) au-delà duquel une utilisation reporte elle-même les
+# créneaux clos, celery beat ne tournant visiblement pas
+STALE_SLOTS = 5
+
+LAST_FLUSHED_KEY = 'popularity:flushed_slot'
+FLUSH_LOCK_KEY = 'popularity:flush_lock'
+
+# Décroissance du score tendance
+EPOCH = 1704067200  # 2024-01-01 UTC
+HALF_LIFE = 60 * 60 * 24 * 7
+
+# Score tendance sans aucune utilisation : sous le poids de toute utilisation
+# possible, sans valeur infinie en base
+NO_USE_SCORE = -1e6
+
+# Écart (en log2) au-delà duquel le plus petit terme d'une somme est négligeable
+LOG_PRECISION = 64
+
+
+def write_behind_enabled():
+    """Le report différé suppose un cache partagé entre processus web et worker"""
+    return is_shared_cache()
+
+
+def current_slot(now=None):
+    return int((now or time.time()) // SLOT_SECONDS)
+
+
+def counter_key(slot, machine_id):
+    return f"popularity:{slot}:{machine_id}"
+
+
+def dirty_count_key(slot):
+    return f"popularity:{slot}:dirty"
+
+
+def dirty_key(slot, index):
+    return f"popularity:{slot}:dirty:{index}"
+
+
+def log_weight(timestamp):
+    """log2 du poids d'une utilisation à l'instant donné dans le score tendance"""
+    return (timestamp - EPOCH) / HALF_LIFE
+
+
+def decayed_value(trending_score, now=None):
+    """Nombre d'utilisations pondérées ramené à l'instant présent"""
+    return 2 ** (trending_score - log_weight(now or time.time()))
+
+
+def log_sum(values):
+    """log2(somme des 2^v), sans dépassement de capacité"""
+    highest = max(values)
+    return highest + math.log2(sum(2 ** (value - highest) for value in values))
+
+
+def add_to_trending(log_value):
+    """
+    Expression SQL ajoutant 2^log_value au score tendance (stocké en log2)
+
+    log2(2^a + 2^b) = max(a, b) + log2(1 + 2^-|a - b|)
+    """
+    difference = Greatest(-Abs(F('trending_score') - log_value), Value(-LOG_PRECISION))
+    return Greatest(F('trending_score'), log_value) + Log(
+        Value(2.0), Value(1.0) + Power(Value(2.0), difference)
+    )
+
+
+def register_dirty(slot, machine_id):
+    """Inscrit la machine dans la liste des machines modifiées du créneau"""
+    count_key = dirty_count_key(slot)
+    cache.add(count_key, 0, COUNTER_TIMEOUT)
+    try:
+        index = cache.incr(count_key)
+    except ValueError:
+        cache.set(count_key, 1, COUNTER_TIMEOUT)
+        index = 1
+    cache.set(dirty_key(slot, index), machine_id, COUNTER_TIMEOUT)
+
+
+def record_use(machine_id, now=None):
+    """
+    Enregistre une utilisation (en cache, ou directement en base sans cache partagé)
+
+    Returns:
+        Nombre d'utilisations en attente de report dans le créneau courant
+    """
+    from .models import Machine
+
+    now = now or time.time()
+    if not write_behind_enabled():
+        Machine.objects.filter(pk=machine_id).update(
+            popularity_score=F('popularity_score') + 1,
+            trending_score=add_to_trending(Value(log_weight(now))),
+        )
+        return 0
+
+    slot = current_slot(now)
+    key = counter_key(slot, machine_id)
+    cache.add(key, 0, COUNTER_TIMEOUT)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Clé expirée entre add et incr
+        cache.set(key, 1, COUNTER_TIMEOUT)
+        count = 1
+    if count == 1:
+        register_dirty(slot, machine_id)
+        if cache.get(LAST_FLUSHED_KEY, slot - MAX_SLOTS) < slot - STALE_SLOTS:
+            flush(now)
+    return count
+
+
+def pending_uses(machine_id, now=None):
+    """Utilisations enregistrées mais pas encore reportées"""
+    if not write_behind_enabled():
+        return 0
+
+    slot = current_slot(now)
+    first = max(cache.get(LAST_FLUSHED_KEY, slot - MAX_SLOTS) + 1, slot - MAX_SLOTS)
+    keys = [counter_key(s, machine_id) for s in range(first, slot + 1)]
+    return sum(cache.get_many(keys).values())
+
+
+def dirty_machines(slots):
+    """Couples (créneau, machine) modifiés dans les créneaux donnés"""
+    counts = cache.get_many([dirty_count_key(s) for s in slots])
+    keys = [
+        dirty_key(s, index)
+        for s in slots
+        for index in range(1, counts.get(dirty_count_key(s), 0) + 1)
+    ]
+    entries = cache.get_many(keys)
+    return {
+        (int(key.split(':')[1]), machine_id) for key, machine_id in entries.items()
+    }, list(counts) + keys
+
+
+def flush(now=None):
+    """
+    Reporte en base les créneaux clos
+
+    Seuls les compteurs des machines inscrites comme modifiées sont lus.
+
+    Returns:
+        Nombre de machines mises à jour
+    """
+    from .models import Machine
+
+    if not write_behind_enabled():
+        return 0
+    if not cache.add(FLUSH_LOCK_KEY, True, SLOT_SECONDS * 5):
+        return 0
+
+    try:
+        slot = current_slot(now)
+        first = max(cache.get(LAST_FLUSHED_KEY, slot - MAX_SLOTS) + 1, slot - MAX_SLOTS)
+        slots = range(first, slot)
+        if not slots:
+            return 0
+
+        dirty, bookkeeping_keys = dirty_machines(slots)
+        keys = {counter_key(s, machine_id): (s, machine_id) for s, machine_id in dirty}
+        counts = cache.get_many(list(keys))
+
+        uses = {}
+        trending = {}
+        for key, count in counts.items():
+            if not count:
+                continue
+            s, machine_id = keys[key]
+            uses[machine_id] = uses.get(machine_id, 0) + count
+            trending.setdefault(machine_id, []).append(
+                math.log2(count) + log_weight((s + 0.5) * SLOT_SECONDS)
+            )
+
+        if uses:
+            Machine.objects.filter(pk__in=uses).update(
+                popularity_score=F('popularity_score') + Case(
+                    *[When(pk=pk, then=Value(count)) for pk, count in uses.items()],
+                    output_field=IntegerField()
+                ),
+                trending_score=add_to_trending(Case(
+                    *[When(pk=pk, then=Value(log_sum(values))) for pk, values in trending.items()],
+                    output_field=FloatField()
+                )),
+            )
+
+        cache.delete_many(list(counts) + bookkeeping_keys)
+        cache.set(LAST_FLUSHED_KEY, slot - 1, None)
+        return len(uses)
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
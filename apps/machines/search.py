@@ -0,0 +1,125 @@
+"""
+Index de recherche plein texte du catalogue de machines
+
+PostgreSQL : colonne tsvector pondérée indexée en GIN (configuration « french »
+précédée d'unaccent, créée par la migration 0003)
+SQLite : table virtuelle FTS5 (remove_diacritics, classement BM25)
+Les deux moteurs ignorent les accents : « developpe » trouve « Développé ».
+Les autres moteurs n'ont pas d'index : la recherche retombe sur icontains.
+"""
+
+import re
+
+from django.db import connection
+
+MACHINE_TABLE = 'machines_machine'
+FTS_TABLE = 'machines_machine_fts'
+
+# Nombre maximal de résultats classés
+SEARCH_LIMIT = 500
+
+# Champs texte indexés : une sauvegarde qui n'en touche aucun ne réindexe pas
+INDEXED_FIELDS = {'name', 'brand', 'model', 'description'}
+
+# Configuration de recherche PostgreSQL (voir la migration 0003)
+PG_CONFIG = 'machines_french_unaccent'
+
+# Poids : nom (A) > marque/modèle (B) > description (C)
+PG_VECTOR = (
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(brand, '') || ' ' || coalesce(model, '')), 'B') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+# Poids BM25 des colonnes FTS5 (name, brand, description)
+FTS_WEIGHTS = '10.0, 4.0, 1.0'
+
+
+def tokenize(query):
+    """Mots de la requête (caractères alphanumériques uniquement)"""
+    return re.findall(r'\w+', query)[:10]
+
+
+class MachineSearchIndex:
+    """
+    Maintient et interroge l'index plein texte des machines
+    """
+
+    @staticmethod
+    def is_supported(using=None):
+        return (using or connection).vendor in ('postgresql', 'sqlite')
+
+    @classmethod
+    def rebuild(cls, using=None):
+        """Réindexe tout le catalogue"""
+        cls.update(None, using)
+
+    @classmethod
+    def update(cls, machine_ids, using=None):
+        """
+        Réindexe des machines (toutes si machine_ids vaut None)
+
+        Les machines supprimées disparaissent de l'index.
+        """
+        using = using or connection
+        if machine_ids is not None:
+            machine_ids = list(machine_ids)
+            if not machine_ids:
+                return
+            placeholders = ', '.join(['%s'] * len(machine_ids))
+            where = f" WHERE id IN ({placeholders})"
+            fts_where = f" WHERE rowid IN ({placeholders})"
+        else:
+            machine_ids = []
+            where = fts_where = ''
+
+        if using.vendor == 'postgresql':
+            with using.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {MACHINE_TABLE} SET search_vector = {PG_VECTOR}{where}",
+                    machine_ids
+                )
+        elif using.vendor == 'sqlite':
+            with using.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}{fts_where}", machine_ids)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, brand, description) "
+                    f"SELECT id, name, brand || ' ' || model, description "
+                    f"FROM {MACHINE_TABLE}{where}",
+                    machine_ids
+                )
+
+    @classmethod
+    def search(cls, query, limit=SEARCH_LIMIT, using=None):
+        """
+        Recherche les machines correspondant à tous les mots (préfixes) de la requête
+
+        Returns:
+            Identifiants classés par pertinence décroissante, ou None si le
+            moteur de base de données n'a pas d'index plein texte
+        """
+        using = using or connection
+        if not cls.is_supported(using):
+            return None
+
+        words = tokenize(query)
+        if not words:
+            return []
+
+        if using.vendor == 'postgresql':
+            sql = (
+                f"SELECT id FROM {MACHINE_TABLE}, to_tsquery('{PG_CONFIG}', %s) query "
+                f"WHERE search_vector @@ query "
+                f"ORDER BY ts_rank_cd(search_vector, query) DESC, name LIMIT %s"
+            )
+            params = [' & '.join(f"{word}:*" for word in words), limit]
+        else:
+            sql = (
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"ORDER BY bm25({FTS_TABLE}, {FTS_WEIGHTS}) LIMIT %s"
+            )
+            params = [' '.join(f'"{word}"*' for word in words), limit]
+
+        with using.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
@@ -1,6 +1,12 @@
 from rest_framework import serializers
+
+from apps.core.serializers import DynamicFieldsMixin
+
 from .models import Machine, MuscleGroup, Label, MachineRating
 
+# Nombre d'évaluations récentes incluses dans le détail d'une machine
+RECENT_RATINGS_COUNT = 5
+
 
 class MuscleGroupSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,7 +21,7 @@ class LabelSerializer(serializers.ModelSerializer):
 
 
 class MachineRatingSerializer(serializers.ModelSerializer):
-    user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    user_name = serializers.CharField(source='user.display_name', read_only=True)
 
     class Meta:
         model = MachineRating
@@ -23,14 +29,23 @@ class MachineRatingSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class MachineListSerializer(serializers.ModelSerializer):
-    """Serializer simplifié pour la liste des machines"""
+class MachineListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer simplifié pour la liste des machines
+
+    Paramètres de requête :
+        fields: champs à renvoyer (ex. ?fields=id,name,primary_muscles)
+        compact: relations renvoyées sous forme d'identifiants et libellés
+            omis ; ils se résolvent avec le dictionnaire /machines/dictionary/
+        expand: relations à garder détaillées en mode compact
+    """
     primary_muscles = MuscleGroupSerializer(many=True, read_only=True)
     primary_labels = LabelSerializer(many=True, read_only=True)
     machine_type_display = serializers.CharField(source='get_machine_type_display', read_only=True)
     difficulty_display = serializers.CharField(source='get_difficulty_level_display', read_only=True)
     is_available = serializers.BooleanField(read_only=True)
     weight_range = serializers.CharField(source='get_weight_range_display', read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Machine
@@ -38,16 +53,37 @@ class MachineListSerializer(serializers.ModelSerializer):
             'id', 'name', 'brand', 'machine_type', 'machine_type_display',
             'difficulty_level', 'difficulty_display', 'primary_muscles',
             'primary_labels', 'image', 'is_available', 'weight_range',
-            'popularity_score'
+            'popularity_score', 'average_rating', 'rating_count'
         ]
 
+    # Relations remplacées par leurs identifiants en mode compact
+    COMPACT_RELATIONS = ('primary_muscles', 'primary_labels')
+    # Libellés fournis par le dictionnaire du catalogue en mode compact
+    COMPACT_OMITTED = ('machine_type_display', 'difficulty_display')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if request is None or request.query_params.get('compact', '').lower() not in ('true', '1'):
+            return
+
+        expand = self.query_param_list(request, 'expand')
+        for name in self.COMPACT_RELATIONS:
+            if name in self.fields and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+        for name in self.COMPACT_OMITTED:
+            self.fields.pop(name, None)
+
 
 class MachineDetailSerializer(serializers.ModelSerializer):
     """Serializer complet pour les détails d'une machine"""
     primary_muscles = MuscleGroupSerializer(many=True, read_only=True)
     secondary_muscles = MuscleGroupSerializer(many=True, read_only=True)
     labels = LabelSerializer(many=True, read_only=True)
-    ratings = MachineRatingSerializer(many=True, read_only=True)
+    # Évaluations les plus récentes ; l'historique complet est paginé
+    # sur /machines/{id}/ratings/
+    ratings = serializers.SerializerMethodField()
 
     machine_type_display = serializers.CharField(source='get_machine_type_display', read_only=True)
     difficulty_display = serializers.CharField(source='get_difficulty_level_display', read_only=True)
@@ -55,9 +91,10 @@ class MachineDetailSerializer(serializers.ModelSerializer):
     weight_range = serializers.CharField(source='get_weight_range_display', read_only=True)
     all_muscle_groups = MuscleGroupSerializer(many=True, read_only=True)
 
-    # Statistiques calculées
-    average_rating = serializers.SerializerMethodField()
-    total_ratings = serializers.SerializerMethodField()
+    # Statistiques d'évaluation (dénormalisées sur la machine)
+    average_rating = serializers.FloatField(read_only=True)
+    total_ratings = serializers.IntegerField(source='rating_count', read_only=True)
+    rating_distribution = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
     class Meta:
         model = Machine
@@ -69,19 +106,17 @@ class MachineDetailSerializer(serializers.ModelSerializer):
             'supports_resistance', 'min_weight', 'max_weight', 'weight_increment',
             'image', 'is_available', 'gym_location', 'popularity_score',
             'weight_range', 'ratings', 'average_rating', 'total_ratings',
-            'created_at', 'updated_at'
+            'rating_distribution', 'created_at', 'updated_at'
         ]
 
-    def get_average_rating(self, obj):
-        """Calcule la note moyenne de la machine"""
-        ratings = obj.ratings.all()
-        if ratings:
-            return round(sum(r.rating for r in ratings) / len(ratings), 1)
-        return None
-
-    def get_total_ratings(self, obj):
-        """Retourne le nombre total d'évaluations"""
-        return obj.ratings.count()
+    def get_ratings(self, obj):
+        """Évaluations récentes (préchargées par la vue, sinon une requête)"""
+        ratings = getattr(obj, 'recent_ratings', None)
+        if ratings is None:
+            ratings = obj.ratings.select_related('user').order_by(
+                '-created_at', '-id'
+            )[:RECENT_RATINGS_COUNT]
+        return MachineRatingSerializer(ratings, many=True, context=self.context).data
 
 
 class MachineCreateUpdateSerializer(serializers.ModelSerializer):
@@ -141,6 +176,10 @@ class MachineRatingCreateSerializer(serializers.ModelSerializer):
 class MachineSearchSerializer(serializers.Serializer):
     """Serializer pour les paramètres de recherche de machines"""
     q = serializers.CharField(required=False, help_text="Recherche textuelle")
+    ranked = serializers.BooleanField(
+        default=True,
+        help_text="Trier les résultats de la recherche textuelle par pertinence"
+    )
     machine_type = serializers.ChoiceField(
         choices=Machine.MACHINE_TYPES,
         required=False,
@@ -0,0 +1,91 @@
+"""
+Signaux de l'application machines
+Maintient à jour les index de recherche du catalogue (plein texte et autocomplétion)
+et la version du cache des réponses
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete
+from .catalogue import bump_version
+from .models import Label, Machine, MachineRating, MuscleGroup
+from .search import INDEXED_FIELDS, MachineSearchIndex
+
+
+@receiver(post_save, sender=Machine)
+def index_machine(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Réindexe une machine dont un champ texte a pu changer"""
+    if raw:
+        return
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+
+    MachineSearchIndex.update([instance.pk])
+
+
+@receiver(post_save, sender=Machine)
+def invalidate_autocomplete(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Invalide l'index d'autocomplétion si le nom, la marque ou l'état change"""
+    if update_fields is not None and not autocomplete.INDEXED_FIELDS.intersection(update_fields):
+        return
+
+    autocomplete.invalidate()
+
+
+@receiver(post_delete, sender=Machine)
+def unindex_machine(sender, instance, **kwargs):
+    """Retire une machine supprimée des index"""
+    MachineSearchIndex.update([instance.pk])
+    autocomplete.invalidate()
+
+
+@receiver(post_save, sender=Machine)
+@receiver(post_delete, sender=Machine)
+@receiver(post_save, sender=MuscleGroup)
+@receiver(post_delete, sender=MuscleGroup)
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def invalidate_catalogue(sender, update_fields=None, **kwargs):
+    """Invalide le cache du catalogue (sauf simple mise à jour de la popularité)"""
+    if update_fields is not None and set(update_fields) <= {'popularity_score'}:
+        return
+
+    bump_version()
+
+
+@receiver(m2m_changed, sender=Machine.primary_muscles.through)
+@receiver(m2m_changed, sender=Machine.secondary_muscles.through)
+@receiver(m2m_changed, sender=Machine.labels.through)
+def invalidate_catalogue_relations(sender, action, **kwargs):
+    """Invalide le cache du catalogue quand les muscles ou labels d'une machine changent"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version()
+
+
+@receiver(post_save, sender=MachineRating)
+def add_rating_to_stats(sender, instance, created, raw=False, **kwargs):
+    """Met à jour les statistiques d'évaluation de la machine (création ou modification)"""
+    if raw:
+        return
+
+    current = (instance.machine_id, instance.rating)
+    previous = None if created else getattr(instance, '_loaded_rating', None)
+    if previous == current:
+        return
+
+    if previous is None and not created:
+        # Instance non chargée depuis la base : recalcul complet
+        Machine.objects.filter(pk=instance.machine_id).refresh_rating_stats()
+    else:
+        if previous is not None:
+            Machine.objects.filter(pk=previous[0]).apply_rating(previous[1], -1)
+        Machine.objects.filter(pk=instance.machine_id).apply_rating(instance.rating, 1)
+    instance._loaded_rating = current
+
+
+@receiver(post_delete, sender=MachineRating)
+def remove_rating_from_stats(sender, instance, **kwargs):
+    """Retire une évaluation supprimée des statistiques de la machine"""
+    machine_id, rating = getattr(instance, '_loaded_rating', (instance.machine_id, instance.rating))
+    Machine.objects.filter(pk=machine_id).apply_rating(rating, -1)
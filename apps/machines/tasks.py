@@ -0,0 +1,13 @@
+"""
+Tâches Celery de l'application machines
+"""
+
+from celery import shared_task
+
+from . import popularity
+
+
+@shared_task
+def flush_popularity():
+    """Reporte en base les utilisations de machines mises en attente"""
+    return {'machines_updated': popularity.flush()}
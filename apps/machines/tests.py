@@ -0,0 +1,397 @@
+"""
+Tests de l'application machines
+"""
+
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+
+from . import autocomplete, catalogue, popularity
+from .search import MachineSearchIndex
+from .models import Label, Machine, MachineRating, MuscleGroup
+from .serializers import RECENT_RATINGS_COUNT
+
+
+class MachineTestCase(TestCase):
+    """Catalogue de base"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='membre@example.com', first_name='Léa', last_name='Martin')
+
+    def create_members(self, count):
+        return [
+            User.objects.create(email=f'membre{index}@example.com', first_name=f'Membre{index}')
+            for index in range(count)
+        ]
+
+    def create_machine(self, name, **kwargs):
+        return Machine.objects.create(
+            name=name, description=kwargs.pop('description', 'd'), instructions='i', **kwargs
+        )
+
+
+class PopularityDirectTests(MachineTestCase):
+    """Cache non partagé (locmem) : écriture directe en base"""
+
+    def test_locmem_cache_writes_directly(self):
+        self.assertFalse(popularity.write_behind_enabled())
+        machine = self.create_machine('Presse')
+        self.assertEqual(machine.increment_popularity(), 1)
+        self.assertEqual(machine.increment_popularity(), 2)
+
+        machine.refresh_from_db()
+        self.assertEqual(machine.popularity_score, 2)
+        self.assertEqual(machine.trending_popularity, 2.0)
+        self.assertEqual(popularity.flush(), 0)
+
+    def test_unused_machine_ranks_last(self):
+        unused = self.create_machine('Rameur')
+        used = self.create_machine('Presse')
+        used.increment_popularity()
+
+        self.assertEqual(unused.trending_popularity, 0)
+        self.assertEqual(
+            list(Machine.objects.order_by('-trending_score').values_list('name', flat=True)),
+            ['Presse', 'Rameur']
+        )
+
+
+@mock.patch.object(popularity, 'write_behind_enabled', return_value=True)
+class PopularityWriteBehindTests(MachineTestCase):
+    """Compteurs en cache reportés par flush (cache partagé simulé par locmem)"""
+
+    NOW = popularity.EPOCH + 100 * popularity.HALF_LIFE
+
+    def test_flush_reports_dirty_machines_in_one_update(self, _):
+        first = self.create_machine('Presse')
+        second = self.create_machine('Rameur')
+        self.create_machine('Vélo')
+        cache.set(popularity.LAST_FLUSHED_KEY, popularity.current_slot(self.NOW) - 1, None)
+
+        for _ in range(3):
+            popularity.record_use(first.pk, self.NOW)
+        popularity.record_use(second.pk, self.NOW)
+        self.assertEqual(Machine.objects.get(pk=first.pk).popularity_score, 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            updated = popularity.flush(self.NOW + popularity.SLOT_SECONDS)
+        self.assertEqual(updated, 2)
+        self.assertEqual(len(queries), 1)
+
+        scores = dict(Machine.objects.values_list('name', 'popularity_score'))
+        self.assertEqual(scores, {'Presse': 3, 'Rameur': 1, 'Vélo': 0})
+        first.refresh_from_db()
+        self.assertAlmostEqual(popularity.decayed_value(first.trending_score, self.NOW), 3, places=2)
+
+        self.assertEqual(popularity.flush(self.NOW + 2 * popularity.SLOT_SECONDS), 0)
+
+    def test_open_slot_is_not_flushed(self, _):
+        machine = self.create_machine('Presse')
+        cache.set(popularity.LAST_FLUSHED_KEY, popularity.current_slot(self.NOW) - 1, None)
+        popularity.record_use(machine.pk, self.NOW)
+
+        self.assertEqual(popularity.flush(self.NOW), 0)
+        self.assertEqual(popularity.pending_uses(machine.pk, self.NOW), 1)
+
+    def test_use_flushes_late_slots_without_beat(self, _):
+        first = self.create_machine('Presse')
+        second = self.create_machine('Rameur')
+        cache.set(popularity.LAST_FLUSHED_KEY, popularity.current_slot(self.NOW) - 1, None)
+        popularity.record_use(first.pk, self.NOW)
+
+        later = self.NOW + (popularity.STALE_SLOTS + 2) * popularity.SLOT_SECONDS
+        popularity.record_use(second.pk, later)
+
+        self.assertEqual(Machine.objects.get(pk=first.pk).popularity_score, 1)
+        self.assertEqual(Machine.objects.get(pk=second.pk).popularity_score, 0)
+
+    def test_trending_score_does_not_overflow(self, _):
+        machine = self.create_machine('Presse')
+        far = popularity.EPOCH + 5000 * popularity.HALF_LIFE
+        cache.set(popularity.LAST_FLUSHED_KEY, popularity.current_slot(far) - 1, None)
+        popularity.record_use(machine.pk, far)
+        popularity.flush(far + popularity.SLOT_SECONDS)
+
+        machine.refresh_from_db()
+        self.assertAlmostEqual(popularity.decayed_value(machine.trending_score, far), 1, places=2)
+
+
+class RatingStatsTests(MachineTestCase):
+
+    def stats(self, machine):
+        machine.refresh_from_db()
+        return machine.rating_count, machine.average_rating, machine.rating_distribution
+
+    def test_signals_keep_aggregates_in_sync(self):
+        machine = self.create_machine('Presse')
+        other = self.create_machine('Rameur')
+        first, second = self.create_members(2)
+
+        rating = MachineRating.objects.create(machine=machine, user=first, rating=5)
+        MachineRating.objects.create(machine=machine, user=second, rating=2)
+        self.assertEqual(
+            self.stats(machine), (2, 3.5, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+        )
+
+        rating.rating = 4
+        rating.save()
+        self.assertEqual(self.stats(machine)[1], 3.0)
+
+        rating.machine = other
+        rating.save()
+        self.assertEqual(self.stats(machine), (1, 2.0, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 0}))
+        self.assertEqual(self.stats(other)[:2], (1, 4.0))
+
+        MachineRating.objects.get(pk=rating.pk).delete()
+        self.assertEqual(self.stats(other)[:2], (0, None))
+
+    def test_refresh_rebuilds_from_ratings(self):
+        machine = self.create_machine('Presse')
+        for member, value in zip(self.create_members(3), (1, 3, 3)):
+            MachineRating.objects.create(machine=machine, user=member, rating=value)
+        Machine.objects.filter(pk=machine.pk).update(rating_count=0, rating_sum=0, rating_count_3=0)
+
+        with self.assertNumQueries(1):
+            Machine.objects.filter(pk=machine.pk).refresh_rating_stats()
+        self.assertEqual(self.stats(machine), (3, 2.3, {'1': 1, '2': 0, '3': 2, '4': 0, '5': 0}))
+
+
+class MachineRatingsEndpointTests(MachineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.machine = self.create_machine('Presse')
+        for index, member in enumerate(self.create_members(25)):
+            MachineRating.objects.create(machine=self.machine, user=member, rating=index % 5 + 1)
+
+    def test_detail_embeds_recent_ratings_only(self):
+        response = self.client.get(f'/api/machines/machines/{self.machine.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ratings']), RECENT_RATINGS_COUNT)
+        self.assertEqual(response.data['total_ratings'], 25)
+
+    def test_ratings_are_cursor_paginated(self):
+        url = f'/api/machines/machines/{self.machine.pk}/ratings/'
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['count'], 25)
+        self.assertEqual(len(first.data['results']), 20)
+
+        second = self.client.get(first.data['next'])
+        ids = [rating['id'] for rating in first.data['results'] + second.data['results']]
+        self.assertEqual(len(set(ids)), 25)
+        self.assertIsNone(second.data['next'])
+
+    def test_ratings_never_expose_emails(self):
+        nameless = User.objects.create(email='anonyme@example.com')
+        MachineRating.objects.create(machine=self.machine, user=nameless, rating=3)
+
+        response = self.client.get(f'/api/machines/machines/{self.machine.pk}/ratings/')
+        names = [rating['user_name'] for rating in response.data['results']]
+        self.assertIn('Membre MyCoach', names)
+        self.assertFalse(any('@' in name for name in names))
+
+    def test_unknown_machine_is_not_found(self):
+        for pk in ('999', 'abc'):
+            response = self.client.get(f'/api/machines/machines/{pk}/ratings/')
+            self.assertEqual(response.status_code, 404)
+
+
+@mock.patch.object(catalogue, 'is_shared_cache', return_value=True)
+class CatalogueCacheTests(MachineTestCase):
+    """Réponses du catalogue en cache (cache partagé simulé par locmem)"""
+
+    URL = '/api/machines/muscle-groups/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        MuscleGroup.objects.create(name='Pectoraux')
+
+    def test_second_request_is_served_from_cache(self, _):
+        first = self.client.get(self.URL)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.URL)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_parses_etag_lists(self, _):
+        etag = self.client.get(self.URL)['ETag']
+
+        for header in (etag, f'"autre", W/{etag}', '*'):
+            response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+
+        # Un ETag dont la valeur contient le nôtre n'est pas une correspondance
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=f'"x{etag[1:-1]}x"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_invalidate_cached_responses(self, _):
+        etag = self.client.get(self.URL)['ETag']
+        MuscleGroup.objects.create(name='Dos')
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_rating_stats_update_invalidates_machine_lists(self, _):
+        machine = self.create_machine('Presse')
+        url = '/api/machines/machines/'
+        etag = self.client.get(url)['ETag']
+
+        MachineRating.objects.create(machine=machine, user=self.user, rating=4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['rating_count'], 1)
+
+
+class CatalogueWithoutSharedCacheTests(MachineTestCase):
+
+    def test_responses_are_not_cached(self):
+        client = APIClient()
+        MuscleGroup.objects.create(name='Pectoraux')
+        response = client.get('/api/machines/muscle-groups/')
+
+        self.assertNotIn('ETag', response)
+        MuscleGroup.objects.create(name='Dos')
+        self.assertEqual(len(client.get('/api/machines/muscle-groups/').data['results']), 2)
+
+
+class MachineSearchIndexTests(MachineTestCase):
+    """Index plein texte (FTS5 sous SQLite)"""
+
+    def setUp(self):
+        super().setUp()
+        self.press = self.create_machine('Développé couché', brand='Technogym')
+        self.rower = self.create_machine(
+            'Rameur', brand='Concept2', description='Travail du dos et développé cardio'
+        )
+        self.create_machine('Vélo elliptique')
+
+    def test_accents_are_ignored(self):
+        for query in ('developpe', 'Développé', 'DEVELOPPE couche'):
+            self.assertIn(self.press.pk, MachineSearchIndex.search(query), query)
+
+    def test_name_ranks_above_description(self):
+        self.assertEqual(MachineSearchIndex.search('develop'), [self.press.pk, self.rower.pk])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(MachineSearchIndex.search('rameur concept'), [self.rower.pk])
+        self.assertEqual(MachineSearchIndex.search('rameur velo'), [])
+        self.assertEqual(MachineSearchIndex.search('%%'), [])
+
+    def test_index_follows_changes(self):
+        self.press.name = 'Presse à cuisses'
+        self.press.save()
+        self.assertEqual(MachineSearchIndex.search('cuisse'), [self.press.pk])
+
+        press_id = self.press.pk
+        self.press.delete()
+        self.assertEqual(MachineSearchIndex.search('cuisse'), [])
+        self.assertNotIn(press_id, MachineSearchIndex.search('developpe'))
+
+
+class AutocompleteTests(MachineTestCase):
+
+    URL = '/api/machines/machines/autocomplete/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.press = self.create_machine('Développé couché', brand='Technogym')
+        self.create_machine('Presse à cuisses', brand='Hammer Strength')
+        self.create_machine('Rameur', brand='Concept2')
+
+    def names(self, query, **params):
+        response = self.client.get(self.URL, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [suggestion['name'] for suggestion in response.data]
+
+    def test_fold_ignores_accents_and_punctuation(self):
+        self.assertEqual(autocomplete.fold('Développé-Couché !'), 'developpe couche')
+
+    def test_prefix_and_typo_tolerant_matches(self):
+        self.assertEqual(self.names('dév')[0], 'Développé couché')
+        self.assertEqual(self.names('devlope')[0], 'Développé couché')
+        self.assertEqual(self.names('concept'), ['Rameur'])
+        self.assertEqual(self.names('zzz'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_limit_is_validated_and_capped(self):
+        self.assertEqual(self.names('pre', limit=1), ['Presse à cuisses'])
+        response = self.client.get(self.URL, {'q': 'pre', 'limit': 'dix'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_is_rebuilt_after_changes(self):
+        self.names('rameur')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('rameur'), ['Rameur'])
+
+        self.press.name = 'Chest press'
+        self.press.save()
+        self.assertEqual(self.names('chest'), ['Chest press'])
+
+        self.press.is_active = False
+        self.press.save(update_fields=['is_active'])
+        self.assertEqual(self.names('chest'), [])
+
+
+class SparseFieldsetTests(MachineTestCase):
+
+    URL = '/api/machines/machines/'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.chest = MuscleGroup.objects.create(name='Pectoraux')
+        self.primary = Label.objects.create(name='Débutant', is_primary=True)
+        self.secondary = Label.objects.create(name='Guidée', is_primary=False)
+        for index in range(3):
+            self.add_machine(f'Presse {index}')
+
+    def add_machine(self, name):
+        machine = self.create_machine(name)
+        machine.primary_muscles.add(self.chest)
+        machine.labels.add(self.primary, self.secondary)
+        return machine
+
+    def test_fields_restricts_payload(self):
+        response = self.client.get(self.URL, {'fields': 'id,name, rating_count'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'rating_count'})
+
+    def test_compact_mode_uses_ids(self):
+        item = self.client.get(self.URL, {'compact': 'true'}).data['results'][0]
+        self.assertEqual(item['primary_muscles'], [self.chest.pk])
+        self.assertEqual(item['primary_labels'], [self.primary.pk])
+        self.assertNotIn('machine_type_display', item)
+
+        item = self.client.get(self.URL, {'compact': 'true', 'expand': 'primary_muscles'}).data['results'][0]
+        self.assertEqual(item['primary_muscles'][0]['name'], 'Pectoraux')
+        self.assertEqual(item['primary_labels'], [self.primary.pk])
+
+    def test_list_queries_do_not_grow_with_machines(self):
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(self.URL)
+        for index in range(5):
+            self.add_machine(f'Rameur {index}')
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(self.URL)
+
+        self.assertEqual(len(response.data['results']), 8)
+        self.assertEqual(len(after), len(before))
+
+    def test_dictionary_resolves_compact_ids(self):
+        data = self.client.get('/api/machines/machines/dictionary/').data
+        self.assertEqual(data['muscle_groups'][self.chest.pk]['name'], 'Pectoraux')
+        self.assertEqual(set(data['labels']), {self.primary.pk, self.secondary.pk})
+        self.assertEqual(data['machine_types'], dict(Machine.MACHINE_TYPES))
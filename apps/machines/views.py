@@ -1,17 +1,32 @@
-from django.db.models import Q, Avg
+from django.db.models import Q, Case, When, Prefetch
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from django_filters import rest_framework as django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 
+from apps.core.pagination import KeysetPagination
+
 from .models import Machine, MuscleGroup, Label, MachineRating
+from . import autocomplete as machine_autocomplete
+from .catalogue import catalogue_cached
+from .search import MachineSearchIndex
 from .serializers import (
     MachineListSerializer, MachineDetailSerializer, MachineCreateUpdateSerializer,
     MuscleGroupSerializer, LabelSerializer, MachineRatingSerializer,
-    MachineRatingCreateSerializer, MachineSearchSerializer
+    MachineRatingCreateSerializer, MachineSearchSerializer, RECENT_RATINGS_COUNT
 )
 
+# Les réponses contenant la popularité sont recalculées au plus toutes les 5 minutes
+POPULARITY_MAX_AGE = 60 * 5
+
+
+class RatingPagination(KeysetPagination):
+    """Pagination par curseur des évaluations (plus récentes d'abord)"""
+    ordering = ('-created_at', '-id')
+
 
 class MuscleGroupViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -25,6 +40,14 @@ class MuscleGroupViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name', 'anatomical_zone']
     ordering = ['name']
 
+    @catalogue_cached()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalogue_cached()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class LabelViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -39,31 +62,62 @@ class LabelViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['name', 'is_primary']
     ordering = ['-is_primary', 'name']
 
+    @catalogue_cached()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @catalogue_cached()
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Filtre `__in` sur des identifiants séparés par des virgules"""
+
+
+class MachineFilter(django_filters.FilterSet):
+    """
+    Filtres des machines
+
+    Les lookups `__in` sur les relations many-to-many sont déclarés
+    explicitement : ceux générés automatiquement plantent sur une liste.
+    """
+    primary_muscles__in = NumberInFilter(field_name='primary_muscles', distinct=True)
+    labels__in = NumberInFilter(field_name='labels', distinct=True)
+
+    class Meta:
+        model = Machine
+        fields = {
+            'machine_type': ['exact', 'in'],
+            'difficulty_level': ['exact', 'in', 'gte', 'lte'],
+            'is_active': ['exact'],
+            'is_maintenance': ['exact'],
+            'supports_speed': ['exact'],
+            'supports_incline': ['exact'],
+            'supports_resistance': ['exact'],
+            'primary_muscles': ['exact'],
+            'labels': ['exact'],
+        }
+
 
 class MachineViewSet(viewsets.ModelViewSet):
     """
     ViewSet complet pour les machines
     """
-    queryset = Machine.objects.select_related().prefetch_related(
-        'primary_muscles', 'secondary_muscles', 'labels', 'ratings'
+    queryset = Machine.objects.prefetch_related(
+        'primary_muscles', 'secondary_muscles', 'labels'
     )
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['name', 'brand', 'model', 'description']
-    ordering_fields = ['name', 'popularity_score', 'created_at', 'difficulty_level']
+    ordering_fields = ['name', 'popularity_score', 'trending_score', 'created_at', 'difficulty_level']
     ordering = ['name']
 
-    filterset_fields = {
-        'machine_type': ['exact', 'in'],
-        'difficulty_level': ['exact', 'in', 'gte', 'lte'],
-        'is_active': ['exact'],
-        'is_maintenance': ['exact'],
-        'supports_speed': ['exact'],
-        'supports_incline': ['exact'],
-        'supports_resistance': ['exact'],
-        'primary_muscles': ['exact', 'in'],
-        'labels': ['exact', 'in'],
-    }
+    filterset_class = MachineFilter
+
+    @catalogue_cached(max_age=POPULARITY_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_serializer_class(self):
         """Choix du serializer selon l'action"""
@@ -78,6 +132,16 @@ class MachineViewSet(viewsets.ModelViewSet):
         """Filtrage personnalisé du queryset"""
         queryset = super().get_queryset()
 
+        # Le détail n'inclut que les évaluations les plus récentes
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(Prefetch(
+                'ratings',
+                queryset=MachineRating.objects.select_related('user').order_by(
+                    '-created_at', '-id'
+                )[:RECENT_RATINGS_COUNT],
+                to_attr='recent_ratings'
+            ))
+
         # Filtrer par disponibilité si demandé
         is_available = self.request.query_params.get('is_available')
         if is_available is not None:
@@ -101,13 +165,13 @@ class MachineViewSet(viewsets.ModelViewSet):
         Marquer une machine comme utilisée (incrémente la popularité)
         """
         machine = self.get_object()
-        machine.increment_popularity()
         return Response({
             'message': 'Utilisation enregistrée',
-            'popularity_score': machine.popularity_score
+            'popularity_score': machine.increment_popularity()
         })
 
     @action(detail=False, methods=['get'])
+    @catalogue_cached(max_age=POPULARITY_MAX_AGE)
     def popular(self, request):
         """
         Retourne les machines les plus populaires
@@ -116,10 +180,64 @@ class MachineViewSet(viewsets.ModelViewSet):
             is_active=True, is_maintenance=False
         ).order_by('-popularity_score')[:10]
 
-        serializer = MachineListSerializer(popular_machines, many=True)
+        serializer = MachineListSerializer(popular_machines, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @catalogue_cached()
+    def dictionary(self, request):
+        """
+        Dictionnaire du catalogue pour le mode compact des listes
+        (groupes musculaires, labels et libellés par identifiant)
+        """
+        return Response({
+            'muscle_groups': {
+                muscle_group['id']: muscle_group
+                for muscle_group in MuscleGroupSerializer(MuscleGroup.objects.all(), many=True).data
+            },
+            'labels': {
+                label['id']: label
+                for label in LabelSerializer(Label.objects.all(), many=True).data
+            },
+            'machine_types': dict(Machine.MACHINE_TYPES),
+            'difficulty_levels': dict(Machine.DIFFICULTY_LEVELS),
+        })
+
+    @action(detail=True, methods=['get'])
+    def ratings(self, request, pk=None):
+        """
+        Historique complet des évaluations d'une machine (pagination par curseur)
+        """
+        # Contrôle d'existence seul : pas de préchargements du détail
+        if not str(pk).isdigit() or not Machine.objects.filter(pk=pk).exists():
+            raise NotFound()
+
+        ratings = MachineRating.objects.filter(machine_id=pk).select_related('user')
+        paginator = RatingPagination()
+        # Sans vue : l'ordre vient de la pagination, pas du filtre d'ordre des machines
+        page = paginator.paginate_queryset(ratings, request)
+        serializer = MachineRatingSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Suggestions de machines pendant la saisie (nom ou marque)
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', machine_autocomplete.DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = max(1, min(limit, machine_autocomplete.MAX_LIMIT))
+        return Response(machine_autocomplete.get_index().search(query, limit))
+
+    @action(detail=False, methods=['get'])
+    @catalogue_cached(max_age=POPULARITY_MAX_AGE)
     def by_muscle_group(self, request):
         """
         Retourne les machines groupées par groupe musculaire
@@ -138,7 +256,7 @@ class MachineViewSet(viewsets.ModelViewSet):
             is_maintenance=False
         ).distinct()
 
-        serializer = MachineListSerializer(machines, many=True)
+        serializer = MachineListSerializer(machines, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
@@ -156,13 +274,21 @@ class MachineViewSet(viewsets.ModelViewSet):
         data = search_serializer.validated_data
         queryset = self.get_queryset()
 
-        # Recherche textuelle
+        # Recherche textuelle (index plein texte, classée par pertinence)
         if 'q' in data:
-            queryset = queryset.filter(
-                Q(name__icontains=data['q']) |
-                Q(brand__icontains=data['q']) |
-                Q(description__icontains=data['q'])
-            )
+            ranked_ids = MachineSearchIndex.search(data['q'])
+            if ranked_ids is None:
+                queryset = queryset.filter(
+                    Q(name__icontains=data['q']) |
+                    Q(brand__icontains=data['q']) |
+                    Q(description__icontains=data['q'])
+                )
+            else:
+                queryset = queryset.filter(pk__in=ranked_ids)
+                if data['ranked'] and ranked_ids:
+                    queryset = queryset.order_by(Case(
+                        *[When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)]
+                    ))
 
         # Filtres spécifiques
         if 'machine_type' in data:
@@ -191,10 +317,10 @@ class MachineViewSet(viewsets.ModelViewSet):
         # Pagination
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = MachineListSerializer(page, many=True)
+            serializer = MachineListSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
 
-        serializer = MachineListSerializer(queryset, many=True)
+        serializer = MachineListSerializer(queryset, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
 
@@ -204,6 +330,7 @@ class MachineRatingViewSet(viewsets.ModelViewSet):
     """
     queryset = MachineRating.objects.select_related('machine', 'user')
     permission_classes = [IsAuthenticated]
+    pagination_class = RatingPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['machine', 'rating']
     ordering_fields = ['rating', 'created_at']
@@ -251,9 +378,10 @@ class MachineRatingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        ratings = self.queryset.filter(machine_id=machine_id)
+        # Statistiques dénormalisées : une seule requête
+        machine = Machine.objects.filter(pk=machine_id).first()
 
-        if not ratings.exists():
+        if machine is None or not machine.rating_count:
             return Response({
                 'machine_id': machine_id,
                 'total_ratings': 0,
@@ -261,18 +389,9 @@ class MachineRatingViewSet(viewsets.ModelViewSet):
                 'rating_distribution': {}
             })
 
-        # Calculer les statistiques
-        avg_rating = ratings.aggregate(avg=Avg('rating'))['avg']
-        total_ratings = ratings.count()
-
-        # Distribution des notes
-        distribution = {}
-        for i in range(1, 6):
-            distribution[str(i)] = ratings.filter(rating=i).count()
-
         return Response({
             'machine_id': machine_id,
-            'total_ratings': total_ratings,
-            'average_rating': round(avg_rating, 1) if avg_rating else None,
-            'rating_distribution': distribution
+            'total_ratings': machine.rating_count,
+            'average_rating': machine.average_rating,
+            'rating_distribution': machine.rating_distribution
         })
\ No newline at end of file
@@ -180,6 +180,11 @@ class User(AbstractUser):
             return f"{self.first_name} {self.last_name}"
         return self.email
 
+    @property
+    def display_name(self):
+        """Nom affiché aux autres utilisateurs (jamais l'adresse email)"""
+        return f"{self.first_name} {self.last_name}".strip() or "Membre MyCoach"
+
     @property
     def imc(self):
         """Calcule l'IMC de l'utilisateur"""
@@ -211,18 +216,27 @@ class User(AbstractUser):
     def get_workout_stats(self, days=30):
         """Retourne les statistiques d'entraînement"""
         from datetime import timedelta
+        from django.db.models import Count, Sum
         from django.utils import timezone
         from apps.workouts.models import Workout
 
         cutoff_date = timezone.now() - timedelta(days=days)
-        workouts = Workout.objects.filter(
+        stats = Workout.objects.filter(
             user=self,
             date__gte=cutoff_date
+        ).with_stats().aggregate(
+            total_workouts=Count('id'),
+            total_sets=Sum('sets_count'),
+            completed_sets=Sum('completed_sets_count'),
+            total_volume=Sum('volume'),
         )
 
         return {
-            'total_workouts': workouts.count(),
+            'total_workouts': stats['total_workouts'],
             'days_period': days,
-            'average_per_week': round(workouts.count() / (days / 7), 1),
+            'average_per_week': round(stats['total_workouts'] / (days / 7), 1),
+            'total_sets': stats['total_sets'] or 0,
+            'completed_sets': stats['completed_sets'] or 0,
+            'total_volume': float(stats['total_volume'] or 0),
             'last_workout': self.last_workout
-        }
\ No newline at end of file
+        }
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.utils import timezone
 
 from .models import (
-    Workout, Exercise, Serie, WorkoutTemplate,
+    Workout, Exercise, Serie, WorkoutTemplate, TemplateExercise,
     PerformanceRecord, WorkoutProgram
 )
 
@@ -40,6 +40,16 @@ class ExerciseInline(admin.StackedInline):
     )
 
 
+class TemplateExerciseInline(admin.TabularInline):
+    model = TemplateExercise
+    extra = 0
+    fields = [
+        'order', 'machine', 'target_sets', 'target_reps', 'target_weight',
+        'target_duration_seconds', 'target_distance_meters', 'rest_seconds',
+        'auto_progression'
+    ]
+
+
 @admin.register(WorkoutTemplate)
 class WorkoutTemplateAdmin(admin.ModelAdmin):
     list_display = [
@@ -49,6 +59,7 @@ class WorkoutTemplateAdmin(admin.ModelAdmin):
     list_filter = ['is_public', 'difficulty_level', 'created_at']
     search_fields = ['name', 'description', 'tags']
     readonly_fields = ['created_at', 'updated_at']
+    inlines = [TemplateExerciseInline]
 
     fieldsets = (
         ('Informations générales', {
@@ -70,7 +81,8 @@ class WorkoutTemplateAdmin(admin.ModelAdmin):
 class WorkoutAdmin(admin.ModelAdmin):
     list_display = [
         'name', 'user', 'date', 'status_display',
-        'duration_display', 'total_exercises', 'total_sets'
+        'duration_display', 'total_exercises', 'total_sets',
+        'completed_sets_display'
     ]
     list_filter = ['status', 'date', 'difficulty_felt', 'satisfaction']
     search_fields = ['name', 'user__email', 'user__first_name', 'user__last_name']
@@ -81,6 +93,9 @@ class WorkoutAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     inlines = [ExerciseInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').with_stats()
+
     def status_display(self, obj):
         colors = {
             'planned': '#ffc107',
@@ -101,6 +116,11 @@ class WorkoutAdmin(admin.ModelAdmin):
         return f"{obj.planned_duration_minutes} min (prévu)"
     duration_display.short_description = 'Durée'
 
+    def completed_sets_display(self, obj):
+        return f"{obj.completed_sets_count}/{obj.sets_count}"
+    completed_sets_display.short_description = 'Séries terminées'
+    completed_sets_display.admin_order_field = 'completed_sets_count'
+
     fieldsets = (
         ('Informations générales', {
             'fields': ('user', 'template', 'name', 'description', 'date')
@@ -138,7 +158,7 @@ class WorkoutAdmin(admin.ModelAdmin):
     mark_as_completed.short_description = "Marquer comme terminé"
 
     def mark_as_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = queryset.update(status='cancelled', updated_at=timezone.now())
         self.message_user(request, f'{updated} séance(s) annulée(s).')
     mark_as_cancelled.short_description = "Annuler les séances"
 
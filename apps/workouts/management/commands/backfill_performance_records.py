@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.workouts.models import PerformanceRecord, Serie
+from apps.workouts.records import PerformanceRecordService
+
+
+class Command(BaseCommand):
+    """
+    Détecte les records de performance sur l'historique des séries terminées
+    """
+    help = "Crée les records de performance manquants à partir des séries historiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help="Limiter le traitement aux séries d'un utilisateur (id)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help="Nombre de séries traitées par lot"
+        )
+
+    def handle(self, *args, **options):
+        series = Serie.objects.filter(completed=True).order_by('pk')
+        records = PerformanceRecord.objects.filter(
+            record_type__in=PerformanceRecordService.TRACKED_TYPES
+        )
+        if options['user']:
+            series = series.filter(exercise__workout__user_id=options['user'])
+            records = records.filter(user_id=options['user'])
+
+        # Meilleurs résultats déjà enregistrés, par (utilisateur, machine, type)
+        bests = PerformanceRecordService.load_bests(
+            records.values_list(
+                'user_id', 'machine_id', 'record_type',
+                'weight', 'reps', 'duration_seconds'
+            ).iterator()
+        )
+        touched = set()
+
+        batch_size = options['batch_size']
+        processed = created = 0
+        last_pk = 0
+
+        while True:
+            rows = list(
+                series.filter(pk__gt=last_pk).values_list(
+                    'pk', 'exercise__workout__user_id', 'exercise__machine_id',
+                    'exercise__workout_id', 'weight', 'reps', 'duration_seconds',
+                    'distance_meters', 'completed_at', 'created_at'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+
+            new_records = []
+            for (pk, user_id, machine_id, workout_id, weight, reps,
+                 duration_seconds, distance_meters, completed_at, created_at) in rows:
+                batch = PerformanceRecordService.build_records(
+                    bests, user_id, machine_id, workout_id,
+                    weight, reps, duration_seconds, distance_meters,
+                    completed_at or created_at
+                )
+                touched.update(
+                    (user_id, machine_id, record.record_type) for record in batch
+                )
+                new_records.extend(batch)
+
+            with transaction.atomic():
+                PerformanceRecord.objects.bulk_create(new_records)
+
+            processed += len(rows)
+            created += len(new_records)
+            last_pk = rows[-1][0]
+
+        # Synchroniser le cache utilisé par la détection incrémentale
+        cache.set_many({
+            PerformanceRecordService.cache_key(*key): bests[key]
+            for key in touched
+        }, PerformanceRecordService.CACHE_TIMEOUT)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} série(s) analysée(s), {created} record(s) créé(s).'
+        ))
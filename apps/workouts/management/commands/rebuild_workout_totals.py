@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from apps.workouts.models import Workout
+
+
+class Command(BaseCommand):
+    """
+    Recalcule les statistiques dénormalisées des séances
+    (total_exercises, total_sets, total_volume)
+    """
+    help = "Recalcule les statistiques dénormalisées de toutes les séances"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help="Limiter le recalcul aux séances d'un utilisateur (id)"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Nombre de séances mises à jour par requête"
+        )
+
+    def handle(self, *args, **options):
+        queryset = Workout.objects.order_by('pk')
+        if options['user']:
+            queryset = queryset.filter(user_id=options['user'])
+
+        batch_size = options['batch_size']
+        updated = 0
+        last_pk = 0
+
+        # Traitement par tranches de clés primaires pour limiter la durée des verrous
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk).values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+
+            updated += Workout.objects.filter(pk__in=pks).refresh_totals()
+            last_pk = pks[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} séance(s) recalculée(s).'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workout',
+            name='total_exercises',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name="Nombre d'exercices"),
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='total_sets',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de séries'),
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='total_volume',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Somme poids × répétitions de toutes les séries', max_digits=12, verbose_name='Volume total (kg)'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0002_workout_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exercise',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='serie',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['updated_at'], name='workouts_ex_updated_508c9a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serie',
+            index=models.Index(fields=['updated_at'], name='workouts_se_updated_2333de_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['user', 'updated_at'], name='workouts_wo_user_id_d79174_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:29
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('machines', '0005_machine_rating_stats'),
+        ('workouts', '0003_sync_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TemplateExercise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=1, verbose_name='Ordre dans la séance')),
+                ('target_sets', models.IntegerField(default=3, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10)], verbose_name='Séries cibles')),
+                ('target_reps', models.IntegerField(default=12, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(100)], verbose_name='Répétitions cibles')),
+                ('target_weight', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Poids cible (kg)')),
+                ('target_duration_seconds', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(7200)], verbose_name='Durée cible (secondes)')),
+                ('target_distance_meters', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(100), django.core.validators.MaxValueValidator(50000)], verbose_name='Distance cible (mètres)')),
+                ('rest_seconds', models.IntegerField(default=90, validators=[django.core.validators.MinValueValidator(30), django.core.validators.MaxValueValidator(600)], verbose_name='Temps de repos (secondes)')),
+                ('auto_progression', models.BooleanField(default=True, verbose_name='Progression automatique')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='machines.machine', verbose_name='Machine/Équipement')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exercises', to='workouts.workouttemplate', verbose_name='Template')),
+            ],
+            options={
+                'verbose_name': 'Exercice de template',
+                'verbose_name_plural': 'Exercices de template',
+                'ordering': ['template', 'order'],
+                'unique_together': {('template', 'order')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0004_templateexercise'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workout',
+            name='processed_completion_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fin de séance post-traitée'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Now
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from decimal import Decimal
@@ -54,11 +56,184 @@ class WorkoutTemplate(models.Model):
         return self.name
 
 
+class TemplateExercise(models.Model):
+    """
+    Exercice prévu dans un template, copié dans chaque séance créée à partir de celui-ci
+    """
+    template = models.ForeignKey(
+        WorkoutTemplate,
+        on_delete=models.CASCADE,
+        related_name='exercises',
+        verbose_name="Template"
+    )
+
+    machine = models.ForeignKey(
+        'machines.Machine',
+        on_delete=models.CASCADE,
+        verbose_name="Machine/Équipement"
+    )
+
+    order = models.PositiveIntegerField(
+        default=1,
+        verbose_name="Ordre dans la séance"
+    )
+
+    target_sets = models.IntegerField(
+        default=3,
+        validators=[MinValueValidator(1), MaxValueValidator(10)],
+        verbose_name="Séries cibles"
+    )
+
+    target_reps = models.IntegerField(
+        default=12,
+        validators=[MinValueValidator(1), MaxValueValidator(100)],
+        verbose_name="Répétitions cibles"
+    )
+
+    target_weight = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name="Poids cible (kg)"
+    )
+
+    target_duration_seconds = models.IntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(30), MaxValueValidator(7200)],
+        verbose_name="Durée cible (secondes)"
+    )
+
+    target_distance_meters = models.IntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(100), MaxValueValidator(50000)],
+        verbose_name="Distance cible (mètres)"
+    )
+
+    rest_seconds = models.IntegerField(
+        default=90,
+        validators=[MinValueValidator(30), MaxValueValidator(600)],
+        verbose_name="Temps de repos (secondes)"
+    )
+
+    auto_progression = models.BooleanField(
+        default=True,
+        verbose_name="Progression automatique"
+    )
+
+    notes = models.TextField(
+        blank=True,
+        verbose_name="Notes"
+    )
+
+    # Champs recopiés tels quels dans l'exercice de la séance
+    COPIED_FIELDS = (
+        'machine_id', 'order', 'target_sets', 'target_reps', 'target_weight',
+        'target_duration_seconds', 'target_distance_meters', 'rest_seconds',
+        'auto_progression', 'notes'
+    )
+
+    class Meta:
+        verbose_name = "Exercice de template"
+        verbose_name_plural = "Exercices de template"
+        ordering = ['template', 'order']
+        unique_together = ['template', 'order']
+
+    def __str__(self):
+        return f"{self.template.name} - {self.order}"
+
+    def build_exercise(self, workout_id):
+        """Exercice (non enregistré) de la séance correspondant à cette ligne du template"""
+        return Exercise(
+            workout_id=workout_id,
+            **{field: getattr(self, field) for field in self.COPIED_FIELDS}
+        )
+
+
+class WorkoutQuerySet(models.QuerySet):
+    """QuerySet personnalisé pour les séances d'entraînement"""
+
+    VOLUME_FIELD = DecimalField(max_digits=12, decimal_places=2)
+
+    def _stats_expressions(self):
+        """
+        Construit les sous-requêtes corrélées des statistiques d'une séance
+
+        Chaque statistique est une sous-requête indépendante pour éviter la
+        multiplication des lignes qu'entraînerait une double jointure
+        exercices × séries.
+        """
+        exercises = Exercise.objects.filter(
+            workout=OuterRef('pk')
+        ).order_by().values('workout')
+
+        series = Serie.objects.filter(
+            exercise__workout=OuterRef('pk')
+        ).order_by().values('exercise__workout')
+
+        volume = series.annotate(
+            volume=Sum(F('weight') * F('reps'), output_field=self.VOLUME_FIELD)
+        ).values('volume')
+
+        return {
+            'exercises': Coalesce(
+                Subquery(exercises.annotate(count=Count('id')).values('count')), 0
+            ),
+            'sets': Coalesce(
+                Subquery(series.annotate(count=Count('id')).values('count')), 0
+            ),
+            'completed_sets': Coalesce(
+                Subquery(series.annotate(
+                    count=Count('id', filter=Q(completed=True))
+                ).values('count')), 0
+            ),
+            'volume': Coalesce(
+                Subquery(volume), Value(Decimal('0')), output_field=self.VOLUME_FIELD
+            ),
+        }
+
+    def with_stats(self):
+        """
+        Annote chaque séance avec ses statistiques calculées en SQL
+
+        Annotations ajoutées : exercises_count, sets_count,
+        completed_sets_count et volume (somme poids × répétitions).
+        """
+        stats = self._stats_expressions()
+        return self.annotate(
+            exercises_count=stats['exercises'],
+            sets_count=stats['sets'],
+            completed_sets_count=stats['completed_sets'],
+            volume=stats['volume'],
+        )
+
+    def refresh_totals(self):
+        """
+        Recalcule les statistiques dénormalisées des séances du queryset
+        en une seule requête UPDATE (sous-requêtes corrélées)
+
+        Returns:
+            Nombre de séances mises à jour
+        """
+        stats = self._stats_expressions()
+        return self.order_by().update(
+            total_exercises=stats['exercises'],
+            total_sets=stats['sets'],
+            total_volume=stats['volume'],
+            updated_at=Now(),
+        )
+
+
 class Workout(models.Model):
     """
     Modèle représentant une séance d'entraînement
     """
 
+    objects = WorkoutQuerySet.as_manager()
+
     STATUS_CHOICES = [
         ('planned', 'Planifiée'),
         ('in_progress', 'En cours'),
@@ -149,6 +324,36 @@ class Workout(models.Model):
         verbose_name="Notes personnelles"
     )
 
+    # Statistiques dénormalisées (maintenues par apps.workouts.signals)
+    total_exercises = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre d'exercices"
+    )
+
+    total_sets = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre de séries"
+    )
+
+    total_volume = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name="Volume total (kg)",
+        help_text="Somme poids × répétitions de toutes les séries"
+    )
+
+    # Fin de séance déjà post-traitée (clé d'idempotence, voir apps.workouts.processing)
+    processed_completion_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Fin de séance post-traitée"
+    )
+
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -160,36 +365,22 @@ class Workout(models.Model):
         indexes = [
             models.Index(fields=['user', 'date']),
             models.Index(fields=['status']),
+            models.Index(fields=['user', 'updated_at']),
         ]
 
     def __str__(self):
         return f"{self.name} - {self.user.get_full_name()} ({self.date.strftime('%d/%m/%Y')})"
 
-    @property
-    def total_exercises(self):
-        """Retourne le nombre total d'exercices"""
-        return self.exercises.count()
-
-    @property
-    def total_sets(self):
-        """Retourne le nombre total de séries"""
-        return sum(exercise.series.count() for exercise in self.exercises.all())
-
-    @property
-    def total_volume(self):
-        """Calcule le volume total de la séance (poids × répétitions)"""
-        total = 0
-        for exercise in self.exercises.all():
-            for serie in exercise.series.all():
-                if serie.weight and serie.reps:
-                    total += float(serie.weight) * serie.reps
-        return round(total, 2)
+    def refresh_totals(self):
+        """Recalcule et recharge les statistiques dénormalisées de la séance"""
+        Workout.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=['total_exercises', 'total_sets', 'total_volume'])
 
     def start_workout(self):
         """Démarre la séance"""
         self.status = 'in_progress'
         self.started_at = timezone.now()
-        self.save(update_fields=['status', 'started_at'])
+        self.save(update_fields=['status', 'started_at', 'updated_at'])
 
     def complete_workout(self):
         """Termine la séance"""
@@ -203,7 +394,11 @@ class Workout(models.Model):
         # Mettre à jour la date du dernier entraînement de l'utilisateur
         self.user.update_last_workout()
 
-        self.save(update_fields=['status', 'completed_at', 'actual_duration_minutes'])
+        self.save(update_fields=['status', 'completed_at', 'actual_duration_minutes', 'updated_at'])
+
+        # Records, suggestions et statistiques calculés en tâche de fond
+        from .processing import schedule_post_completion
+        schedule_post_completion(self)
 
 
 class Exercise(models.Model):
@@ -292,16 +487,27 @@ class Exercise(models.Model):
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Exercice"
         verbose_name_plural = "Exercices"
         ordering = ['workout', 'order']
         unique_together = ['workout', 'order']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"{self.machine.name} - {self.workout.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Séance chargée, pour recalculer aussi l'ancienne séance si l'exercice change de séance
+        instance._loaded_workout_id = instance.__dict__.get('workout_id')
+        return instance
+
     @property
     def completed_sets(self):
         """Retourne le nombre de séries effectuées"""
@@ -324,16 +530,11 @@ class Exercise(models.Model):
         # Récupérer les répétitions effectuées
         achieved_reps = [s.reps for s in self.series.filter(completed=True) if s.reps]
 
-        if not achieved_reps:
-            return self.target_weight
-
-        progression_success = ProgressionService.should_increase_weight(
-            self.target_reps, achieved_reps, self.target_sets
-        )
-
-        return ProgressionService.calculate_next_weight(
-            float(self.target_weight) if self.target_weight else 0,
-            progression_success,
+        return ProgressionService.suggest_weight(
+            self.target_weight,
+            self.target_reps,
+            self.target_sets,
+            achieved_reps,
             self.workout.user.objective_enum,
             'cardio' if self.machine.machine_type == 'cardio' else 'strength'
         )
@@ -436,16 +637,27 @@ class Serie(models.Model):
         blank=True,
         verbose_name="Heure de fin"
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Série"
         verbose_name_plural = "Séries"
         ordering = ['exercise', 'set_number']
         unique_together = ['exercise', 'set_number']
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
 
     def __str__(self):
         return f"Série {self.set_number} - {self.exercise}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Exercice chargé, pour recalculer aussi l'ancienne séance si la série change d'exercice
+        instance._loaded_exercise_id = instance.__dict__.get('exercise_id')
+        return instance
+
     @property
     def volume(self):
         """Calcule le volume de la série (poids × répétitions)"""
@@ -462,10 +674,13 @@ class Serie(models.Model):
         return None
 
     def complete_set(self):
-        """Marque la série comme terminée"""
+        """Marque la série comme terminée et enregistre les records battus"""
         self.completed = True
         self.completed_at = timezone.now()
-        self.save(update_fields=['completed', 'completed_at'])
+        self.save(update_fields=['completed', 'completed_at', 'updated_at'])
+
+        from .records import PerformanceRecordService
+        return PerformanceRecordService.detect_for_serie(self)
 
 
 class PerformanceRecord(models.Model):
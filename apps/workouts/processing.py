@@ -0,0 +1,126 @@
+"""
+Post-traitement d'une séance terminée
+Statistiques, records et suggestions de progression, calculés une seule
+fois par fin de séance : en tâche Celery si elle est disponible, sinon de
+façon synchrone (Celery est optionnel)
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Now
+
+from apps.core.services import ProgressionService
+
+from .models import Workout
+from .records import PerformanceRecordService
+
+logger = logging.getLogger(__name__)
+
+# Durée de conservation des suggestions
+SUGGESTIONS_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def suggestions_cache_key(workout_id):
+    """Clé de cache des poids suggérés pour la séance suivante"""
+    return f"workout_suggestions:{workout_id}"
+
+
+def get_workout_suggestions(workout_id):
+    """
+    Retourne les poids suggérés d'une séance ({exercise_id: poids})
+
+    Utilise le résultat du post-traitement s'il est disponible, sinon
+    le calcule à la demande.
+    """
+    suggestions = cache.get(suggestions_cache_key(workout_id))
+    if suggestions is None:
+        suggestions = ProgressionService.suggest_for_workout(workout_id)
+        cache.set(suggestions_cache_key(workout_id), suggestions, SUGGESTIONS_TIMEOUT)
+    return suggestions
+
+
+def claim(workout_id, completed_at):
+    """
+    Réserve le post-traitement d'une fin de séance
+
+    La réservation est une mise à jour conditionnelle en base : elle vaut
+    pour tous les workers, quel que soit le cache. Une séance terminée à
+    nouveau (completed_at différent) est traitée à nouveau.
+
+    Returns:
+        True si l'appelant doit effectuer le traitement
+    """
+    return bool(
+        Workout.objects.filter(pk=workout_id, completed_at=completed_at)
+        .exclude(processed_completion_at=completed_at)
+        .update(processed_completion_at=completed_at, updated_at=Now())
+    )
+
+
+def release(workout_id, completed_at):
+    """Libère une réservation après un échec, pour que la nouvelle tentative soit exécutée"""
+    Workout.objects.filter(pk=workout_id, processed_completion_at=completed_at).update(
+        processed_completion_at=None, updated_at=Now()
+    )
+
+
+def process_completed_workout(workout_id, completed_at):
+    """
+    Post-traitement d'une séance terminée : statistiques, records et
+    suggestions de progression
+
+    Une même fin de séance n'est traitée qu'une fois, même si la tâche est
+    livrée plusieurs fois.
+
+    Returns:
+        Dictionnaire {workout_id, status, ...}
+    """
+    if not claim(workout_id, completed_at):
+        return {'workout_id': workout_id, 'status': 'duplicate'}
+
+    try:
+        Workout.objects.filter(pk=workout_id).refresh_totals()
+        records = PerformanceRecordService.detect_for_workout(workout_id)
+
+        suggestions = ProgressionService.suggest_for_workout(workout_id)
+        cache.set(suggestions_cache_key(workout_id), suggestions, SUGGESTIONS_TIMEOUT)
+    except Exception:
+        release(workout_id, completed_at)
+        raise
+
+    return {
+        'workout_id': workout_id,
+        'status': 'processed',
+        'records_created': len(records),
+        'suggestions': len(suggestions),
+    }
+
+
+def schedule_post_completion(workout):
+    """
+    Planifie le post-traitement d'une séance après validation de la transaction
+
+    Sans Celery installé, ou en l'absence de broker disponible, le
+    traitement est exécuté localement pour ne pas perdre les données dérivées.
+    """
+    workout_id, completed_at = workout.pk, workout.completed_at
+
+    def enqueue():
+        try:
+            from .tasks import process_completed_workout as task
+        except ImportError:
+            process_completed_workout(workout_id, completed_at)
+            return
+
+        try:
+            task.delay(workout_id, completed_at.isoformat())
+        except Exception:
+            logger.warning(
+                "Broker Celery indisponible, post-traitement synchrone de la séance %s",
+                workout_id, exc_info=True
+            )
+            process_completed_workout(workout_id, completed_at)
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,236 @@
+"""
+Détection incrémentale des records de performance
+Compare chaque série terminée au meilleur résultat connu (mis en cache)
+"""
+
+from typing import Dict, List, Optional
+
+from django.core.cache import cache
+
+from apps.core.services import OneRMService
+
+from .models import Exercise, PerformanceRecord, Serie
+
+
+class PerformanceRecordService:
+    """Service de détection et de suivi des records de performance"""
+
+    # Types de records détectés automatiquement
+    TRACKED_TYPES = ('1rm', 'volume', 'endurance')
+
+    CACHE_TIMEOUT = 60 * 60 * 24  # 24 heures
+
+    # Brzycki n'est fiable que pour les séries courtes (diverge à 37 répétitions)
+    MAX_1RM_REPS = 12
+
+    @staticmethod
+    def cache_key(user_id: int, machine_id: int, record_type: str) -> str:
+        """Clé de cache du meilleur résultat pour (utilisateur, machine, type)"""
+        return f"performance_record:{user_id}:{machine_id}:{record_type}"
+
+    @staticmethod
+    def measure(record_type: str, weight, reps, duration_seconds) -> Optional[float]:
+        """
+        Calcule la valeur comparable d'une performance pour un type de record
+
+        Args:
+            record_type: Type de record ('1rm', 'volume' ou 'endurance')
+            weight: Poids utilisé (kg)
+            reps: Nombre de répétitions
+            duration_seconds: Durée de l'effort (secondes)
+
+        Returns:
+            Valeur à comparer (None si la performance ne s'applique pas,
+            notamment pour un 1RM estimé au-delà de MAX_1RM_REPS répétitions)
+        """
+        if record_type == '1rm' and weight and reps:
+            if reps > PerformanceRecordService.MAX_1RM_REPS:
+                return None
+            return OneRMService.calculate_brzycki(float(weight), reps)
+        if record_type == 'volume' and weight and reps:
+            return float(weight) * reps
+        if record_type == 'endurance' and duration_seconds:
+            return float(duration_seconds)
+        return None
+
+    @classmethod
+    def load_bests(cls, records) -> Dict[tuple, float]:
+        """
+        Calcule les meilleures valeurs à partir de records existants
+
+        Args:
+            records: Itérable de tuples (user_id, machine_id, record_type,
+                weight, reps, duration_seconds)
+
+        Returns:
+            Dictionnaire {(user_id, machine_id, record_type): meilleure valeur}
+        """
+        bests: Dict[tuple, float] = {}
+        for user_id, machine_id, record_type, weight, reps, duration_seconds in records:
+            value = cls.measure(record_type, weight, reps, duration_seconds)
+            key = (user_id, machine_id, record_type)
+            if value is not None and value > bests.get(key, 0):
+                bests[key] = value
+        return bests
+
+    @classmethod
+    def current_bests(cls, user_id: int, machine_id: int) -> Dict[tuple, float]:
+        """
+        Retourne les meilleurs résultats actuels d'un utilisateur sur une machine
+
+        Lit le cache en priorité ; les types absents du cache sont recalculés
+        à partir des records en base (une seule requête) puis mis en cache.
+
+        Returns:
+            Dictionnaire {(user_id, machine_id, record_type): meilleure valeur}
+        """
+        keys = {
+            cls.cache_key(user_id, machine_id, record_type): (user_id, machine_id, record_type)
+            for record_type in cls.TRACKED_TYPES
+        }
+        bests = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+        missing = [
+            record_type for record_type in cls.TRACKED_TYPES
+            if (user_id, machine_id, record_type) not in bests
+        ]
+        if missing:
+            stored = cls.load_bests(
+                PerformanceRecord.objects.filter(
+                    user_id=user_id,
+                    machine_id=machine_id,
+                    record_type__in=missing
+                ).values_list(
+                    'user_id', 'machine_id', 'record_type',
+                    'weight', 'reps', 'duration_seconds'
+                )
+            )
+            for record_type in missing:
+                key = (user_id, machine_id, record_type)
+                bests[key] = stored.get(key, 0)
+
+            cache.set_many({
+                cls.cache_key(user_id, machine_id, record_type): bests[(user_id, machine_id, record_type)]
+                for record_type in missing
+            }, cls.CACHE_TIMEOUT)
+
+        return bests
+
+    @classmethod
+    def build_records(cls, bests: Dict[tuple, float], user_id: int, machine_id: int,
+                      workout_id: int, weight, reps, duration_seconds, distance_meters,
+                      achieved_at) -> List[PerformanceRecord]:
+        """
+        Construit (sans les sauvegarder) les records battus par une série
+
+        Met à jour `bests` en place avec les nouvelles meilleures valeurs.
+        """
+        records = []
+        for record_type in cls.TRACKED_TYPES:
+            value = cls.measure(record_type, weight, reps, duration_seconds)
+            key = (user_id, machine_id, record_type)
+            if value is None or value <= bests.get(key, 0):
+                continue
+
+            bests[key] = value
+            if record_type == 'endurance':
+                values = {'duration_seconds': duration_seconds, 'distance_meters': distance_meters}
+            else:
+                values = {'weight': weight, 'reps': reps}
+
+            records.append(PerformanceRecord(
+                user_id=user_id,
+                machine_id=machine_id,
+                workout_id=workout_id,
+                record_type=record_type,
+                achieved_at=achieved_at,
+                notes="Détecté automatiquement",
+                **values
+            ))
+        return records
+
+    @classmethod
+    def detect_for_serie(cls, serie) -> List[PerformanceRecord]:
+        """
+        Enregistre les records battus par une série terminée
+
+        Args:
+            serie: Série terminée
+
+        Returns:
+            Liste des records créés
+        """
+        if not serie.completed:
+            return []
+
+        context = Exercise.objects.filter(pk=serie.exercise_id).values_list(
+            'machine_id', 'workout_id', 'workout__user_id'
+        ).first()
+        if context is None:
+            return []
+        machine_id, workout_id, user_id = context
+
+        bests = cls.current_bests(user_id, machine_id)
+        records = cls.build_records(
+            bests, user_id, machine_id, workout_id,
+            serie.weight, serie.reps, serie.duration_seconds, serie.distance_meters,
+            serie.completed_at or serie.created_at
+        )
+
+        if records:
+            PerformanceRecord.objects.bulk_create(records)
+            cache.set_many({
+                cls.cache_key(user_id, machine_id, record.record_type):
+                    bests[(user_id, machine_id, record.record_type)]
+                for record in records
+            }, cls.CACHE_TIMEOUT)
+
+        return records
+
+    @classmethod
+    def detect_for_workout(cls, workout_id: int) -> List[PerformanceRecord]:
+        """
+        Enregistre les records battus par les séries terminées d'une séance
+
+        Les séries sont traitées dans l'ordre chronologique ; les meilleurs
+        résultats ne sont chargés qu'une fois par machine.
+
+        Args:
+            workout_id: Identifiant de la séance
+
+        Returns:
+            Liste des records créés
+        """
+        series = Serie.objects.filter(
+            exercise__workout_id=workout_id,
+            completed=True
+        ).order_by('completed_at', 'pk').values_list(
+            'exercise__machine_id', 'exercise__workout__user_id', 'weight', 'reps',
+            'duration_seconds', 'distance_meters', 'completed_at', 'created_at'
+        )
+
+        bests: Dict[tuple, float] = {}
+        loaded_machines = set()
+        records = []
+
+        for (machine_id, user_id, weight, reps, duration_seconds,
+             distance_meters, completed_at, created_at) in series:
+            if machine_id not in loaded_machines:
+                bests.update(cls.current_bests(user_id, machine_id))
+                loaded_machines.add(machine_id)
+
+            records.extend(cls.build_records(
+                bests, user_id, machine_id, workout_id,
+                weight, reps, duration_seconds, distance_meters,
+                completed_at or created_at
+            ))
+
+        if records:
+            PerformanceRecord.objects.bulk_create(records)
+            cache.set_many({
+                cls.cache_key(record.user_id, record.machine_id, record.record_type):
+                    bests[(record.user_id, record.machine_id, record.record_type)]
+                for record in records
+            }, cls.CACHE_TIMEOUT)
+
+        return records
@@ -0,0 +1,113 @@
+"""
+Signaux de l'application workouts
+Maintient à jour les statistiques dénormalisées des séances
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.machines.models import Machine
+
+from .models import Exercise, Serie, Workout
+
+# Champs d'une série ayant un impact sur les statistiques de la séance
+SERIE_STATS_FIELDS = {'exercise', 'exercise_id', 'weight', 'reps'}
+
+
+def deleted_with(origin, *models):
+    """Indique si la suppression en cascade part d'un objet de l'un des modèles donnés"""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model in models
+
+
+def refresh_after_cascade(origin, using, workout_id=None, exercise_id=None):
+    """
+    Recalcule une seule fois les séances touchées par une suppression multiple
+
+    Une suppression en cascade (ex: une machine et tous ses exercices) ou
+    par queryset envoie un signal par ligne : les séances touchées sont
+    mémorisées sur l'origine et recalculées en une requête à la validation,
+    une fois toutes les lignes supprimées.
+    """
+    pending = origin.__dict__.get('_workout_totals')
+    if pending is None:
+        pending = origin.__dict__['_workout_totals'] = {'workouts': set(), 'exercises': set()}
+        transaction.on_commit(
+            lambda: Workout.objects.using(using).filter(
+                Q(pk__in=pending['workouts'])
+                | Q(pk__in=Exercise.objects.using(using).filter(
+                    pk__in=pending['exercises']
+                ).values('workout_id'))
+            ).refresh_totals(),
+            using=using
+        )
+    if workout_id is not None:
+        pending['workouts'].add(workout_id)
+    if exercise_id is not None:
+        pending['exercises'].add(exercise_id)
+
+
+@receiver(post_save, sender=Exercise)
+def refresh_workout_totals_from_exercise(sender, instance, raw=False, **kwargs):
+    """
+    Recalcule les statistiques de la séance après modification d'un exercice
+
+    Un exercice déplacé vers une autre séance recalcule aussi l'ancienne.
+    """
+    if raw:
+        return
+
+    workout_ids = {instance.workout_id, getattr(instance, '_loaded_workout_id', None)}
+    Workout.objects.filter(pk__in=workout_ids - {None}).refresh_totals()
+    instance._loaded_workout_id = instance.workout_id
+
+
+@receiver(post_delete, sender=Exercise)
+def refresh_workout_totals_after_exercise_delete(sender, instance, origin=None, using=None, **kwargs):
+    """Recalcule les statistiques de la séance après suppression d'un exercice"""
+    # Séance (ou compte) supprimée avec ses exercices : rien à recalculer
+    if deleted_with(origin, Workout, get_user_model()):
+        return
+
+    workout_id = getattr(instance, '_loaded_workout_id', None) or instance.workout_id
+    if origin is not None and origin is not instance:
+        refresh_after_cascade(origin, using, workout_id=workout_id)
+        return
+    Workout.objects.filter(pk=workout_id).refresh_totals()
+
+
+@receiver(post_save, sender=Serie)
+def refresh_workout_totals_from_serie(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Recalcule les statistiques de la séance après modification d'une série
+
+    Une série déplacée vers un autre exercice recalcule aussi l'ancienne séance.
+    """
+    if raw:
+        return
+
+    # Sauvegarde partielle sans impact sur le volume (ex: complete_set)
+    if update_fields is not None and not SERIE_STATS_FIELDS.intersection(update_fields):
+        return
+
+    exercise_ids = {instance.exercise_id, getattr(instance, '_loaded_exercise_id', None)}
+    Workout.objects.filter(exercises__id__in=exercise_ids - {None}).refresh_totals()
+    instance._loaded_exercise_id = instance.exercise_id
+
+
+@receiver(post_delete, sender=Serie)
+def refresh_workout_totals_after_serie_delete(sender, instance, origin=None, using=None, **kwargs):
+    """Recalcule les statistiques de la séance après suppression d'une série"""
+    # Suppression en cascade : la séance est supprimée, ou recalculée une
+    # seule fois à la suppression de l'exercice (y compris depuis une machine)
+    if deleted_with(origin, Workout, Exercise, get_user_model(), Machine):
+        return
+
+    exercise_id = getattr(instance, '_loaded_exercise_id', None) or instance.exercise_id
+    if origin is not None and origin is not instance:
+        refresh_after_cascade(origin, using, exercise_id=exercise_id)
+        return
+    Workout.objects.filter(exercises__id=exercise_id).refresh_totals()
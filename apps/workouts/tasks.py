@@ -0,0 +1,27 @@
+"""
+Tâches Celery de l'application workouts
+Post-traitements lourds déclenchés à la fin d'une séance
+"""
+
+from datetime import datetime
+
+from celery import shared_task
+
+from . import processing
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=30)
+def process_completed_workout(self, workout_id, completed_at):
+    """
+    Post-traitement d'une séance terminée (voir processing.process_completed_workout)
+
+    Args:
+        workout_id: Identifiant de la séance
+        completed_at: Date de fin de la séance (ISO 8601), clé d'idempotence
+    """
+    try:
+        return processing.process_completed_workout(
+            workout_id, datetime.fromisoformat(completed_at)
+        )
+    except Exception as exc:
+        raise self.retry(exc=exc)
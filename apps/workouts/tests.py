@@ -0,0 +1,239 @@
+"""
+Tests de l'application workouts
+"""
+
+import sys
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.machines.models import Machine
+from apps.users.models import User
+
+from . import processing
+from .models import Exercise, PerformanceRecord, Serie, Workout
+from .records import PerformanceRecordService
+
+
+class WorkoutTestCase(TestCase):
+    """Utilisateur, machine et séance de base"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='membre@example.com', first_name='Léa', last_name='Martin')
+        self.machine = Machine.objects.create(name='Presse', description='d', instructions='i')
+        self.workout = Workout.objects.create(user=self.user, name='Jambes')
+
+    def add_exercise(self, workout=None, machine=None, order=1):
+        return Exercise.objects.create(
+            workout=workout or self.workout, machine=machine or self.machine, order=order
+        )
+
+    def add_serie(self, exercise, reps=10, weight='50', set_number=None, **kwargs):
+        if set_number is None:
+            set_number = exercise.series.count() + 1
+        return Serie.objects.create(
+            exercise=exercise, set_number=set_number, reps=reps,
+            weight=Decimal(weight) if weight is not None else None, **kwargs
+        )
+
+
+class PerformanceRecordTests(WorkoutTestCase):
+
+    def test_measure_skips_1rm_above_reliable_reps(self):
+        self.assertEqual(PerformanceRecordService.measure('1rm', 50, 10, None), 66.68)
+        self.assertEqual(PerformanceRecordService.measure('1rm', 50, 12, None), 72.03)
+        for reps in (13, 36, 37, 40, 200):
+            self.assertIsNone(PerformanceRecordService.measure('1rm', 50, reps, None))
+        # Le volume reste mesuré pour les séries longues
+        self.assertEqual(PerformanceRecordService.measure('volume', 50, 40, None), 2000)
+
+    def test_complete_set_records_new_bests(self):
+        exercise = self.add_exercise()
+        records = self.add_serie(exercise, reps=5, weight='80').complete_set()
+        self.assertEqual({record.record_type for record in records}, {'1rm', 'volume'})
+
+        # Moins bien sur les deux mesures : aucun record
+        self.assertEqual(self.add_serie(exercise, reps=4, weight='70').complete_set(), [])
+
+        records = self.add_serie(exercise, reps=10, weight='60').complete_set()
+        self.assertEqual([record.record_type for record in records], ['volume'])
+
+    def test_long_set_is_not_a_1rm_record(self):
+        exercise = self.add_exercise()
+        records = self.add_serie(exercise, reps=36, weight='50').complete_set()
+        self.assertEqual([record.record_type for record in records], ['volume'])
+        self.assertFalse(PerformanceRecord.objects.filter(record_type='1rm').exists())
+
+    def test_incomplete_serie_records_nothing(self):
+        serie = self.add_serie(self.add_exercise(), reps=5, weight='80')
+        self.assertEqual(PerformanceRecordService.detect_for_serie(serie), [])
+
+    def test_detect_for_workout_uses_stored_bests(self):
+        exercise = self.add_exercise()
+        self.add_serie(exercise, reps=5, weight='80').complete_set()
+        cache.clear()
+
+        other = Workout.objects.create(user=self.user, name='Jambes 2')
+        other_exercise = self.add_exercise(workout=other)
+        self.add_serie(other_exercise, reps=5, weight='70', completed=True)
+        self.add_serie(other_exercise, reps=5, weight='90', completed=True)
+
+        records = PerformanceRecordService.detect_for_workout(other.pk)
+        self.assertEqual({record.record_type for record in records}, {'1rm', 'volume'})
+        self.assertTrue(all(record.weight == Decimal('90') for record in records))
+
+
+class PostCompletionTests(WorkoutTestCase):
+    """Post-traitement de fin de séance (tâche Celery exécutée en mode synchrone)"""
+
+    def setUp(self):
+        super().setUp()
+        exercise = self.add_exercise()
+        self.add_serie(exercise, reps=8, weight='60', completed=True)
+        self.add_serie(exercise, reps=8, weight='65', completed=True)
+
+    def complete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.workout.complete_workout()
+        self.workout.refresh_from_db()
+
+    def test_completion_runs_post_processing_once(self):
+        self.complete()
+
+        self.assertEqual(self.workout.processed_completion_at, self.workout.completed_at)
+        self.assertEqual(self.workout.total_sets, 2)
+        # Chaque série bat la précédente : deux records chacune
+        self.assertEqual(PerformanceRecord.objects.filter(record_type='1rm').count(), 2)
+        self.assertEqual(PerformanceRecord.objects.count(), 4)
+        self.assertIsNotNone(cache.get(processing.suggestions_cache_key(self.workout.pk)))
+
+        # Livraison en double : ignorée, quel que soit le cache
+        cache.clear()
+        result = processing.process_completed_workout(self.workout.pk, self.workout.completed_at)
+        self.assertEqual(result['status'], 'duplicate')
+        self.assertEqual(PerformanceRecord.objects.count(), 4)
+
+    def test_failure_releases_the_claim(self):
+        self.workout.complete_workout()
+        completed_at = self.workout.completed_at
+
+        with mock.patch.object(PerformanceRecordService, 'detect_for_workout', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                processing.process_completed_workout(self.workout.pk, completed_at)
+
+        self.workout.refresh_from_db()
+        self.assertIsNone(self.workout.processed_completion_at)
+        result = processing.process_completed_workout(self.workout.pk, completed_at)
+        self.assertEqual(result['status'], 'processed')
+
+    def test_completion_without_celery_runs_synchronously(self):
+        with mock.patch.dict(sys.modules, {'apps.workouts.tasks': None}):
+            self.complete()
+
+        self.assertEqual(self.workout.processed_completion_at, self.workout.completed_at)
+        self.assertEqual(PerformanceRecord.objects.count(), 4)
+
+
+class WorkoutTotalsSignalTests(WorkoutTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.rower = Machine.objects.create(name='Rameur', description='d', instructions='i')
+        self.other = Workout.objects.create(user=self.user, name='Dos')
+        press = self.add_exercise()
+        for _ in range(3):
+            self.add_serie(press)
+        for workout in (self.workout, self.other):
+            rower = self.add_exercise(workout, self.rower, order=2)
+            self.add_serie(rower, reps=10, weight='20')
+
+    def totals(self, workout):
+        workout.refresh_from_db()
+        return workout.total_exercises, workout.total_sets, workout.total_volume
+
+    def test_saves_and_moves_refresh_both_workouts(self):
+        self.assertEqual(self.totals(self.workout), (2, 4, Decimal('1700')))
+
+        serie = Serie.objects.filter(exercise__machine=self.machine).first()
+        serie.exercise = Exercise.objects.get(workout=self.other)
+        serie.set_number = 2
+        serie.save()
+        self.assertEqual(self.totals(self.workout), (2, 3, Decimal('1200')))
+        self.assertEqual(self.totals(self.other), (1, 2, Decimal('700')))
+
+    def test_single_deletes_refresh_immediately(self):
+        Serie.objects.filter(exercise__machine=self.machine).first().delete()
+        self.assertEqual(self.totals(self.workout), (2, 3, Decimal('1200')))
+
+        Exercise.objects.get(workout=self.workout, machine=self.machine).delete()
+        self.assertEqual(self.totals(self.workout), (1, 1, Decimal('200')))
+
+    def test_machine_deletion_refreshes_each_workout_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.rower.delete()
+
+        refreshes = [query for query in queries if query['sql'].startswith('UPDATE "workouts_workout"')]
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual(self.totals(self.workout), (1, 3, Decimal('1500')))
+        self.assertEqual(self.totals(self.other), (0, 0, Decimal('0')))
+
+    def test_queryset_deletion_refreshes_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                Serie.objects.filter(weight=50).delete()
+
+        refreshes = [query for query in queries if query['sql'].startswith('UPDATE "workouts_workout"')]
+        self.assertEqual(len(refreshes), 1)
+        self.assertEqual(self.totals(self.workout), (2, 1, Decimal('200')))
+
+    def test_user_deletion_skips_refresh(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.delete()
+
+        self.assertFalse(any(query['sql'].startswith('UPDATE "workouts_workout"') for query in queries))
+        self.assertFalse(Workout.objects.exists())
+
+
+class WithStatsTests(WorkoutTestCase):
+
+    def test_annotations_match_stored_totals(self):
+        press = self.add_exercise()
+        self.add_serie(press, reps=10, weight='50', completed=True)
+        self.add_serie(press, reps=8, weight=None)
+        rower = self.add_exercise(machine=Machine.objects.create(
+            name='Rameur', description='d', instructions='i'
+        ), order=2)
+        self.add_serie(rower, reps=12, weight='20.5', completed=True)
+        empty = Workout.objects.create(user=self.user, name='Repos')
+
+        with self.assertNumQueries(1):
+            workouts = {workout.pk: workout for workout in Workout.objects.with_stats()}
+
+        workout = workouts[self.workout.pk]
+        self.assertEqual(
+            (workout.exercises_count, workout.sets_count, workout.completed_sets_count, workout.volume),
+            (2, 3, 2, Decimal('746'))
+        )
+        self.assertEqual((workout.total_exercises, workout.total_sets, workout.total_volume),
+                         (2, 3, Decimal('746')))
+        empty = workouts[empty.pk]
+        self.assertEqual((empty.exercises_count, empty.sets_count, empty.volume), (0, 0, 0))
+
+    def test_user_stats_use_one_aggregate(self):
+        press = self.add_exercise()
+        self.add_serie(press, reps=10, weight='50', completed=True)
+        self.add_serie(press, reps=10, weight='50')
+
+        with self.assertNumQueries(1):
+            stats = self.user.get_workout_stats()
+        self.assertEqual(
+            (stats['total_workouts'], stats['total_sets'], stats['completed_sets'], stats['total_volume']),
+            (1, 2, 1, 1000.0)
+        )
@@ -5,6 +5,7 @@ Generated by 'django-admin startproject' using Django 4.2.7.
 """
 
 import os
+import sys
 import dj_database_url
 from pathlib import Path
 from decouple import config
@@ -21,6 +22,9 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = ['*']
 
+# Suite de tests en cours (manage.py test)
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Application definition
 DJANGO_APPS = [
     'django.contrib.admin',
@@ -141,7 +145,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.StandardPageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -230,6 +243,21 @@ CSRF_COOKIE_HTTPONLY = False
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
+# Cache : Redis si REDIS_URL est défini, mémoire locale sinon
+if config('REDIS_URL', default=''):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379')
@@ -237,6 +265,28 @@ CELERY_ACCEPT_CONTENT = ['application/json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Mode synchrone (tests, développement sans Redis)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=TESTING, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+# Tâches périodiques (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'flush-machine-popularity': {
+        'task': 'apps.machines.tasks.flush_popularity',
+        'schedule': 60.0,
+    },
+    'dispatch-workout-reminders': {
+        'task': 'apps.calendar.tasks.dispatch_reminders',
+        'schedule': 60.0,
+    },
+    'purge-sync-tombstones': {
+        'task': 'apps.core.tasks.purge_sync_tombstones',
+        'schedule': timedelta(days=1),
+    },
+    'create-due-workouts': {
+        'task': 'apps.calendar.tasks.create_due_workouts',
+        'schedule': timedelta(hours=1),
+    },
+}
 
 # Email settings (for production)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
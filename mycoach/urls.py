@@ -23,6 +23,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from apps.users.views import register_view
+from apps.core.views import SyncView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -38,6 +39,7 @@ urlpatterns = [
     path('api/workouts/', include('apps.workouts.urls')),
     path('api/calendar/', include('apps.calendar.urls')),
     path('api/core/', include('apps.core.urls')),
+    path('api/sync/', SyncView.as_view(), name='sync'),
 ]
 
 # Serve media files in development